@@ -6,11 +6,16 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
+import atexit
 import sqlite3
 
 # Importar nossos modelos
-from database import DatabaseManager
-from models import Produto, Cliente, Pet, Venda, Agendamento, Categoria
+from database import DatabaseManager, intervalo_datas, intervalo_mes
+from models import (Produto, Cliente, Pet, Venda, Agendamento, Categoria, EstoqueInsuficienteError,
+                    ConflitoEstoqueError, ConflitoAgendamentoError, HORIZONTE_SERIES_DIAS)
+
+# Linhas por página nas listagens
+TAMANHO_PAGINA = 50
 
 # Configuração da página
 st.set_page_config(
@@ -56,12 +61,14 @@ st.markdown("""
 # Inicializar managers
 @st.cache_resource
 def init_database():
-    db = DatabaseManager()
+    # Várias sessões escrevem ao mesmo tempo: escritas passam pelo escritor dedicado
+    db = DatabaseManager(escritor_dedicado=True, cache=True)
+    atexit.register(db.close)
     
     # Configurar dados de demonstração automaticamente
     try:
         from setup_demo import setup_demo_data
-        setup_demo_data()
+        setup_demo_data(db)
     except Exception as e:
         print(f"Aviso: Não foi possível configurar dados de demonstração: {e}")
     
@@ -77,6 +84,43 @@ def init_database():
 
 managers = init_database()
 
+def tabela(registros, colunas):
+    """Monta um DataFrame a partir dos registros dos modelos
+    
+    colunas mapeia o nome do campo para o rótulo exibido; só esses campos entram.
+    """
+    df = pd.DataFrame(registros, columns=registros[0]._fields)
+    return df[list(colunas)].rename(columns=colunas)
+
+def paginar(chave, buscar_pagina, filtros=None):
+    """Mostra os botões de paginação de uma listagem e devolve os itens da página atual
+    
+    buscar_pagina recebe o cursor (apos) e devolve uma Pagina. Os cursores das
+    páginas já vistas ficam na sessão, para o "Anterior"; quando os filtros
+    mudam, a listagem volta para a primeira página.
+    """
+    estado = st.session_state.setdefault(f"paginacao_{chave}", {'filtros': None, 'cursores': [None]})
+    if estado['filtros'] != filtros:
+        estado['filtros'] = filtros
+        estado['cursores'] = [None]
+    cursores = estado['cursores']
+    
+    pagina = buscar_pagina(cursores[-1])
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Anterior", key=f"{chave}_anterior", disabled=len(cursores) == 1):
+            cursores.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Página {len(cursores)}")
+    with col3:
+        if st.button("Próxima ➡️", key=f"{chave}_proxima", disabled=pagina.proximo is None):
+            cursores.append(pagina.proximo)
+            st.rerun()
+    
+    return pagina.itens
+
 def main():
     # Aviso de demonstração
     st.info("🎯 **DEMONSTRAÇÃO GRATUITA** - Este é um sistema completo funcionando com dados de exemplo. Entre em contato para adquirir sua licença!", icon="ℹ️")
@@ -107,8 +151,11 @@ def main():
     # Roteamento de páginas
     pagina = opcoes_menu[opcao_selecionada]
     
+    # Dashboard e relatórios leem de um snapshot só de leitura: os números da página
+    # são consistentes entre si e as consultas pesadas não atrasam as vendas
     if pagina == "dashboard":
-        mostrar_dashboard()
+        with managers['db'].snapshot():
+            mostrar_dashboard()
     elif pagina == "estoque":
         mostrar_gestao_estoque()
     elif pagina == "clientes":
@@ -120,7 +167,8 @@ def main():
     elif pagina == "agendamentos":
         mostrar_agendamentos()
     elif pagina == "relatorios":
-        mostrar_relatorios()
+        with managers['db'].snapshot():
+            mostrar_relatorios()
 
 def mostrar_dashboard():
     """Dashboard principal com estatísticas"""
@@ -130,17 +178,20 @@ def mostrar_dashboard():
     col1, col2, col3, col4 = st.columns(4)
     
     try:
-        # Buscar dados para métricas
-        produtos = managers['produto_manager'].listar_todos()
-        clientes = managers['cliente_manager'].listar_todos()
-        pets = managers['pet_manager'].listar_todos()
+        # Buscar dados para métricas (agregados no banco, sem carregar as tabelas)
+        total_produtos, valor_estoque, total_clientes, total_pets = managers['db'].execute_query('''
+            SELECT (SELECT COUNT(*) FROM produtos),
+                   (SELECT COALESCE(SUM(preco * estoque_atual), 0) FROM produtos),
+                   (SELECT COUNT(*) FROM clientes),
+                   (SELECT COUNT(*) FROM pets)
+        ''')[0]
         
         # Vendas do mês
         vendas_mes = managers['db'].execute_query('''
             SELECT COUNT(*), COALESCE(SUM(total), 0)
             FROM vendas 
-            WHERE strftime('%Y-%m', data_venda) = strftime('%Y-%m', 'now')
-        ''')
+            WHERE data_venda >= ? AND data_venda < ?
+        ''', intervalo_mes())
         
         total_vendas_mes = vendas_mes[0][0] if vendas_mes else 0
         valor_vendas_mes = vendas_mes[0][1] if vendas_mes else 0
@@ -149,13 +200,13 @@ def mostrar_dashboard():
         produtos_estoque_baixo = len(managers['produto_manager'].produtos_estoque_baixo())
         
         with col1:
-            st.metric("📦 Total de Produtos", len(produtos))
+            st.metric("📦 Total de Produtos", total_produtos)
         
         with col2:
-            st.metric("👥 Total de Clientes", len(clientes))
+            st.metric("👥 Total de Clientes", total_clientes)
         
         with col3:
-            st.metric("🐕 Total de Pets", len(pets))
+            st.metric("🐕 Total de Pets", total_pets)
         
         with col4:
             st.metric("💰 Vendas do Mês", f"R$ {valor_vendas_mes:.2f}")
@@ -180,7 +231,6 @@ def mostrar_dashboard():
         
         with col8:
             # Valor total do estoque
-            valor_estoque = sum(p[3] * p[4] for p in produtos)  # preço * estoque
             st.metric("💎 Valor do Estoque", f"R$ {valor_estoque:.2f}")
         
         # Gráficos
@@ -195,10 +245,10 @@ def mostrar_dashboard():
             vendas_30_dias = managers['db'].execute_query('''
                 SELECT DATE(data_venda) as data, COUNT(*) as qtd, SUM(total) as total
                 FROM vendas 
-                WHERE data_venda >= date('now', '-30 days')
+                WHERE data_venda >= ? AND data_venda < ?
                 GROUP BY DATE(data_venda)
                 ORDER BY data
-            ''')
+            ''', intervalo_datas(date.today() - timedelta(days=30), date.today()))
             
             if vendas_30_dias:
                 df_vendas = pd.DataFrame(vendas_30_dias, columns=['Data', 'Quantidade', 'Total'])
@@ -219,7 +269,7 @@ def mostrar_dashboard():
                 FROM pets 
                 GROUP BY LOWER(especie)
                 ORDER BY quantidade DESC
-            ''')
+            ''', cached=True)
             
             if pets_especies:
                 df_especies = pd.DataFrame(pets_especies, columns=['Espécie', 'Quantidade'])
@@ -239,13 +289,11 @@ def mostrar_dashboard():
             
             # Mostrar produtos com estoque baixo
             produtos_baixo = managers['produto_manager'].produtos_estoque_baixo()
-            df_baixo = pd.DataFrame(produtos_baixo, columns=[
-                'ID', 'Nome', 'Categoria_ID', 'Preço', 'Estoque Atual', 
-                'Estoque Mínimo', 'Código', 'Descrição', 'Marca', 'Peso', 
-                'Unidade', 'Created', 'Updated', 'Categoria'
-            ])
-            st.dataframe(df_baixo[['Nome', 'Estoque Atual', 'Estoque Mínimo', 'Categoria']], 
-                        use_container_width=True)
+            df_baixo = tabela(produtos_baixo, {
+                'nome': 'Nome', 'estoque_atual': 'Estoque Atual',
+                'estoque_minimo': 'Estoque Mínimo', 'categoria_nome': 'Categoria'
+            })
+            st.dataframe(df_baixo, use_container_width=True)
         else:
             st.success("✅ Todos os produtos estão com estoque adequado!")
         
@@ -268,25 +316,27 @@ def mostrar_gestao_estoque():
         # Filtros
         col1, col2 = st.columns(2)
         with col1:
-            filtro_nome = st.text_input("🔍 Filtrar por nome:")
+            filtro_nome = st.text_input("🔍 Buscar (nome, marca ou código):")
         with col2:
             categorias = managers['categoria_manager'].listar_todas()
-            categoria_opcoes = ["Todas"] + [cat[1] for cat in categorias]
+            categoria_opcoes = ["Todas"] + [cat.nome for cat in categorias]
             filtro_categoria = st.selectbox("🏷️ Filtrar por categoria:", categoria_opcoes)
         
-        # Buscar produtos
+        # Buscar produtos; sem filtro, a lista vem em páginas
         if filtro_nome:
-            produtos = managers['produto_manager'].buscar_por_nome(filtro_nome)
-        else:
+            produtos = managers['produto_manager'].buscar(filtro_nome, limite=200)
+        elif filtro_categoria != "Todas":
             produtos = managers['produto_manager'].listar_todos()
+        else:
+            produtos = paginar("produtos", lambda apos: managers['produto_manager'].listar_pagina(
+                apos, TAMANHO_PAGINA))
         
         if produtos:
             # Converter para DataFrame
-            df = pd.DataFrame(produtos, columns=[
-                'ID', 'Nome', 'Categoria_ID', 'Preço', 'Estoque Atual', 
-                'Estoque Mínimo', 'Código', 'Descrição', 'Marca', 'Peso', 
-                'Unidade', 'Created', 'Updated', 'Categoria'
-            ])
+            df = tabela(produtos, {
+                'id': 'ID', 'nome': 'Nome', 'categoria_nome': 'Categoria', 'preco': 'Preço',
+                'estoque_atual': 'Estoque Atual', 'estoque_minimo': 'Estoque Mínimo'
+            })
             
             # Filtrar por categoria se selecionada
             if filtro_categoria != "Todas":
@@ -300,7 +350,7 @@ def mostrar_gestao_estoque():
             
             # Mostrar tabela
             st.dataframe(
-                df[['ID', 'Nome', 'Categoria', 'Preço', 'Estoque Atual', 'Estoque Mínimo']].style.apply(highlight_estoque_baixo, axis=1),
+                df.style.apply(highlight_estoque_baixo, axis=1),
                 use_container_width=True
             )
         else:
@@ -316,7 +366,7 @@ def mostrar_gestao_estoque():
                 nome = st.text_input("Nome do Produto *", placeholder="Ex: Ração Premium Cães")
                 
                 categorias = managers['categoria_manager'].listar_todas()
-                categoria_opcoes = {cat[1]: cat[0] for cat in categorias}
+                categoria_opcoes = {cat.nome: cat.id for cat in categorias}
                 categoria_selecionada = st.selectbox("Categoria *", list(categoria_opcoes.keys()))
                 
                 preco = st.number_input("Preço (R$) *", min_value=0.01, step=0.01, format="%.2f")
@@ -354,9 +404,13 @@ def mostrar_gestao_estoque():
         st.subheader("Atualizar Estoque")
         
         # Buscar produto
-        produtos = managers['produto_manager'].listar_todos()
+        busca_estoque = st.text_input("🔍 Buscar produto (nome, marca ou código):", key="busca_estoque")
+        if busca_estoque:
+            produtos = managers['produto_manager'].buscar(busca_estoque)
+        else:
+            produtos = managers['produto_manager'].listar_todos()
         if produtos:
-            produto_opcoes = {f"{p[0]} - {p[1]}": p[0] for p in produtos}
+            produto_opcoes = {f"{p.id} - {p.nome}": p.id for p in produtos}
             produto_selecionado = st.selectbox("Selecione o produto:", list(produto_opcoes.keys()))
             
             if produto_selecionado:
@@ -367,24 +421,29 @@ def mostrar_gestao_estoque():
                     col1, col2 = st.columns(2)
                     
                     with col1:
-                        st.info(f"**Produto:** {produto[1]}")
-                        st.info(f"**Estoque Atual:** {produto[4]}")
+                        st.info(f"**Produto:** {produto.nome}")
+                        st.info(f"**Estoque Atual:** {produto.estoque_atual}")
                     
                     with col2:
-                        nova_quantidade = st.number_input("Nova Quantidade:", min_value=0, value=produto[4])
+                        nova_quantidade = st.number_input("Nova Quantidade:", min_value=0, value=produto.estoque_atual)
                         motivo = st.text_input("Motivo da Alteração:", value="Ajuste manual")
                     
                     if st.button("🔄 Atualizar Estoque", type="primary"):
                         try:
-                            if managers['produto_manager'].atualizar_estoque(produto_id, nova_quantidade, motivo):
+                            if managers['produto_manager'].atualizar_estoque(produto_id, nova_quantidade, motivo,
+                                                                             versao=produto.versao):
                                 st.success("✅ Estoque atualizado com sucesso!")
                                 st.rerun()
                             else:
                                 st.error("❌ Erro ao atualizar estoque!")
+                        except ConflitoEstoqueError as e:
+                            estoque = e.itens[0][3]
+                            st.error(f"❌ O produto foi alterado por outra operação (estoque agora: {estoque}). "
+                                     "Recarregue a página e confira antes de ajustar.")
                         except Exception as e:
                             st.error(f"❌ Erro: {e}")
         else:
-            st.info("Nenhum produto cadastrado")
+            st.info("Nenhum produto encontrado" if busca_estoque else "Nenhum produto cadastrado")
     
     with tab4:
         st.subheader("Gerenciar Categorias")
@@ -396,8 +455,8 @@ def mostrar_gestao_estoque():
             categorias = managers['categoria_manager'].listar_todas()
             
             if categorias:
-                df_cat = pd.DataFrame(categorias, columns=['ID', 'Nome', 'Descrição', 'Criado em'])
-                st.dataframe(df_cat[['ID', 'Nome', 'Descrição']], use_container_width=True)
+                df_cat = tabela(categorias, {'id': 'ID', 'nome': 'Nome', 'descricao': 'Descrição'})
+                st.dataframe(df_cat, use_container_width=True)
             else:
                 st.info("Nenhuma categoria cadastrada")
         
@@ -429,26 +488,26 @@ def mostrar_gestao_clientes():
         st.subheader("Lista de Clientes")
         
         # Filtro
-        filtro_nome = st.text_input("🔍 Filtrar por nome:")
+        filtro_nome = st.text_input("🔍 Buscar por nome, telefone, CPF ou nome do pet:")
         
-        # Buscar clientes
+        # Buscar clientes; sem filtro, a lista vem em páginas
         if filtro_nome:
-            clientes = managers['cliente_manager'].buscar_por_nome(filtro_nome)
+            clientes = [cliente for cliente, _ in managers['cliente_manager'].buscar(filtro_nome, limite=100)]
+            total_clientes = len(clientes)
         else:
-            clientes = managers['cliente_manager'].listar_todos()
+            clientes = paginar("clientes", lambda apos: managers['cliente_manager'].listar_pagina(
+                apos, TAMANHO_PAGINA))
+            total_clientes = managers['db'].execute_query('SELECT COUNT(*) FROM clientes', cached=True)[0][0]
         
         if clientes:
-            df = pd.DataFrame(clientes, columns=[
-                'ID', 'Nome', 'CPF', 'Telefone', 'Email', 'Endereço', 'Cidade', 'CEP', 'Criado em'
-            ])
+            df = tabela(clientes, {
+                'id': 'ID', 'nome': 'Nome', 'telefone': 'Telefone', 'email': 'Email', 'cidade': 'Cidade'
+            })
             
-            st.dataframe(
-                df[['ID', 'Nome', 'Telefone', 'Email', 'Cidade']],
-                use_container_width=True
-            )
+            st.dataframe(df, use_container_width=True)
             
             # Estatísticas
-            st.metric("Total de Clientes", len(clientes))
+            st.metric("Total de Clientes", total_clientes)
         else:
             st.info("Nenhum cliente encontrado")
     
@@ -492,7 +551,7 @@ def mostrar_gestao_clientes():
         
         clientes = managers['cliente_manager'].listar_todos()
         if clientes:
-            cliente_opcoes = {f"{c[0]} - {c[1]}": c[0] for c in clientes}
+            cliente_opcoes = {f"{c.id} - {c.nome}": c.id for c in clientes}
             cliente_selecionado = st.selectbox("Selecione o cliente:", list(cliente_opcoes.keys()))
             
             if cliente_selecionado:
@@ -504,15 +563,15 @@ def mostrar_gestao_clientes():
                         col1, col2 = st.columns(2)
                         
                         with col1:
-                            nome = st.text_input("Nome Completo *", value=cliente[1])
-                            cpf = st.text_input("CPF", value=cliente[2] if cliente[2] else "")
-                            telefone = st.text_input("Telefone", value=cliente[3] if cliente[3] else "")
-                            email = st.text_input("Email", value=cliente[4] if cliente[4] else "")
+                            nome = st.text_input("Nome Completo *", value=cliente.nome)
+                            cpf = st.text_input("CPF", value=cliente.cpf or "")
+                            telefone = st.text_input("Telefone", value=cliente.telefone or "")
+                            email = st.text_input("Email", value=cliente.email or "")
                         
                         with col2:
-                            endereco = st.text_input("Endereço", value=cliente[5] if cliente[5] else "")
-                            cidade = st.text_input("Cidade", value=cliente[6] if cliente[6] else "")
-                            cep = st.text_input("CEP", value=cliente[7] if cliente[7] else "")
+                            endereco = st.text_input("Endereço", value=cliente.endereco or "")
+                            cidade = st.text_input("Cidade", value=cliente.cidade or "")
+                            cep = st.text_input("CEP", value=cliente.cep or "")
                         
                         if st.form_submit_button("💾 Salvar Alterações", type="primary"):
                             if nome:
@@ -548,40 +607,44 @@ def mostrar_gestao_pets():
         with col1:
             filtro_nome = st.text_input("🔍 Filtrar por nome do pet:")
         with col2:
-            especies = managers['db'].execute_query('SELECT DISTINCT especie FROM pets ORDER BY especie')
+            especies = managers['db'].execute_query('SELECT DISTINCT especie FROM pets ORDER BY especie', cached=True)
             especie_opcoes = ["Todas"] + [e[0] for e in especies] if especies else ["Todas"]
             filtro_especie = st.selectbox("🐕 Filtrar por espécie:", especie_opcoes)
         
-        # Buscar pets
+        # Buscar pets; sem filtro, a lista vem em páginas
+        paginado = not filtro_nome and filtro_especie == "Todas"
         if filtro_nome:
             pets = managers['pet_manager'].buscar_por_nome(filtro_nome)
-        else:
+        elif not paginado:
             pets = managers['pet_manager'].listar_todos()
+        else:
+            pets = paginar("pets", lambda apos: managers['pet_manager'].listar_pagina(apos, TAMANHO_PAGINA))
         
         if pets:
-            df = pd.DataFrame(pets, columns=[
-                'ID', 'Nome', 'Cliente_ID', 'Espécie', 'Raça', 'Idade', 
-                'Peso', 'Cor', 'Observações', 'Criado em', 'Cliente Nome', 'Cliente Telefone'
-            ])
+            df = tabela(pets, {
+                'id': 'ID', 'nome': 'Nome', 'especie': 'Espécie', 'raca': 'Raça',
+                'idade': 'Idade', 'peso': 'Peso', 'cliente_nome': 'Cliente Nome'
+            })
             
             # Filtrar por espécie
             if filtro_especie != "Todas":
                 df = df[df['Espécie'].str.lower() == filtro_especie.lower()]
             
-            st.dataframe(
-                df[['ID', 'Nome', 'Espécie', 'Raça', 'Idade', 'Peso', 'Cliente Nome']],
-                use_container_width=True
-            )
+            st.dataframe(df, use_container_width=True)
+            
+            # Estatísticas (de todos os pets quando a lista está paginada)
+            if paginado:
+                total_pets, idade_media, peso_medio = managers['db'].execute_query(
+                    'SELECT COUNT(*), AVG(idade), AVG(peso) FROM pets', cached=True)[0]
+            else:
+                total_pets, idade_media, peso_medio = len(df), df['Idade'].dropna().mean(), df['Peso'].dropna().mean()
             
-            # Estatísticas
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Total de Pets", len(df))
+                st.metric("Total de Pets", total_pets)
             with col2:
-                idade_media = df['Idade'].dropna().mean()
                 st.metric("Idade Média", f"{idade_media:.1f} anos" if not pd.isna(idade_media) else "N/A")
             with col3:
-                peso_medio = df['Peso'].dropna().mean()
                 st.metric("Peso Médio", f"{peso_medio:.1f} kg" if not pd.isna(peso_medio) else "N/A")
         else:
             st.info("Nenhum pet encontrado")
@@ -597,7 +660,7 @@ def mostrar_gestao_pets():
         
         with st.form("form_pet"):
             # Seleção de cliente
-            cliente_opcoes = {f"{c[1]} - {c[3] if c[3] else 'Sem telefone'}": c[0] for c in clientes}
+            cliente_opcoes = {f"{c.nome} - {c.telefone or 'Sem telefone'}": c.id for c in clientes}
             cliente_selecionado = st.selectbox("Cliente *", list(cliente_opcoes.keys()))
             
             col1, col2 = st.columns(2)
@@ -664,7 +727,7 @@ def nova_venda_web():
     with col1:
         clientes = managers['cliente_manager'].listar_todos()
         cliente_opcoes = {"Venda sem cliente": None}
-        cliente_opcoes.update({f"{c[1]} - {c[3] if c[3] else 'Sem telefone'}": c[0] for c in clientes})
+        cliente_opcoes.update({f"{c.nome} - {c.telefone or 'Sem telefone'}": c.id for c in clientes})
         
         cliente_selecionado = st.selectbox("👤 Cliente:", list(cliente_opcoes.keys()))
         cliente_id = cliente_opcoes[cliente_selecionado]
@@ -677,12 +740,40 @@ def nova_venda_web():
     st.markdown("---")
     st.subheader("📦 Adicionar Produtos")
     
+    # Leitor de código de barras: o leitor "digita" o código e manda Enter, que envia o formulário
+    with st.form("leitor_codigo", clear_on_submit=True):
+        codigo_lido = st.text_input("📷 Código de barras:", placeholder="Passe o produto no leitor")
+        lido = st.form_submit_button("Adicionar 1 unidade")
+    if lido and codigo_lido.strip():
+        item_lido = managers['produto_manager'].buscar_por_codigo_barras(codigo_lido)
+        if item_lido is None:
+            st.error(f"❌ Código {codigo_lido.strip()} não encontrado!")
+        else:
+            no_carrinho = sum(item['quantidade'] for item in st.session_state.carrinho
+                              if item['produto_id'] == item_lido.id)
+            if no_carrinho + 1 > item_lido.estoque_atual:
+                st.error(f"❌ Estoque insuficiente! Disponível: {item_lido.estoque_atual}")
+            else:
+                st.session_state.carrinho.append({
+                    'produto_id': item_lido.id,
+                    'nome': item_lido.nome,
+                    'quantidade': 1,
+                    'preco_unitario': item_lido.preco,
+                    'subtotal': item_lido.preco
+                })
+                st.success(f"✅ 1x {item_lido.nome} adicionado ao carrinho!")
+    
     col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
     
     with col1:
-        produtos = managers['produto_manager'].listar_todos()
+        busca_produto = st.text_input("🔍 Buscar produto (nome, marca ou código):", key="busca_venda")
+        if busca_produto:
+            produtos = managers['produto_manager'].buscar(busca_produto)
+        else:
+            produtos = managers['produto_manager'].listar_todos()
         if produtos:
-            produto_opcoes = {f"{p[1]} - R${p[3]:.2f} (Estoque: {p[4]})": p for p in produtos if p[4] > 0}
+            produto_opcoes = {f"{p.nome} - R${p.preco:.2f} (Estoque: {p.estoque_atual})": p
+                              for p in produtos if p.estoque_atual > 0}
             
             if produto_opcoes:
                 produto_selecionado = st.selectbox("Produto:", list(produto_opcoes.keys()))
@@ -691,30 +782,30 @@ def nova_venda_web():
                 st.warning("⚠️ Nenhum produto com estoque disponível!")
                 return
         else:
-            st.warning("⚠️ Nenhum produto cadastrado!")
+            st.warning("⚠️ Nenhum produto encontrado!" if busca_produto else "⚠️ Nenhum produto cadastrado!")
             return
     
     with col2:
-        quantidade = st.number_input("Qtd:", min_value=1, max_value=produto_dados[4], value=1)
+        quantidade = st.number_input("Qtd:", min_value=1, max_value=produto_dados.estoque_atual, value=1)
     
     with col3:
-        preco_unitario = st.number_input("Preço Unit.:", value=float(produto_dados[3]), step=0.01, format="%.2f")
+        preco_unitario = st.number_input("Preço Unit.:", value=float(produto_dados.preco), step=0.01, format="%.2f")
     
     with col4:
         if st.button("➕ Adicionar", type="primary"):
-            if quantidade <= produto_dados[4]:
+            if quantidade <= produto_dados.estoque_atual:
                 item = {
-                    'produto_id': produto_dados[0],
-                    'nome': produto_dados[1],
+                    'produto_id': produto_dados.id,
+                    'nome': produto_dados.nome,
                     'quantidade': quantidade,
                     'preco_unitario': preco_unitario,
                     'subtotal': quantidade * preco_unitario
                 }
                 st.session_state.carrinho.append(item)
-                st.success(f"✅ {quantidade}x {produto_dados[1]} adicionado ao carrinho!")
+                st.success(f"✅ {quantidade}x {produto_dados.nome} adicionado ao carrinho!")
                 st.rerun()
             else:
-                st.error(f"❌ Estoque insuficiente! Disponível: {produto_dados[4]}")
+                st.error(f"❌ Estoque insuficiente! Disponível: {produto_dados.estoque_atual}")
     
     # Mostrar carrinho
     if st.session_state.carrinho:
@@ -759,24 +850,21 @@ def nova_venda_web():
         with col1:
             if st.button("✅ Finalizar Venda", type="primary", use_container_width=True):
                 try:
-                    # Criar venda
-                    venda_id = managers['venda_manager'].criar_venda(
-                        cliente_id, desconto, forma_pagamento
+                    # Venda, itens e baixa de estoque gravados em um único commit
+                    venda_id = managers['venda_manager'].registrar_venda_completa(
+                        cliente_id, st.session_state.carrinho, desconto, forma_pagamento
                     )
                     
-                    # Adicionar itens
-                    for item in st.session_state.carrinho:
-                        managers['venda_manager'].adicionar_item(
-                            venda_id, item['produto_id'], item['quantidade'], item['preco_unitario']
-                        )
-                    
-                    # Finalizar e atualizar estoque
-                    managers['venda_manager'].finalizar_venda(venda_id)
-                    
                     st.success(f"🎉 Venda #{venda_id} finalizada com sucesso!")
                     st.session_state.carrinho = []
                     st.rerun()
                     
+                except EstoqueInsuficienteError as e:
+                    # A baixa confere o estoque no momento do checkout: outra venda pode ter levado as unidades
+                    st.error("❌ Estoque insuficiente para finalizar a venda:")
+                    for _, nome, quantidade, estoque in e.itens:
+                        st.warning(f"**{nome}**: pedido {quantidade}, disponível agora {estoque}")
+                    st.info("Revise as quantidades do carrinho e finalize novamente.")
                 except Exception as e:
                     st.error(f"❌ Erro ao finalizar venda: {e}")
         
@@ -799,23 +887,17 @@ def historico_vendas_web():
         data_fim = st.date_input("Data Fim:", value=date.today())
     
     with col3:
-        limite = st.number_input("Limite de registros:", min_value=10, max_value=500, value=50)
-    
-    # Buscar vendas
-    vendas = managers['db'].execute_query('''
-        SELECT v.*, c.nome as cliente_nome
-        FROM vendas v
-        LEFT JOIN clientes c ON v.cliente_id = c.id
-        WHERE DATE(v.data_venda) BETWEEN ? AND ?
-        ORDER BY v.data_venda DESC
-        LIMIT ?
-    ''', (data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'), limite))
+        limite = st.number_input("Registros por página:", min_value=10, max_value=500, value=TAMANHO_PAGINA)
+    
+    # Buscar vendas, uma página por vez
+    vendas = paginar("vendas", lambda apos: managers['venda_manager'].listar_pagina(
+        data_inicio, data_fim, apos, limite), filtros=(data_inicio, data_fim, limite))
     
     if vendas:
-        df = pd.DataFrame(vendas, columns=[
-            'ID', 'Cliente_ID', 'Total', 'Desconto', 'Forma_Pagamento', 
-            'Data_Venda', 'Observações', 'Cliente_Nome'
-        ])
+        df = tabela(vendas, {
+            'id': 'ID', 'cliente_nome': 'Cliente_Nome', 'total': 'Total', 'desconto': 'Desconto',
+            'forma_pagamento': 'Forma_Pagamento', 'data_venda': 'Data_Venda'
+        })
         
         # Formatar data
         df['Data'] = pd.to_datetime(df['Data_Venda']).dt.strftime('%d/%m/%Y %H:%M')
@@ -827,22 +909,25 @@ def historico_vendas_web():
             use_container_width=True
         )
         
-        # Estatísticas
+        # Estatísticas do período inteiro, não só da página
+        total_vendas, total_faturamento, ticket_medio, total_desconto = managers['db'].execute_query('''
+            SELECT COUNT(*), COALESCE(SUM(total), 0), COALESCE(AVG(total), 0), COALESCE(SUM(desconto), 0)
+            FROM vendas
+            WHERE data_venda >= ? AND data_venda < ?
+        ''', intervalo_datas(data_inicio, data_fim))[0]
+        
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total de Vendas", len(df))
+            st.metric("Total de Vendas", total_vendas)
         
         with col2:
-            total_faturamento = df['Total'].sum()
             st.metric("Faturamento Total", f"R$ {total_faturamento:.2f}")
         
         with col3:
-            ticket_medio = df['Total'].mean()
             st.metric("Ticket Médio", f"R$ {ticket_medio:.2f}")
         
         with col4:
-            total_desconto = df['Desconto'].sum()
             st.metric("Total Descontos", f"R$ {total_desconto:.2f}")
     else:
         st.info("Nenhuma venda encontrada no período selecionado")
@@ -864,28 +949,25 @@ def buscar_venda_web():
             col1, col2 = st.columns(2)
             
             with col1:
-                st.info(f"**Venda #{venda[0]}**")
-                st.write(f"**Data:** {venda[5]}")
-                st.write(f"**Cliente:** {venda[7] if venda[7] else 'Sem cliente'}")
-                st.write(f"**Forma de Pagamento:** {venda[4]}")
+                st.info(f"**Venda #{venda.id}**")
+                st.write(f"**Data:** {venda.data_venda}")
+                st.write(f"**Cliente:** {venda.cliente_nome or 'Sem cliente'}")
+                st.write(f"**Forma de Pagamento:** {venda.forma_pagamento}")
             
             with col2:
-                st.write(f"**Desconto:** R$ {venda[2]:.2f}")
-                st.write(f"**Total:** R$ {venda[1]:.2f}")
+                st.write(f"**Desconto:** R$ {venda.desconto:.2f}")
+                st.write(f"**Total:** R$ {venda.total:.2f}")
             
             # Itens da venda
             if itens:
                 st.subheader("Itens da Venda")
                 
-                df_itens = pd.DataFrame(itens, columns=[
-                    'ID', 'Venda_ID', 'Produto_ID', 'Quantidade', 
-                    'Preço_Unitário', 'Subtotal', 'Produto_Nome'
-                ])
+                df_itens = tabela(itens, {
+                    'produto_nome': 'Produto_Nome', 'quantidade': 'Quantidade',
+                    'preco_unitario': 'Preço_Unitário', 'subtotal': 'Subtotal'
+                })
                 
-                st.dataframe(
-                    df_itens[['Produto_Nome', 'Quantidade', 'Preço_Unitário', 'Subtotal']],
-                    use_container_width=True
-                )
+                st.dataframe(df_itens, use_container_width=True)
         else:
             st.error("❌ Venda não encontrada!")
 
@@ -893,7 +975,11 @@ def mostrar_agendamentos():
     """Página de agendamentos"""
     st.header("📅 Agendamentos e Serviços")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📅 Novo Agendamento", "📋 Lista de Agendamentos", "✅ Atualizar Status", "🛠️ Tipos de Serviços"])
+    # Horizonte das séries recorrentes avança a cada visita; em dia, é só uma leitura em cache
+    managers['agendamento_manager'].gerar_ocorrencias()
+    
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📅 Novo Agendamento", "📋 Lista de Agendamentos", "✅ Atualizar Status",
+                                            "🔁 Séries Recorrentes", "🛠️ Tipos de Serviços"])
     
     with tab1:
         novo_agendamento_web()
@@ -905,6 +991,9 @@ def mostrar_agendamentos():
         atualizar_status_web()
     
     with tab4:
+        series_agendamento_web()
+    
+    with tab5:
         tipos_servicos_web()
 
 def novo_agendamento_web():
@@ -917,9 +1006,13 @@ def novo_agendamento_web():
         st.warning("⚠️ É necessário cadastrar clientes antes de criar agendamentos!")
         return
     
-    with st.form("form_agendamento"):
+    # Cliente, pet, serviço e semana ficam fora do formulário: mudar qualquer um
+    # atualiza na hora os pets do cliente e os horários livres
+    col1, col2 = st.columns(2)
+    
+    with col1:
         # Seleção de cliente
-        cliente_opcoes = {f"{c[1]} - {c[3] if c[3] else 'Sem telefone'}": c[0] for c in clientes}
+        cliente_opcoes = {f"{c.nome} - {c.telefone or 'Sem telefone'}": c.id for c in clientes}
         cliente_selecionado = st.selectbox("👤 Cliente *", list(cliente_opcoes.keys()))
         cliente_id = cliente_opcoes[cliente_selecionado]
         
@@ -928,28 +1021,43 @@ def novo_agendamento_web():
         
         if not pets_cliente:
             st.warning(f"⚠️ Este cliente não possui pets cadastrados!")
-            st.form_submit_button("❌ Cancelar")
             return
         
         # Seleção de pet
-        pet_opcoes = {f"{p[1]} ({p[3]})": p[0] for p in pets_cliente}
+        pet_opcoes = {f"{p.nome} ({p.especie})": p.id for p in pets_cliente}
         pet_selecionado = st.selectbox("🐕 Pet *", list(pet_opcoes.keys()))
         pet_id = pet_opcoes[pet_selecionado]
-        
+    
+    with col2:
         # Seleção de serviço
         servicos = managers['agendamento_manager'].listar_tipos_servicos()
-        servico_opcoes = {f"{s[1]} - R${s[2]:.2f}": s[0] for s in servicos}
+        servico_opcoes = {f"{s.nome} - R${s.preco_base:.2f} ({s.duracao_minutos or '?'} min)": s.id
+                          for s in servicos}
         servico_selecionado = st.selectbox("🛠️ Serviço *", list(servico_opcoes.keys()))
         tipo_servico_id = servico_opcoes[servico_selecionado]
         
-        # Data e hora
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            data_agendamento = st.date_input("📅 Data *", min_value=date.today())
-        
-        with col2:
-            hora_agendamento = st.time_input("🕐 Hora *", value=datetime.now().time())
+        semana_inicio = st.date_input("📅 Semana a partir de *", min_value=date.today())
+    
+    # Horários livres da semana inteira, calculados de uma vez
+    slots = managers['agendamento_manager'].slots_livres(semana_inicio, tipo_servico_id)
+    
+    st.markdown("**🕐 Horários livres**")
+    colunas_dias = st.columns(len(slots))
+    for coluna, (dia, horarios) in zip(colunas_dias, slots.items()):
+        with coluna:
+            st.caption(dia.strftime('%a %d/%m'))
+            st.write(f"{len(horarios)} livre(s)")
+    
+    dias_com_vaga = [dia for dia, horarios in slots.items() if horarios]
+    if not dias_com_vaga:
+        st.warning("⚠️ Nenhum horário livre nesta semana para este serviço. Escolha outra semana.")
+        return
+    
+    dia_escolhido = st.selectbox("📅 Dia *", dias_com_vaga, format_func=lambda dia: dia.strftime('%d/%m/%Y (%a)'))
+    
+    with st.form("form_agendamento"):
+        data_hora = st.selectbox("🕐 Horário *", slots[dia_escolhido],
+                                 format_func=lambda horario: horario.strftime('%H:%M'))
         
         # Observações
         observacoes = st.text_area("📝 Observações", placeholder="Observações sobre o agendamento")
@@ -958,16 +1066,16 @@ def novo_agendamento_web():
         
         if submitted:
             try:
-                # Combinar data e hora
-                data_hora = datetime.combine(data_agendamento, hora_agendamento)
-                
                 agendamento_id = managers['agendamento_manager'].criar_agendamento(
                     cliente_id, pet_id, tipo_servico_id, data_hora, observacoes if observacoes else None
                 )
                 
                 st.success(f"✅ Agendamento #{agendamento_id} criado com sucesso!")
                 st.success(f"📅 Data: {data_hora.strftime('%d/%m/%Y às %H:%M')}")
-                
+            
+            except ConflitoAgendamentoError as e:
+                # Outra sessão reservou o horário depois que a lista foi montada
+                st.error(f"❌ {e}")
             except Exception as e:
                 st.error(f"❌ Erro ao criar agendamento: {e}")
 
@@ -996,24 +1104,16 @@ def lista_agendamentos_web():
         if st.button("🔄 Atualizar"):
             st.rerun()
     
-    # Buscar agendamentos
-    if data_inicio and data_fim:
-        agendamentos = managers['agendamento_manager'].listar_agendamentos(
-            data_inicio.strftime('%Y-%m-%d'),
-            data_fim.strftime('%Y-%m-%d')
-        )
-    else:
-        agendamentos = managers['agendamento_manager'].listar_agendamentos()
+    # Buscar agendamentos, uma página por vez (período e status filtrados no banco)
+    status = status_filtro if status_filtro != "Todos" else None
+    agendamentos = paginar("agendamentos", lambda apos: managers['agendamento_manager'].listar_pagina(
+        data_inicio, data_fim, apos, TAMANHO_PAGINA, status=status), filtros=(periodo_selecionado, status))
     
     if agendamentos:
-        df = pd.DataFrame(agendamentos, columns=[
-            'ID', 'Cliente_ID', 'Pet_ID', 'Tipo_Servico_ID', 'Data_Agendamento',
-            'Status', 'Preço', 'Observações', 'Criado_em', 'Cliente_Nome', 'Pet_Nome', 'Servico_Nome'
-        ])
-        
-        # Filtrar por status
-        if status_filtro != "Todos":
-            df = df[df['Status'] == status_filtro]
+        df = tabela(agendamentos, {
+            'id': 'ID', 'data_agendamento': 'Data_Agendamento', 'cliente_nome': 'Cliente_Nome',
+            'pet_nome': 'Pet_Nome', 'servico_nome': 'Servico_Nome', 'status': 'Status', 'preco': 'Preço'
+        })
         
         # Formatar data
         df['Data_Hora'] = pd.to_datetime(df['Data_Agendamento']).dt.strftime('%d/%m/%Y %H:%M')
@@ -1038,22 +1138,30 @@ def lista_agendamentos_web():
             use_container_width=True
         )
         
-        # Estatísticas
+        # Estatísticas de todos os agendamentos do filtro, não só da página
+        inicio, fim = intervalo_datas(data_inicio, data_fim) if data_inicio and data_fim else (None, None)
+        total_agendamentos, agendados_hoje, receita_total, concluidos = managers['db'].execute_query('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(data_agendamento >= ? AND data_agendamento < ?), 0),
+                   COALESCE(SUM(preco), 0),
+                   COALESCE(SUM(status = 'concluido'), 0)
+            FROM agendamentos
+            WHERE (? IS NULL OR data_agendamento >= ?) AND (? IS NULL OR data_agendamento < ?)
+              AND (? IS NULL OR status = ?)
+        ''', (*intervalo_datas(date.today()), inicio, inicio, fim, fim, status, status))[0]
+        
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total de Agendamentos", len(df))
+            st.metric("Total de Agendamentos", total_agendamentos)
         
         with col2:
-            agendados_hoje = len(df[df['Data_Agendamento'].str.contains(date.today().strftime('%Y-%m-%d'))])
             st.metric("Agendamentos Hoje", agendados_hoje)
         
         with col3:
-            receita_total = df['Preço'].sum()
             st.metric("Receita Total", f"R$ {receita_total:.2f}")
         
         with col4:
-            concluidos = len(df[df['Status'] == 'concluido'])
             st.metric("Concluídos", concluidos)
     else:
         st.info("Nenhum agendamento encontrado")
@@ -1063,21 +1171,12 @@ def atualizar_status_web():
     st.subheader("✅ Atualizar Status do Agendamento")
     
     # Buscar agendamentos pendentes
-    agendamentos = managers['db'].execute_query('''
-        SELECT a.id, a.data_agendamento, a.status, c.nome as cliente_nome, 
-               p.nome as pet_nome, ts.nome as servico_nome
-        FROM agendamentos a
-        JOIN clientes c ON a.cliente_id = c.id
-        JOIN pets p ON a.pet_id = p.id
-        JOIN tipos_servicos ts ON a.tipo_servico_id = ts.id
-        WHERE a.status != 'concluido' AND a.status != 'cancelado'
-        ORDER BY a.data_agendamento
-    ''')
+    agendamentos = managers['agendamento_manager'].listar_pendentes()
     
     if agendamentos:
         # Seleção de agendamento
         agendamento_opcoes = {
-            f"#{a[0]} - {a[3]} - {a[4]} - {a[1][:16]}": a[0] 
+            f"#{a.id} - {a.cliente_nome} - {a.pet_nome} - {a.data_agendamento[:16]}": a.id
             for a in agendamentos
         }
         
@@ -1089,15 +1188,15 @@ def atualizar_status_web():
         agendamento_id = agendamento_opcoes[agendamento_selecionado]
         
         # Buscar dados do agendamento
-        agendamento_atual = next(a for a in agendamentos if a[0] == agendamento_id)
+        agendamento_atual = next(a for a in agendamentos if a.id == agendamento_id)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            st.info(f"**Status Atual:** {agendamento_atual[2]}")
-            st.write(f"**Cliente:** {agendamento_atual[3]}")
-            st.write(f"**Pet:** {agendamento_atual[4]}")
-            st.write(f"**Serviço:** {agendamento_atual[5]}")
+            st.info(f"**Status Atual:** {agendamento_atual.status}")
+            st.write(f"**Cliente:** {agendamento_atual.cliente_nome}")
+            st.write(f"**Pet:** {agendamento_atual.pet_nome}")
+            st.write(f"**Serviço:** {agendamento_atual.servico_nome}")
         
         with col2:
             status_opcoes = {
@@ -1113,7 +1212,7 @@ def atualizar_status_web():
                 "Novo Status:",
                 list(status_opcoes.keys()),
                 format_func=lambda x: status_opcoes[x],
-                index=list(status_opcoes.keys()).index(agendamento_atual[2])
+                index=list(status_opcoes.keys()).index(agendamento_atual.status)
             )
         
         if st.button("💾 Atualizar Status", type="primary"):
@@ -1128,6 +1227,94 @@ def atualizar_status_web():
     else:
         st.info("Nenhum agendamento pendente encontrado")
 
+def series_agendamento_web():
+    """Séries de agendamentos recorrentes"""
+    st.subheader("🔁 Séries Recorrentes")
+    
+    clientes = managers['cliente_manager'].listar_todos()
+    if not clientes:
+        st.warning("⚠️ É necessário cadastrar clientes antes de criar séries!")
+        return
+    
+    with st.expander("➕ Nova Série"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            cliente_opcoes = {f"{c.nome} - {c.telefone or 'Sem telefone'}": c.id for c in clientes}
+            cliente_id = cliente_opcoes[st.selectbox("👤 Cliente *", list(cliente_opcoes.keys()), key="serie_cliente")]
+            
+            pets_cliente = managers['pet_manager'].listar_por_cliente(cliente_id)
+            if not pets_cliente:
+                st.warning("⚠️ Este cliente não possui pets cadastrados!")
+                return
+            pet_opcoes = {f"{p.nome} ({p.especie})": p.id for p in pets_cliente}
+            pet_id = pet_opcoes[st.selectbox("🐕 Pet *", list(pet_opcoes.keys()), key="serie_pet")]
+            
+            servicos = managers['agendamento_manager'].listar_tipos_servicos()
+            servico_opcoes = {f"{s.nome} - R${s.preco_base:.2f}": s.id for s in servicos}
+            tipo_servico_id = servico_opcoes[st.selectbox("🛠️ Serviço *", list(servico_opcoes.keys()), key="serie_servico")]
+        
+        with col2:
+            primeira_data = st.date_input("📅 Primeira data *", min_value=date.today(), key="serie_data")
+            horario = st.time_input("🕐 Horário *", value=datetime.strptime("09:00", "%H:%M").time(), key="serie_hora")
+            intervalo_dias = st.number_input("🔁 Repetir a cada (dias) *", min_value=1, value=15)
+            
+            termino = st.radio("Termina", ["Nunca", "Em uma data", "Depois de N vezes"], horizontal=True)
+            data_limite = st.date_input("Última data", min_value=primeira_data) if termino == "Em uma data" else None
+            ocorrencias = st.number_input("Vezes", min_value=1, value=10) if termino == "Depois de N vezes" else None
+        
+        observacoes = st.text_input("📝 Observações", key="serie_observacoes")
+        
+        if st.button("✅ Criar Série", type="primary"):
+            try:
+                serie_id, criados, conflitos = managers['agendamento_manager'].criar_serie(
+                    cliente_id, pet_id, tipo_servico_id, datetime.combine(primeira_data, horario),
+                    int(intervalo_dias), data_limite, int(ocorrencias) if ocorrencias else None,
+                    observacoes if observacoes else None
+                )
+                st.success(f"✅ Série #{serie_id} criada com {criados} agendamento(s) "
+                           f"nos próximos {HORIZONTE_SERIES_DIAS} dias!")
+                for _, data_hora in conflitos:
+                    st.warning(f"⚠️ {data_hora.strftime('%d/%m/%Y %H:%M')} pulado: horário sem vaga")
+            except Exception as e:
+                st.error(f"❌ Erro ao criar série: {e}")
+    
+    series = managers['agendamento_manager'].listar_series()
+    if not series:
+        st.info("Nenhuma série ativa")
+        return
+    
+    df = tabela(series, {
+        'id': 'ID', 'cliente_nome': 'Cliente', 'pet_nome': 'Pet', 'servico_nome': 'Serviço',
+        'inicio': 'Início', 'intervalo_dias': 'A cada (dias)', 'data_limite': 'Até', 'ocorrencias': 'Vezes'
+    })
+    st.dataframe(df, use_container_width=True)
+    
+    # Alterações valem para todas as ocorrências futuras de uma vez
+    serie_opcoes = {f"#{s.id} - {s.cliente_nome} - {s.pet_nome} - {s.servico_nome}": s.id for s in series}
+    serie_id = serie_opcoes[st.selectbox("🔁 Série:", list(serie_opcoes.keys()))]
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        novo_horario = st.time_input("🕐 Novo horário das próximas ocorrências", key="serie_novo_horario")
+        if st.button("🕐 Remarcar Próximas"):
+            try:
+                alterados = managers['agendamento_manager'].atualizar_serie(serie_id, horario=novo_horario)
+                st.success(f"✅ {alterados} agendamento(s) remarcado(s)!")
+            except ConflitoAgendamentoError as e:
+                st.error(f"❌ {e}")
+            except Exception as e:
+                st.error(f"❌ Erro ao remarcar série: {e}")
+    
+    with col2:
+        if st.button("🚫 Cancelar Série"):
+            try:
+                cancelados = managers['agendamento_manager'].cancelar_serie(serie_id)
+                st.success(f"✅ Série cancelada: {cancelados} agendamento(s) futuro(s) cancelado(s)!")
+            except Exception as e:
+                st.error(f"❌ Erro ao cancelar série: {e}")
+
 def tipos_servicos_web():
     """Lista de tipos de serviços"""
     st.subheader("🛠️ Tipos de Serviços")
@@ -1135,9 +1322,10 @@ def tipos_servicos_web():
     servicos = managers['agendamento_manager'].listar_tipos_servicos()
     
     if servicos:
-        df = pd.DataFrame(servicos, columns=[
-            'ID', 'Nome', 'Preço_Base', 'Duração_Minutos', 'Descrição', 'Criado_em'
-        ])
+        df = tabela(servicos, {
+            'id': 'ID', 'nome': 'Nome', 'preco_base': 'Preço_Base',
+            'duracao_minutos': 'Duração_Minutos', 'recurso': 'Recurso', 'descricao': 'Descrição'
+        })
         
         # Formatar duração
         df['Duração'] = df['Duração_Minutos'].apply(
@@ -1145,7 +1333,7 @@ def tipos_servicos_web():
         )
         
         st.dataframe(
-            df[['ID', 'Nome', 'Preço_Base', 'Duração', 'Descrição']],
+            df[['ID', 'Nome', 'Preço_Base', 'Duração', 'Recurso', 'Descrição']],
             use_container_width=True
         )
     else:
@@ -1155,7 +1343,7 @@ def mostrar_relatorios():
     """Página de relatórios com gráficos"""
     st.header("📊 Relatórios e Análises")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📈 Vendas", "📦 Estoque", "👥 Clientes", "🐕 Pets"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Vendas", "📦 Estoque", "👥 Clientes", "🐕 Pets", "⏱️ Consultas"])
     
     with tab1:
         relatorios_vendas()
@@ -1168,6 +1356,9 @@ def mostrar_relatorios():
     
     with tab4:
         relatorios_pets()
+    
+    with tab5:
+        relatorios_consultas()
 
 def relatorios_vendas():
     """Relatórios de vendas"""
@@ -1186,10 +1377,10 @@ def relatorios_vendas():
     vendas_periodo = managers['db'].execute_query('''
         SELECT DATE(data_venda) as data, COUNT(*) as qtd_vendas, SUM(total) as total_vendas
         FROM vendas 
-        WHERE DATE(data_venda) BETWEEN ? AND ?
+        WHERE data_venda >= ? AND data_venda < ?
         GROUP BY DATE(data_venda)
         ORDER BY data
-    ''', (data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d')))
+    ''', intervalo_datas(data_inicio, data_fim))
     
     if vendas_periodo:
         df_vendas = pd.DataFrame(vendas_periodo, columns=['Data', 'Qtd_Vendas', 'Total_Vendas'])
@@ -1242,11 +1433,11 @@ def relatorios_vendas():
             FROM itens_venda iv
             JOIN produtos p ON iv.produto_id = p.id
             JOIN vendas v ON iv.venda_id = v.id
-            WHERE DATE(v.data_venda) BETWEEN ? AND ?
+            WHERE v.data_venda >= ? AND v.data_venda < ?
             GROUP BY p.id, p.nome
             ORDER BY qtd_vendida DESC
             LIMIT 10
-        ''', (data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d')))
+        ''', intervalo_datas(data_inicio, data_fim))
         
         if produtos_vendidos:
             df_produtos = pd.DataFrame(produtos_vendidos, columns=['Produto', 'Quantidade', 'Receita'])
@@ -1278,11 +1469,10 @@ def relatorios_estoque():
     produtos = managers['produto_manager'].listar_todos()
     
     if produtos:
-        df = pd.DataFrame(produtos, columns=[
-            'ID', 'Nome', 'Categoria_ID', 'Preço', 'Estoque_Atual', 
-            'Estoque_Mínimo', 'Código', 'Descrição', 'Marca', 'Peso', 
-            'Unidade', 'Created', 'Updated', 'Categoria'
-        ])
+        df = tabela(produtos, {
+            'nome': 'Nome', 'categoria_nome': 'Categoria', 'preco': 'Preço',
+            'estoque_atual': 'Estoque_Atual', 'estoque_minimo': 'Estoque_Mínimo'
+        })
         
         # Valor do estoque
         df['Valor_Estoque'] = df['Preço'] * df['Estoque_Atual']
@@ -1350,6 +1540,29 @@ def relatorios_estoque():
             orientation='h'
         )
         st.plotly_chart(fig_top_valor, use_container_width=True)
+        
+        # Inventário em uma data passada, a partir dos checkpoints de saldo
+        st.subheader("📅 Inventário em uma Data")
+        
+        fim_mes_anterior = date.today().replace(day=1) - timedelta(days=1)
+        data_inventario = st.date_input("Estoque ao fim do dia:", value=fim_mes_anterior, max_value=date.today())
+        
+        inventario = managers['produto_manager'].inventario_em(data_inventario)
+        if inventario:
+            df_inventario = pd.DataFrame(inventario, columns=['ID', 'Nome', 'Categoria', 'Preço', 'Estoque'])
+            df_inventario['Valor'] = df_inventario['Preço'] * df_inventario['Estoque']
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.metric("Unidades em Estoque", int(df_inventario['Estoque'].sum()))
+            
+            with col2:
+                st.metric("Valor (preços atuais)", f"R$ {df_inventario['Valor'].sum():.2f}")
+            
+            st.dataframe(df_inventario[['Nome', 'Categoria', 'Estoque', 'Valor']], use_container_width=True)
+        else:
+            st.info("Nenhum produto cadastrado até essa data")
     else:
         st.info("Nenhum produto cadastrado")
 
@@ -1387,9 +1600,7 @@ def relatorios_clientes():
             st.metric("Clientes com Múltiplos Pets", multiplos)
         
         # Distribuição por cidade
-        df_clientes = pd.DataFrame(clientes, columns=[
-            'ID', 'Nome', 'CPF', 'Telefone', 'Email', 'Endereço', 'Cidade', 'CEP', 'Criado_em'
-        ])
+        df_clientes = tabela(clientes, {'nome': 'Nome', 'cidade': 'Cidade'})
         
         # Clientes por cidade
         cidades = df_clientes['Cidade'].value_counts().reset_index()
@@ -1445,10 +1656,9 @@ def relatorios_pets():
     pets = managers['pet_manager'].listar_todos()
     
     if pets:
-        df = pd.DataFrame(pets, columns=[
-            'ID', 'Nome', 'Cliente_ID', 'Espécie', 'Raça', 'Idade', 
-            'Peso', 'Cor', 'Observações', 'Criado_em', 'Cliente_Nome', 'Cliente_Telefone'
-        ])
+        df = tabela(pets, {
+            'nome': 'Nome', 'especie': 'Espécie', 'raca': 'Raça', 'idade': 'Idade', 'peso': 'Peso'
+        })
         
         # Métricas gerais
         col1, col2, col3, col4 = st.columns(4)
@@ -1539,5 +1749,78 @@ def relatorios_pets():
     else:
         st.info("Nenhum pet cadastrado")
 
+
+def relatorios_consultas():
+    """Tempo das consultas ao banco desde que o app foi iniciado"""
+    st.subheader("⏱️ Desempenho das Consultas")
+    
+    estatisticas = managers['db'].estatisticas()
+    
+    if estatisticas:
+        df = pd.DataFrame(estatisticas)
+        df['Origem'] = df['chamadores'].apply(lambda c: ', '.join(sorted(c, key=c.get, reverse=True)))
+        
+        # Métricas gerais
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Comandos Distintos", len(df))
+        
+        with col2:
+            st.metric("Execuções", int(df['execucoes'].sum()))
+        
+        with col3:
+            st.metric("Tempo Total no Banco", f"{df['tempo_total_ms'].sum():.0f} ms")
+        
+        # Consultas mais custosas
+        st.dataframe(
+            df[['sql', 'Origem', 'execucoes', 'tempo_total_ms', 'tempo_medio_ms', 'tempo_maximo_ms', 'linhas']].rename(columns={
+                'sql': 'SQL', 'execucoes': 'Execuções', 'tempo_total_ms': 'Total (ms)',
+                'tempo_medio_ms': 'Médio (ms)', 'tempo_maximo_ms': 'Máximo (ms)', 'linhas': 'Linhas'
+            }),
+            use_container_width=True
+        )
+        
+        # Histograma de latência somando todos os comandos
+        faixas = pd.DataFrame(list(df['histograma'])).sum().reset_index()
+        faixas.columns = ['Faixa', 'Execuções']
+        
+        fig_faixas = px.bar(
+            faixas, x='Faixa', y='Execuções',
+            title='Distribuição do Tempo das Consultas'
+        )
+        st.plotly_chart(fig_faixas, use_container_width=True)
+        
+        if managers['db'].instrumentacao.limite_lento is not None:
+            st.caption(f"Consultas acima de {managers['db'].instrumentacao.limite_lento * 1000:.0f} ms "
+                       "são gravadas com o plano de execução em consultas_lentas.log, na pasta do banco")
+        
+        if st.button("🔄 Zerar Estatísticas"):
+            managers['db'].instrumentacao.limpar()
+            st.rerun()
+    else:
+        st.info("Nenhuma consulta registrada ainda")
+    
+    cache = managers['db'].estatisticas_cache()
+    if cache:
+        st.subheader("🗃️ Cache de Consultas")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Acertos", cache['acertos'])
+        
+        with col2:
+            st.metric("Falhas", cache['falhas'])
+        
+        with col3:
+            st.metric("Taxa de Acerto", f"{cache['taxa_acerto']:.0%}")
+        
+        with col4:
+            st.metric("Entradas", cache['entradas'], f"{cache['bytes'] / 1024:.0f} KB", delta_color="off")
+        
+        st.caption(f"Invalidações: {cache['invalidacoes']} · Expiradas: {cache['expiradas']} · "
+                   f"Descartadas por limite: {cache['descartadas']}")
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache LRU de resultados de consultas usado pelo DatabaseManager.
+
+Cada entrada guarda as tabelas lidas pela consulta e os contadores de
+alteração dessas tabelas no momento em que foi preenchida; a entrada deixa de
+valer quando alguma dessas tabelas é alterada, quando passa do TTL ou quando
+sai pelo limite de entradas/memória.
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Depois de FROM pode vir uma lista separada por vírgulas (FROM a x, b AS y): a
+# lista inteira é capturada e cada item contribui com o primeiro nome
+_ITEM_TABELA = r'[A-Za-z_]\w*(?:\s+(?:AS\s+)?[A-Za-z_]\w*)?'
+_TABELAS_LIDAS = re.compile(rf'\b(?:FROM|JOIN)\s+({_ITEM_TABELA}(?:\s*,\s*{_ITEM_TABELA})*)', re.IGNORECASE)
+_TABELA_ESCRITA = re.compile(
+    r'^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+([A-Za-z_]\w*)',
+    re.IGNORECASE)
+
+def tabelas_lidas(query):
+    """Tabelas que aparecem em FROM/JOIN de uma consulta (inclusive em subconsultas)"""
+    return frozenset(item.split()[0].lower()
+                     for lista in _TABELAS_LIDAS.findall(query)
+                     for item in lista.split(','))
+
+def tabela_escrita(query):
+    """Tabela alterada por um INSERT/UPDATE/DELETE, ou None"""
+    encontrada = _TABELA_ESCRITA.match(query)
+    return encontrada.group(1).lower() if encontrada else None
+
+def tamanho_aproximado(resultado):
+    """Estimativa em bytes da memória ocupada por uma lista de linhas"""
+    total = sys.getsizeof(resultado)
+    for linha in resultado:
+        total += sys.getsizeof(linha)
+        for valor in linha:
+            total += sys.getsizeof(valor)
+    return total
+
+class _Entrada:
+    """Um resultado guardado e o que é preciso para saber se ele ainda vale"""
+    
+    __slots__ = ('resultado', 'tabelas', 'marcas', 'expira_em', 'tamanho')
+    
+    def __init__(self, resultado, tabelas, marcas, expira_em, tamanho):
+        self.resultado = resultado
+        self.tabelas = tabelas
+        self.marcas = marcas
+        self.expira_em = expira_em
+        self.tamanho = tamanho
+
+class CacheConsultas:
+    """Resultados de consultas em memória, com LRU, TTL e limite de memória"""
+    
+    def __init__(self, max_entradas=256, max_bytes=16 * 1024 * 1024, ttl=300.0):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._por_tabela = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.expiradas = 0
+        self.descartadas = 0
+    
+    def obter(self, chave, marcas_atuais):
+        """Resultado guardado para a chave, ou None se não houver ou não valer mais
+        
+        marcas_atuais é uma função que recebe as tabelas e devolve os contadores
+        de alteração atuais delas.
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None
+            
+            if entrada.expira_em < time.monotonic():
+                self._remover(chave)
+                self.expiradas += 1
+                self.falhas += 1
+                return None
+        
+        # Os contadores podem exigir uma consulta ao banco: feito fora do lock
+        atuais = marcas_atuais(entrada.tabelas)
+        
+        with self._lock:
+            if any(atuais.get(tabela) != entrada.marcas.get(tabela) for tabela in entrada.tabelas):
+                if self._entradas.get(chave) is entrada:
+                    self._remover(chave)
+                self.invalidacoes += 1
+                self.falhas += 1
+                return None
+            
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada.resultado
+    
+    def guardar(self, chave, resultado, tabelas, marcas):
+        """Guarda um resultado com as tabelas lidas e os contadores delas no momento da leitura"""
+        tamanho = tamanho_aproximado(resultado)
+        if tamanho > self.max_bytes:
+            return
+        
+        entrada = _Entrada(resultado, tabelas, marcas, time.monotonic() + self.ttl, tamanho)
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = entrada
+            self._bytes += tamanho
+            for tabela in tabelas:
+                self._por_tabela.setdefault(tabela, set()).add(chave)
+            
+            # Descarta as menos usadas até caber nos limites
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                self._remover(next(iter(self._entradas)))
+                self.descartadas += 1
+    
+    def invalidar_tabelas(self, tabelas):
+        """Remove todas as entradas que leem alguma das tabelas"""
+        with self._lock:
+            for tabela in tabelas:
+                for chave in list(self._por_tabela.get(tabela, ())):
+                    self._remover(chave)
+                    self.invalidacoes += 1
+    
+    def limpar(self):
+        """Esvazia o cache (os contadores de acertos e falhas são mantidos)"""
+        with self._lock:
+            self._entradas.clear()
+            self._por_tabela.clear()
+            self._bytes = 0
+    
+    def _remover(self, chave):
+        """Tira uma entrada do cache e dos índices por tabela (chamar com o lock)"""
+        entrada = self._entradas.pop(chave)
+        self._bytes -= entrada.tamanho
+        for tabela in entrada.tabelas:
+            chaves = self._por_tabela.get(tabela)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tabela[tabela]
+    
+    def estatisticas(self):
+        """Acertos, falhas e ocupação atual do cache"""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'invalidacoes': self.invalidacoes,
+                'expiradas': self.expiradas,
+                'descartadas': self.descartadas,
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Catálogo em memória de códigos de barras para o caixa.
+
+Guarda, para cada produto com código de barras, id, nome, preço, estoque e
+versão em colunas compactas (array) e um dicionário código → posição. Uma
+leitura no caixa é só um acesso ao dicionário; o catálogo confere se houve
+alteração em produtos no máximo uma vez por intervalo e, se houve, traz do
+banco apenas os produtos com seq (produtos_alteracoes) maior que o último
+visto. Só uma exclusão de produto (contador próprio) faz recarregar tudo.
+"""
+
+import threading
+import time
+import weakref
+from array import array
+from collections import namedtuple
+from database import CONTADOR_EXCLUSOES_PRODUTOS
+
+# Produto como o caixa precisa dele; versao é a da linha no momento da leitura
+ItemCatalogo = namedtuple('ItemCatalogo', ['id', 'codigo_barras', 'nome', 'preco', 'estoque_atual', 'versao'])
+
+class CatalogoCodigos:
+    """Código de barras → produto, atualizado de forma incremental"""
+    
+    _COLUNAS = 'id, codigo_barras, nome, preco, estoque_atual, versao'
+    
+    def __init__(self, db, intervalo_verificacao=1.0):
+        self.db = db
+        self.intervalo_verificacao = intervalo_verificacao
+        self._lock = threading.Lock()
+        self._carregado = False
+        self._proxima_verificacao = 0.0
+        self._marca = None
+        self._ultimo_seq = 0
+        self._limpar()
+    
+    def _limpar(self):
+        """Esvazia as colunas e os índices"""
+        self._posicoes = {}
+        self._posicao_por_id = {}
+        self._ids = array('q')
+        self._precos = array('d')
+        self._estoques = array('q')
+        self._versoes = array('q')
+        self._nomes = []
+        self._codigos = []
+    
+    def buscar(self, codigo_barras):
+        """Produto (ItemCatalogo) com o código de barras, ou None"""
+        codigo = str(codigo_barras).strip()
+        self._atualizar_se_preciso()
+        with self._lock:
+            posicao = self._posicoes.get(codigo)
+            if posicao is None:
+                return None
+            return ItemCatalogo(self._ids[posicao], codigo, self._nomes[posicao], self._precos[posicao],
+                                self._estoques[posicao], self._versoes[posicao])
+    
+    def __len__(self):
+        return len(self._posicoes)
+    
+    def _atualizar_se_preciso(self):
+        """Carrega ou atualiza o catálogo se o intervalo de verificação já passou"""
+        agora = time.monotonic()
+        if self._carregado and agora < self._proxima_verificacao:
+            return
+        
+        with self._lock:
+            if self._carregado and agora < self._proxima_verificacao:
+                return
+            # A marca é lida antes das linhas: o que for gravado no meio aparece na próxima verificação
+            marca = self.db.marca_alteracoes()
+            alteradas = self.db.alteracoes_desde(self._marca, {'produtos', CONTADOR_EXCLUSOES_PRODUTOS})
+            if not self._carregado or CONTADOR_EXCLUSOES_PRODUTOS in alteradas:
+                # Exclusões não deixam linha para trás: só recarregando tudo
+                self._carregar_tudo()
+            elif alteradas:
+                self._atualizar_alterados()
+            self._marca = marca
+            self._carregado = True
+            self._proxima_verificacao = agora + self.intervalo_verificacao
+    
+    def _carregar_tudo(self):
+        """Lê todos os produtos com código de barras"""
+        self._limpar()
+        # seq lido antes das linhas: o que for gravado no meio é relido na próxima atualização
+        self._ultimo_seq = self.db.execute_query('SELECT COALESCE(MAX(seq), 0) FROM produtos_alteracoes')[0][0]
+        for lote in self.db.iter_query(f'SELECT {self._COLUNAS} FROM produtos WHERE codigo_barras IS NOT NULL'):
+            for linha in lote:
+                self._gravar(linha)
+    
+    def _atualizar_alterados(self):
+        """Traz só os produtos alterados desde a última leitura"""
+        colunas = ', '.join(f'p.{coluna}' for coluna in self._COLUNAS.split(', '))
+        alterados = self.db.execute_query(f'''
+            SELECT a.seq, {colunas}
+            FROM produtos_alteracoes a
+            JOIN produtos p ON p.id = a.produto_id
+            WHERE a.seq > ?
+        ''', (self._ultimo_seq,))
+        for seq, *linha in alterados:
+            self._ultimo_seq = max(self._ultimo_seq, seq)
+            self._gravar(linha)
+    
+    def _gravar(self, linha):
+        """Insere ou atualiza um produto nas colunas (chamar com o lock)"""
+        produto_id, codigo, nome, preco, estoque, versao = linha
+        
+        posicao = self._posicao_por_id.get(produto_id)
+        if posicao is None:
+            if codigo is None:
+                return
+            posicao = len(self._ids)
+            self._posicao_por_id[produto_id] = posicao
+            self._ids.append(produto_id)
+            self._precos.append(preco)
+            self._estoques.append(estoque)
+            self._versoes.append(versao)
+            self._nomes.append(nome)
+            self._codigos.append(codigo)
+        else:
+            antigo = self._codigos[posicao]
+            if antigo != codigo and self._posicoes.get(antigo) == posicao:
+                del self._posicoes[antigo]
+            self._precos[posicao] = preco
+            self._estoques[posicao] = estoque
+            self._versoes[posicao] = versao
+            self._nomes[posicao] = nome
+            self._codigos[posicao] = codigo
+        
+        if codigo is not None:
+            self._posicoes[codigo] = posicao
+
+# Um catálogo por DatabaseManager, compartilhado por todo o processo
+_catalogos = weakref.WeakKeyDictionary()
+_lock_catalogos = threading.Lock()
+
+def catalogo_de(db):
+    """Catálogo de códigos de barras do banco (criado na primeira chamada)"""
+    with _lock_catalogos:
+        catalogo = _catalogos.get(db)
+        if catalogo is None:
+            catalogo = _catalogos[db] = CatalogoCodigos(db)
+        return catalogo
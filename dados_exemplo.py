@@ -10,13 +10,15 @@ from database import DatabaseManager
 from models import Produto, Cliente, Pet, Categoria
 from datetime import datetime, timedelta
 
-def inserir_dados_exemplo():
+def inserir_dados_exemplo(db=None):
     """Insere dados de exemplo no sistema"""
     
     print("🐾 Inserindo dados de exemplo no Sistema PetShop...")
     
     # Inicializar managers
-    db = DatabaseManager()
+    proprio_db = db is None
+    if proprio_db:
+        db = DatabaseManager()
     produto_manager = Produto(db)
     cliente_manager = Cliente(db)
     pet_manager = Pet(db)
@@ -74,8 +76,7 @@ def inserir_dados_exemplo():
             ("Casinha Plástica G", cat_cama_id, 156.00, 4, 1, "7891000005235", "Casinha resistente para externos", "Igloo", 3.5, "un"),
         ]
         
-        for produto_data in produtos_exemplo:
-            produto_manager.adicionar(*produto_data)
+        produto_manager.adicionar_varios(produtos_exemplo)
         
         # 2. CLIENTES DE EXEMPLO
         print("👥 Adicionando clientes...")
@@ -91,10 +92,7 @@ def inserir_dados_exemplo():
             ("Bruno Ferreira Lima", "369.147.258-08", "(11) 22222-8888", "bruno.ferreira@email.com", "Av. das Estrelas, 753", "São Paulo", "01234-574"),
         ]
         
-        cliente_ids = []
-        for cliente_data in clientes_exemplo:
-            cliente_id = cliente_manager.adicionar(*cliente_data)
-            cliente_ids.append(cliente_id)
+        cliente_ids = cliente_manager.adicionar_varios(clientes_exemplo)
         
         # 3. PETS DE EXEMPLO
         print("🐕 Adicionando pets...")
@@ -129,8 +127,7 @@ def inserir_dados_exemplo():
             ("Max", cliente_ids[7], "Cão", "Labrador", 1, 12.0, "Amarelo", "Ainda filhote, muito enérgico"),
         ]
         
-        for pet_data in pets_exemplo:
-            pet_manager.adicionar(*pet_data)
+        pet_manager.adicionar_varios(pets_exemplo)
         
         print("✅ Dados de exemplo inseridos com sucesso!")
         print("\n📊 Resumo dos dados inseridos:")
@@ -147,6 +144,9 @@ def inserir_dados_exemplo():
         
     except Exception as e:
         print(f"❌ Erro ao inserir dados: {e}")
+    finally:
+        if proprio_db:
+            db.close()
 
 if __name__ == "__main__":
     inserir_dados_exemplo() 
\ No newline at end of file
@@ -1,215 +1,733 @@
 import sqlite3
+import itertools
 import os
-from datetime import datetime
+import pathlib
+import queue
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from instrumentacao import Instrumentacao, identificar_chamador
+from cache_consultas import CacheConsultas, tabelas_lidas, tabela_escrita
+
+# Índices secundários usados pelas consultas mais frequentes (nome, tabela, colunas),
+# criados pela migração 3. Índices novos entram por uma nova migração.
+INDICES = [
+    ('idx_vendas_data_venda', 'vendas', 'data_venda'),
+    ('idx_vendas_cliente_id', 'vendas', 'cliente_id'),
+    ('idx_itens_venda_venda_id', 'itens_venda', 'venda_id, produto_id'),
+    ('idx_itens_venda_produto_id', 'itens_venda', 'produto_id'),
+    ('idx_agendamentos_data', 'agendamentos', 'data_agendamento'),
+    ('idx_agendamentos_status', 'agendamentos', 'status, data_agendamento'),
+    ('idx_pets_cliente_id', 'pets', 'cliente_id, nome'),
+    ('idx_pets_nome', 'pets', 'nome'),
+    ('idx_clientes_nome', 'clientes', 'nome'),
+    ('idx_movimentacoes_produto_id', 'movimentacoes_estoque', 'produto_id'),
+    ('idx_produtos_nome', 'produtos', 'nome'),
+]
+
+# Perfis de PRAGMAs aplicados a cada conexão nova do pool. Em WAL leitores não
+# bloqueiam o escritor (e vice-versa), o que importa com várias sessões do app
+# abertas ao mesmo tempo. cache_size negativo é em KiB.
+PERFIS_PRAGMA = {
+    # Equilíbrio para o uso normal da loja: synchronous=NORMAL é seguro em WAL
+    # (uma queda de energia pode perder só as últimas transações, sem corromper)
+    'padrao': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    },
+    # Cada COMMIT espera o fsync do WAL
+    'seguro': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    },
+    # Relatórios pesados e importações em lote: mais cache e mmap
+    'relatorios': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 60000,
+    },
+    # Comportamento antigo (journal de rollback), para bancos em pasta de rede
+    'compatibilidade': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 30000,
+    },
+}
+
+def normalizar_nome(texto):
+    """Texto em minúsculas, sem acentos e com espaços simples, para buscas"""
+    if not texto:
+        return None
+    sem_acentos = ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+def somente_digitos(texto):
+    """Só os dígitos de um telefone, CPF ou CEP ('123.456.789-00' vira '12345678900')"""
+    if not texto:
+        return None
+    return ''.join(c for c in str(texto) if c.isdigit()) or None
+
+def _como_data(valor):
+    """Normaliza date, datetime ou texto 'AAAA-MM-DD' para date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor)[:10], '%Y-%m-%d').date()
+
+def intervalo_datas(data_inicio, data_fim=None):
+    """Converte um período de dias corridos em limites semiabertos [início, fim)
+    
+    Os dois valores retornados são usados como `coluna >= ? AND coluna < ?`,
+    que permite ao SQLite percorrer só a faixa do índice da coluna, ao contrário
+    de `DATE(coluna) BETWEEN ? AND ?`. Sem data_fim, o período é só o dia inicial.
+    """
+    inicio = _como_data(data_inicio)
+    fim = _como_data(data_fim) if data_fim else inicio
+    return inicio.strftime('%Y-%m-%d'), (fim + timedelta(days=1)).strftime('%Y-%m-%d')
+
+def intervalo_mes(referencia=None):
+    """Limites semiabertos [primeiro dia do mês, primeiro dia do mês seguinte)"""
+    inicio = _como_data(referencia) if referencia else date.today()
+    inicio = inicio.replace(day=1)
+    proximo = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio.strftime('%Y-%m-%d'), proximo.strftime('%Y-%m-%d')
+
+def fabrica_registro(tipo):
+    """Row factory do sqlite3 que monta cada linha como um registro do tipo dado (namedtuple)"""
+    construir = tipo._make
+    
+    def fabrica(cursor, linha):
+        return construir(linha)
+    
+    return fabrica
+
+class ConnectionPool:
+    """Pool de conexões SQLite reaproveitadas entre consultas e threads"""
+    
+    def __init__(self, db_name, tamanho=5, timeout=30.0, pragmas=None, somente_leitura=False):
+        self.db_name = db_name
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.pragmas = pragmas or {}
+        self.somente_leitura = somente_leitura
+        self._disponiveis = queue.LifoQueue(maxsize=tamanho)
+        self._criadas = 0
+        self._lock = threading.Lock()
+        self._fechado = False
+    
+    def _criar_conexao(self):
+        """Abre uma nova conexão que pode ser usada por qualquer thread do pool"""
+        # isolation_level=None: o DatabaseManager controla BEGIN/COMMIT explicitamente
+        if self.somente_leitura:
+            # mode=ro: o arquivo é aberto só para leitura; query_only barra até escritas em tabelas temporárias
+            uri = pathlib.Path(self.db_name).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute('PRAGMA query_only = ON')
+        else:
+            conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False,
+                                   isolation_level=None)
+        
+        for nome, valor in self.pragmas.items():
+            # O modo de journal é do arquivo; quem abre só para leitura não pode mudá-lo
+            if self.somente_leitura and nome == 'journal_mode':
+                continue
+            conn.execute(f'PRAGMA {nome} = {valor}')
+        return conn
+    
+    def _conexao_saudavel(self, conn):
+        """Verifica se a conexão ainda responde antes de entregá-la"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def obter(self):
+        """Retira uma conexão do pool, criando uma nova se houver espaço"""
+        if self._fechado:
+            raise sqlite3.ProgrammingError('O pool de conexões já foi encerrado')
+        
+        try:
+            conn = self._disponiveis.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                pode_criar = self._criadas < self.tamanho
+                if pode_criar:
+                    self._criadas += 1
+            if pode_criar:
+                try:
+                    return self._criar_conexao()
+                except Exception:
+                    with self._lock:
+                        self._criadas -= 1
+                    raise
+            try:
+                conn = self._disponiveis.get(timeout=self.timeout)
+            except queue.Empty:
+                raise sqlite3.OperationalError('Nenhuma conexão disponível no pool')
+        
+        if not self._conexao_saudavel(conn):
+            self._descartar(conn)
+            conn = self._criar_conexao()
+            with self._lock:
+                self._criadas += 1
+        return conn
+    
+    def devolver(self, conn):
+        """Devolve a conexão ao pool, desfazendo qualquer transação pendente"""
+        if self._fechado:
+            self._descartar(conn)
+            return
+        
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._descartar(conn)
+            return
+        
+        try:
+            self._disponiveis.put_nowait(conn)
+        except queue.Full:
+            self._descartar(conn)
+    
+    def _descartar(self, conn):
+        """Fecha uma conexão que não volta mais para o pool"""
+        with self._lock:
+            self._criadas -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def fechar(self):
+        """Fecha todas as conexões ociosas e impede novos empréstimos"""
+        self._fechado = True
+        while True:
+            try:
+                conn = self._disponiveis.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conn)
+
+class _BlocoDesfeito(Exception):
+    """Sinaliza à thread de escrita que o bloco emprestado levantou uma exceção"""
+
+class WriteQueue:
+    """Thread única de escrita que agrupa as tarefas da fila em commits coletivos
+    
+    Cada tarefa é uma função que recebe a conexão de escrita. As tarefas que se
+    acumulam enquanto um COMMIT está em andamento entram juntas na próxima
+    transação (group commit), cada uma isolada em um SAVEPOINT: a falha de uma
+    não desfaz as outras. O Future de cada tarefa só é resolvido depois do COMMIT.
+    Blocos transaction() de outras threads também viram tarefas (emprestar()).
+    """
+    
+    _PARAR = object()
+    
+    def __init__(self, conn, local, lote_maximo=64):
+        self.conn = conn
+        self.lote_maximo = lote_maximo
+        self._local = local
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._executar, name='petshop-escritor', daemon=True)
+        self._thread.start()
+    
+    def submeter(self, funcao):
+        """Enfileira uma tarefa de escrita e devolve o Future com o resultado dela"""
+        futuro = Future()
+        self._fila.put((funcao, futuro))
+        return futuro
+    
+    @contextmanager
+    def emprestar(self):
+        """Roda o corpo do bloco, na thread de quem chamou, como uma tarefa da fila
+        
+        A tarefa abre o SAVEPOINT e fica parada enquanto o bloco usa a conexão de
+        escrita; ao fim do bloco ela termina (ou é desfeita, se o bloco levantou
+        uma exceção) e a saída do bloco espera o COMMIT do lote.
+        """
+        pronto = threading.Event()
+        terminado = threading.Event()
+        falhou = []
+        
+        def tarefa(conn):
+            pronto.set()
+            terminado.wait()
+            if falhou:
+                raise _BlocoDesfeito()
+        
+        futuro = self.submeter(tarefa)
+        # Se o lote falhar antes de a tarefa começar (BEGIN ocupado), o Future acorda a espera
+        futuro.add_done_callback(lambda _: pronto.set())
+        pronto.wait()
+        if futuro.done():
+            futuro.result()
+        
+        try:
+            yield self.conn
+        except BaseException:
+            falhou.append(True)
+            terminado.set()
+            # Espera o ROLLBACK TO da tarefa antes de devolver o erro
+            futuro.exception()
+            raise
+        terminado.set()
+        futuro.result()
+    
+    def na_thread_escritora(self):
+        """Indica se o código atual está rodando dentro da thread de escrita"""
+        return threading.current_thread() is self._thread
+    
+    def _proximo_lote(self):
+        """Espera a primeira tarefa e junta as que já estiverem na fila"""
+        lote = [self._fila.get()]
+        while len(lote) < self.lote_maximo:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+    
+    def _executar(self):
+        """Laço da thread de escrita"""
+        # Modelos chamados de dentro das tarefas enxergam esta conexão como a da
+        # transação corrente, então seus transaction() viram SAVEPOINTs
+        self._local.conn = self.conn
+        self._local.profundidade = 1
+        parar = False
+        while not parar:
+            lote = self._proximo_lote()
+            tarefas = []
+            for item in lote:
+                if item is self._PARAR:
+                    parar = True
+                else:
+                    tarefas.append(item)
+            if tarefas:
+                self._executar_lote(tarefas)
+        self.conn.close()
+    
+    def _executar_lote(self, tarefas):
+        """Roda um lote de tarefas em uma única transação"""
+        resultados = []
+        try:
+            self.conn.execute('BEGIN IMMEDIATE')
+            for funcao, futuro in tarefas:
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                self.conn.execute('SAVEPOINT tarefa')
+                try:
+                    resultado = funcao(self.conn)
+                except Exception as e:
+                    self.conn.execute('ROLLBACK TO tarefa')
+                    self.conn.execute('RELEASE tarefa')
+                    resultados.append((futuro, None, e))
+                else:
+                    self.conn.execute('RELEASE tarefa')
+                    resultados.append((futuro, resultado, None))
+            self.conn.execute('COMMIT')
+        except Exception as e:
+            # Falha do próprio BEGIN/COMMIT: nenhuma tarefa do lote foi gravada
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            for _, futuro in tarefas:
+                if futuro.done():
+                    continue
+                if futuro.running() or futuro.set_running_or_notify_cancel():
+                    futuro.set_exception(e)
+            return
+    
+        for futuro, resultado, erro in resultados:
+            if erro is not None:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(resultado)
+    
+    def fechar(self):
+        """Processa o que ainda está na fila e encerra a thread"""
+        self._fila.put(self._PARAR)
+        self._thread.join()
 
 class DatabaseManager:
-    def __init__(self, db_name='petshop.db'):
+    def __init__(self, db_name='petshop.db', pool_size=5, pool_timeout=30.0, instrumentacao=True,
+                 perfil='padrao', intervalo_checkpoint=60.0, escritor_dedicado=False, lote_escrita=64,
+                 cache=None):
         self.db_name = db_name
+        # perfil é o nome de um dos PERFIS_PRAGMA ou um dicionário de PRAGMAs próprio
+        self.pragmas = PERFIS_PRAGMA[perfil] if isinstance(perfil, str) else dict(perfil)
+        self.pool = ConnectionPool(db_name, pool_size, pool_timeout, self.pragmas)
+        # Conexões só de leitura para relatórios; são abertas só quando snapshot() é usado
+        self.pool_leitura = ConnectionPool(db_name, pool_size, pool_timeout, self.pragmas,
+                                           somente_leitura=True)
+        self._local = threading.local()
+        
+        # True usa a instrumentação padrão; False/None desliga a coleta de métricas
+        if instrumentacao is True:
+            # O log de consultas lentas fica ao lado do arquivo do banco, não no diretório atual
+            pasta = os.path.dirname(os.path.abspath(db_name))
+            instrumentacao = Instrumentacao(arquivo_log=os.path.join(pasta, 'consultas_lentas.log'))
+        self.instrumentacao = instrumentacao or None
+        if self.instrumentacao is not None:
+            self.instrumentacao.explicar = self.explain_query_plan
+        
+        # Com o escritor dedicado, toda escrita deste processo (execute_update,
+        # execute_many e blocos transaction()) passa pela fila de uma única conexão
+        self._escritor = None
+        
+        # Cache de resultados: só as consultas feitas com cached=True passam por ele
+        if cache is True:
+            cache = CacheConsultas()
+        self.cache = cache or None
+        
+        # Conexão própria (que nunca escreve) para ler PRAGMA data_version
+        self._conn_versao = None
+        self._trava_versao = threading.Lock()
+        self._ultima_versao_dados = None
+        self._contadores = {}
+        
         self.init_database()
+        
+        if escritor_dedicado:
+            self._escritor = WriteQueue(self.pool._criar_conexao(), self._local, lote_escrita)
+        
+        self._parar_checkpoint = threading.Event()
+        self._thread_checkpoint = None
+        if intervalo_checkpoint and self.journal_mode() == 'wal':
+            self._thread_checkpoint = threading.Thread(
+                target=self._checkpoints_periodicos, args=(intervalo_checkpoint,),
+                name='petshop-wal-checkpoint', daemon=True)
+            self._thread_checkpoint.start()
     
-    def get_connection(self):
-        return sqlite3.connect(self.db_name)
-    
-    def init_database(self):
-        """Inicializa o banco de dados com todas as tabelas necessárias"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão do pool pelo tempo do bloco"""
+        # Dentro de uma transação a thread reutiliza a conexão da transação
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
         
-        # Tabela de Categorias de Produtos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categorias (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL UNIQUE,
-                descricao TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        conn = self.pool.obter()
+        try:
+            yield conn
+        finally:
+            self.pool.devolver(conn)
+    
+    @contextmanager
+    def transaction(self):
+        """Agrupa todas as operações do bloco em uma única transação
         
-        # Tabela de Produtos/Estoque
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS produtos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                categoria_id INTEGER,
-                preco REAL NOT NULL,
-                estoque_atual INTEGER DEFAULT 0,
-                estoque_minimo INTEGER DEFAULT 5,
-                codigo_barras TEXT UNIQUE,
-                descricao TEXT,
-                marca TEXT,
-                peso REAL,
-                unidade_medida TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (categoria_id) REFERENCES categorias (id)
-            )
-        ''')
+        Todas as chamadas a execute_query/execute_update feitas pela mesma thread
+        dentro do bloco usam a mesma conexão e são gravadas com um único COMMIT.
+        Se o bloco levantar uma exceção, tudo é desfeito. Blocos aninhados viram
+        SAVEPOINTs da transação externa. Com o escritor dedicado, o bloco entra
+        na fila e é gravado no commit coletivo dele.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if getattr(self._local, 'somente_leitura', False):
+            raise sqlite3.ProgrammingError('Não é possível abrir uma transação de escrita dentro de snapshot()')
+        if conn is not None:
+            nome = f'sp_{self._local.profundidade}'
+            self._local.profundidade += 1
+            conn.execute(f'SAVEPOINT {nome}')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f'ROLLBACK TO {nome}')
+                conn.execute(f'RELEASE {nome}')
+                raise
+            else:
+                conn.execute(f'RELEASE {nome}')
+            finally:
+                self._local.profundidade -= 1
+            return
         
-        # Tabela de Clientes
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                cpf TEXT UNIQUE,
-                telefone TEXT,
-                email TEXT,
-                endereco TEXT,
-                cidade TEXT,
-                cep TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        if self._escritor is not None:
+            with self._escritor.emprestar() as conn:
+                self._local.conn = conn
+                self._local.profundidade = 1
+                self._local.tabelas_escritas = set()
+                try:
+                    yield conn
+                finally:
+                    self._local.conn = None
+                    self._local.profundidade = 0
+            # Só chega aqui depois do COMMIT do lote
+            self._invalidar_cache(self._local.tabelas_escritas)
+            self._local.tabelas_escritas = set()
+            return
         
-        # Tabela de Pets
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                cliente_id INTEGER NOT NULL,
-                especie TEXT NOT NULL,
-                raca TEXT,
-                idade INTEGER,
-                peso REAL,
-                cor TEXT,
-                observacoes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (cliente_id) REFERENCES clientes (id)
-            )
-        ''')
+        conn = self.pool.obter()
+        self._local.conn = conn
+        self._local.profundidade = 1
+        self._local.tabelas_escritas = set()
+        try:
+            # IMMEDIATE reserva a escrita logo no início e evita deadlocks na promoção do lock
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            self._local.conn = None
+            self._local.profundidade = 0
+            self.pool.devolver(conn)
+            # Depois do COMMIT (ou ROLLBACK), descarta do cache o que a transação tocou
+            self._invalidar_cache(self._local.tabelas_escritas)
+            self._local.tabelas_escritas = set()
+    
+    @contextmanager
+    def snapshot(self):
+        """Executa as leituras do bloco em uma conexão só de leitura, numa única foto do banco
         
-        # Tabela de Vendas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vendas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER,
-                total REAL NOT NULL,
-                desconto REAL DEFAULT 0,
-                forma_pagamento TEXT,
-                data_venda TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                observacoes TEXT,
-                FOREIGN KEY (cliente_id) REFERENCES clientes (id)
-            )
-        ''')
+        Todas as consultas feitas pela thread dentro do bloco enxergam o mesmo
+        estado do banco, mesmo que vendas sejam gravadas no meio. Em WAL a
+        leitura não segura nenhum lock que atrase os escritores. Escritas dentro
+        do bloco falham.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            # Já dentro de um snapshot (ou transação): a leitura já é consistente
+            yield self._local.conn
+            return
         
-        # Tabela de Itens da Venda
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS itens_venda (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                venda_id INTEGER NOT NULL,
-                produto_id INTEGER NOT NULL,
-                quantidade INTEGER NOT NULL,
-                preco_unitario REAL NOT NULL,
-                subtotal REAL NOT NULL,
-                FOREIGN KEY (venda_id) REFERENCES vendas (id),
-                FOREIGN KEY (produto_id) REFERENCES produtos (id)
-            )
-        ''')
+        conn = self.pool_leitura.obter()
+        self._local.conn = conn
+        self._local.somente_leitura = True
+        self._local.contadores_snapshot = None
+        try:
+            conn.execute('BEGIN')
+            # A foto é tirada na primeira leitura, não no BEGIN
+            conn.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute('COMMIT')
+            self._local.conn = None
+            self._local.somente_leitura = False
+            self.pool_leitura.devolver(conn)
+    
+    def submit(self, funcao):
+        """Executa funcao(conn) como uma tarefa de escrita e devolve um Future
         
-        # Tabela de Tipos de Serviços
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tipos_servicos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL UNIQUE,
-                preco_base REAL NOT NULL,
-                duracao_minutos INTEGER,
-                descricao TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        Com o escritor dedicado a tarefa entra na fila e é gravada no próximo
+        commit coletivo. Sem ele, ou se a thread já estiver dentro de uma
+        transação, roda na hora (em transaction()) e o Future já vem resolvido.
+        """
+        if self._escritor is not None and getattr(self._local, 'conn', None) is None:
+            return self._escritor.submeter(funcao)
         
-        # Tabela de Agendamentos/Serviços
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS agendamentos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER NOT NULL,
-                pet_id INTEGER NOT NULL,
-                tipo_servico_id INTEGER NOT NULL,
-                data_agendamento TIMESTAMP NOT NULL,
-                status TEXT DEFAULT 'agendado',
-                preco REAL,
-                observacoes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (cliente_id) REFERENCES clientes (id),
-                FOREIGN KEY (pet_id) REFERENCES pets (id),
-                FOREIGN KEY (tipo_servico_id) REFERENCES tipos_servicos (id)
-            )
-        ''')
+        futuro = Future()
+        futuro.set_running_or_notify_cancel()
+        try:
+            with self.transaction() as conn:
+                resultado = funcao(conn)
+        except Exception as e:
+            futuro.set_exception(e)
+        else:
+            futuro.set_result(resultado)
+        return futuro
+    
+    def submit_update(self, query, params=None):
+        """Versão assíncrona de execute_update: Future com (linhas afetadas, último id)"""
+        futuro = self.submit(lambda conn: self._executar_update(conn, query, params))
+        futuro.add_done_callback(lambda _: self._invalidar_cache({tabela_escrita(query)}))
+        return futuro
+    
+    def journal_mode(self):
+        """Modo de journal em uso pelo banco ('wal', 'delete', ...)"""
+        with self.connection() as conn:
+            return conn.execute('PRAGMA journal_mode').fetchone()[0].lower()
+    
+    def checkpoint(self, modo='PASSIVE'):
+        """Copia o conteúdo do WAL para o arquivo do banco
         
-        # Tabela de Movimentações de Estoque
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS movimentacoes_estoque (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                produto_id INTEGER NOT NULL,
-                tipo_movimentacao TEXT NOT NULL,
-                quantidade INTEGER NOT NULL,
-                motivo TEXT,
-                data_movimentacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (produto_id) REFERENCES produtos (id)
-            )
-        ''')
+        PASSIVE não espera por leitores nem escritores; TRUNCATE espera e zera o
+        arquivo -wal. Retorna (ocupado, páginas no WAL, páginas copiadas).
+        """
+        with self.connection() as conn:
+            return conn.execute(f'PRAGMA wal_checkpoint({modo})').fetchone()
+    
+    def _checkpoints_periodicos(self, intervalo):
+        """Laço da thread de checkpoint: roda até close() sinalizar a parada"""
+        while not self._parar_checkpoint.wait(intervalo):
+            try:
+                self.checkpoint()
+            except sqlite3.Error:
+                # Banco ocupado ou pool encerrando: tenta de novo no próximo ciclo
+                pass
+    
+    def close(self):
+        """Encerra o pool de conexões"""
+        if self._escritor is not None:
+            self._escritor.fechar()
+            self._escritor = None
+        if self._thread_checkpoint is not None:
+            self._parar_checkpoint.set()
+            self._thread_checkpoint.join()
+            self._thread_checkpoint = None
+            # Deixa o arquivo -wal vazio para quem abrir o banco depois
+            try:
+                self.checkpoint('TRUNCATE')
+            except sqlite3.Error:
+                pass
+        self.pool.fechar()
+        self.pool_leitura.fechar()
+        with self._trava_versao:
+            if self._conn_versao is not None:
+                self._conn_versao.close()
+                self._conn_versao = None
+        if self.instrumentacao is not None:
+            self.instrumentacao.fechar()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def init_database(self):
+        """Inicializa o banco de dados aplicando as migrações pendentes"""
+        self.migrate()
+    
+    def schema_version(self):
+        """Versão do esquema registrada no banco (PRAGMA user_version)"""
+        with self.connection() as conn:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+    
+    def migrate(self):
+        """Aplica, em ordem, as migrações de MIGRACOES ainda não aplicadas
         
-        conn.commit()
-        conn.close()
+        Com o esquema em dia custa uma única leitura de PRAGMA user_version.
+        Cada migração roda dentro da mesma transação que registra sua versão
+        em schema_version, então uma falha não deixa o banco pela metade.
+        """
+        if self.schema_version() >= VERSAO_ESQUEMA:
+            return
         
-        # Inserir dados iniciais
-        self.insert_initial_data()
+        with self.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    versao INTEGER PRIMARY KEY,
+                    descricao TEXT NOT NULL,
+                    aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Relê dentro da transação: outro processo pode ter migrado enquanto esperávamos o lock
+            aplicadas = {linha[0] for linha in conn.execute('SELECT versao FROM schema_version')}
+            
+            for versao, descricao, migracao in MIGRACOES:
+                if versao in aplicadas:
+                    continue
+                migracao(conn)
+                conn.execute('INSERT INTO schema_version (versao, descricao) VALUES (?, ?)',
+                             (versao, descricao))
+            
+            conn.execute(f'PRAGMA user_version = {VERSAO_ESQUEMA}')
     
     def insert_initial_data(self):
         """Insere dados iniciais no banco"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.transaction() as conn:
+            _inserir_dados_iniciais(conn)
+    
+
+    def execute_query(self, query, params=None, row_factory=None, cached=False):
+        """Executa uma query e retorna os resultados
         
-        # Categorias iniciais
-        categorias_iniciais = [
-            ('Ração e Alimentos', 'Rações, petiscos e alimentos para pets'),
-            ('Medicamentos', 'Medicamentos e produtos veterinários'),
-            ('Acessórios', 'Coleiras, guias, brinquedos e acessórios'),
-            ('Higiene', 'Produtos de higiene e limpeza'),
-            ('Camas e Casinhas', 'Camas, casinhas e produtos para descanso')
-        ]
-        
-        for nome, descricao in categorias_iniciais:
-            cursor.execute('''
-                INSERT OR IGNORE INTO categorias (nome, descricao) 
-                VALUES (?, ?)
-            ''', (nome, descricao))
-        
-        # Tipos de serviços iniciais
-        servicos_iniciais = [
-            ('Banho Simples', 25.00, 60, 'Banho básico com shampoo neutro'),
-            ('Banho e Tosa', 45.00, 120, 'Banho completo com tosa higiênica'),
-            ('Tosa Completa', 60.00, 180, 'Tosa completa com acabamento'),
-            ('Consulta Veterinária', 80.00, 30, 'Consulta clínica geral'),
-            ('Vacinação', 35.00, 15, 'Aplicação de vacinas'),
-            ('Hospedagem (diária)', 50.00, 1440, 'Hospedagem por dia')
-        ]
-        
-        for nome, preco, duracao, descricao in servicos_iniciais:
-            cursor.execute('''
-                INSERT OR IGNORE INTO tipos_servicos (nome, preco_base, duracao_minutos, descricao) 
-                VALUES (?, ?, ?, ?)
-            ''', (nome, preco, duracao, descricao))
-        
-        conn.commit()
-        conn.close()
-    
-    def execute_query(self, query, params=None):
-        """Executa uma query e retorna os resultados"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        row_factory segue a interface do sqlite3 (cursor, linha) e vale só para
+        esta consulta; sem ela as linhas vêm como tuplas. Com cached=True e o
+        cache ativo, o resultado pode vir do cache de consultas.
+        """
+        if cached and self.cache is not None and not self._em_transacao_escrita():
+            return self._consulta_em_cache(query, params, row_factory)
         
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+        inicio = time.perf_counter()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory
+            
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            resultado = cursor.fetchall()
+        
+        self._medir(query, params, time.perf_counter() - inicio, len(resultado))
+        return resultado
+    
+    def iter_query(self, query, params=None, batch_size=500, row_factory=None):
+        """Executa uma query e devolve os resultados em lotes de até batch_size linhas
         
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        O cursor fica aberto enquanto o gerador é consumido, então a memória usada
+        não cresce com o tamanho da tabela. A conexão volta ao pool quando o
+        gerador termina ou é descartado.
+        """
+        # Só conta o tempo gasto no banco, não o de quem consome os lotes
+        gasto = 0.0
+        linhas = 0
+        try:
+            with self.connection() as conn:
+                inicio = time.perf_counter()
+                cursor = conn.cursor()
+                cursor.arraysize = batch_size
+                cursor.row_factory = row_factory
+                
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                try:
+                    while True:
+                        lote = cursor.fetchmany()
+                        gasto += time.perf_counter() - inicio
+                        if not lote:
+                            break
+                        linhas += len(lote)
+                        yield lote
+                        inicio = time.perf_counter()
+                finally:
+                    cursor.close()
+        finally:
+            self._medir(query, params, gasto, linhas)
     
     def execute_update(self, query, params=None):
         """Executa uma query de atualização e retorna o número de linhas afetadas"""
-        conn = self.get_connection()
+        inicio = time.perf_counter()
+        if self._escritor is not None and getattr(self._local, 'conn', None) is None:
+            # Fora de transação, a escrita vai para a fila do escritor dedicado
+            resultado = self.submit_update(query, params).result()
+        else:
+            # Fora de transação a conexão está em autocommit; dentro, o COMMIT fica
+            # para o fim do bloco transaction()
+            with self.connection() as conn:
+                resultado = self._executar_update(conn, query, params)
+        
+        self._medir(query, params, time.perf_counter() - inicio, max(resultado[0], 0))
+        self._registrar_escrita(query)
+        return resultado
+    
+    def _executar_update(self, conn, query, params):
+        """Roda um comando de escrita na conexão dada"""
         cursor = conn.cursor()
         
         if params:
@@ -217,8 +735,778 @@ class DatabaseManager:
         else:
             cursor.execute(query)
         
-        rows_affected = cursor.rowcount
-        last_row_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return rows_affected, last_row_id 
\ No newline at end of file
+        return cursor.rowcount, cursor.lastrowid
+    
+    def execute_many(self, query, seq_params):
+        """Executa a mesma query para cada conjunto de parâmetros em uma única transação
+        
+        O comando é preparado uma vez e reaproveitado para todas as linhas; aceita
+        qualquer iterável (inclusive geradores). Retorna o total de linhas afetadas.
+        """
+        # A primeira linha de parâmetros serve para o EXPLAIN de um executemany lento
+        seq_params = iter(seq_params)
+        primeira = next(seq_params, None)
+        if primeira is None:
+            return 0
+        
+        inicio = time.perf_counter()
+        with self.transaction() as conn:
+            linhas = conn.executemany(query, itertools.chain([primeira], seq_params)).rowcount
+        
+        self._medir(query, primeira, time.perf_counter() - inicio, max(linhas, 0))
+        self._registrar_escrita(query)
+        return linhas
+    
+    def explain_query_plan(self, query, params=None):
+        """Retorna as linhas do EXPLAIN QUERY PLAN de uma query (id, pai, detalhe)"""
+        with self.connection() as conn:
+            cursor = conn.execute(f'EXPLAIN QUERY PLAN {query}', params or ())
+            return [(linha[0], linha[1], linha[3]) for linha in cursor.fetchall()]
+    
+    def versao_dados(self):
+        """Valor de PRAGMA data_version na conexão de monitoramento
+        
+        Muda sempre que qualquer outra conexão, deste ou de outro processo,
+        grava um COMMIT no banco. Não lê nenhuma tabela.
+        """
+        with self._trava_versao:
+            return self._ler_versao_dados()
+    
+    def _ler_versao_dados(self):
+        if self._conn_versao is None:
+            self._conn_versao = self.pool_leitura._criar_conexao()
+        return self._conn_versao.execute('PRAGMA data_version').fetchone()[0]
+    
+    def marca_alteracoes(self):
+        """Foto dos contadores de alteração ({tabela: versão}) para comparar depois
+        
+        Se nada foi gravado desde a última chamada, devolve os contadores já lidos
+        sem consultar a tabela.
+        """
+        with self._trava_versao:
+            versao = self._ler_versao_dados()
+            if versao != self._ultima_versao_dados:
+                self._contadores = dict(self._conn_versao.execute(
+                    'SELECT tabela, versao FROM contadores_alteracao').fetchall())
+                self._ultima_versao_dados = versao
+            return dict(self._contadores)
+    
+    def alteracoes_desde(self, marca, tabelas=None):
+        """Conjunto das tabelas alteradas desde a marca (de marca_alteracoes())
+        
+        Com tabelas, só essas são conferidas. Uma marca None conta como tudo alterado.
+        """
+        atual = self.marca_alteracoes()
+        if tabelas is None:
+            tabelas = atual.keys()
+        if marca is None:
+            return set(tabelas)
+        return {tabela for tabela in tabelas if atual.get(tabela) != marca.get(tabela)}
+    
+    def _em_transacao_escrita(self):
+        """Indica se a thread está dentro de transaction() (e não de um snapshot)"""
+        return (getattr(self._local, 'conn', None) is not None
+                and not getattr(self._local, 'somente_leitura', False))
+    
+    def _contadores_atuais(self, tabelas):
+        """Contadores de alteração das tabelas, como a conexão atual os enxerga"""
+        if getattr(self._local, 'somente_leitura', False):
+            # Dentro de um snapshot vale o estado da foto, não o mais recente
+            if self._local.contadores_snapshot is None:
+                self._local.contadores_snapshot = dict(self._local.conn.execute(
+                    'SELECT tabela, versao FROM contadores_alteracao').fetchall())
+            contadores = self._local.contadores_snapshot
+        else:
+            contadores = self.marca_alteracoes()
+        return {tabela: contadores.get(tabela) for tabela in tabelas}
+    
+    def _consulta_em_cache(self, query, params, row_factory):
+        """execute_query passando pelo cache de resultados"""
+        if isinstance(params, dict):
+            chave_params = tuple(sorted(params.items()))
+        else:
+            chave_params = tuple(params or ())
+        chave = (query, chave_params, row_factory)
+        
+        resultado = self.cache.obter(chave, self._contadores_atuais)
+        if resultado is None:
+            # Os contadores são lidos antes da consulta: se algo for gravado no meio,
+            # a entrada já nasce desatualizada e é descartada na próxima leitura
+            tabelas = tabelas_lidas(query)
+            marcas = self._contadores_atuais(tabelas)
+            resultado = self.execute_query(query, params, row_factory)
+            self.cache.guardar(chave, resultado, tabelas, marcas)
+        # Cópia da lista: quem chamou pode alterá-la sem afetar o cache
+        return list(resultado)
+    
+    def _registrar_escrita(self, query):
+        """Descarta do cache as consultas da tabela escrita (na transação, só após o COMMIT)"""
+        if self.cache is None:
+            return
+        tabela = tabela_escrita(query)
+        if tabela is None:
+            return
+        escritas = getattr(self._local, 'tabelas_escritas', None) if self._em_transacao_escrita() else None
+        if escritas is not None:
+            escritas.add(tabela)
+        else:
+            # Fora de transação (ou na thread de escrita): os contadores de
+            # alteração cobrem quem voltar a preencher a entrada antes do COMMIT
+            self.cache.invalidar_tabelas({tabela})
+    
+    def _invalidar_cache(self, tabelas):
+        """Remove do cache as entradas que leem alguma das tabelas"""
+        tabelas = {tabela for tabela in tabelas if tabela}
+        if self.cache is not None and tabelas:
+            self.cache.invalidar_tabelas(tabelas)
+    
+    def estatisticas_cache(self):
+        """Acertos, falhas e ocupação do cache de consultas (vazio se desligado)"""
+        if self.cache is None:
+            return {}
+        return self.cache.estatisticas()
+    
+    def _medir(self, query, params, segundos, linhas):
+        """Repassa o tempo e as linhas de um comando para a instrumentação, se ativa"""
+        if self.instrumentacao is not None:
+            self.instrumentacao.registrar(query, params, segundos, linhas, identificar_chamador())
+    
+    def estatisticas(self, ordenar_por='tempo_total_ms'):
+        """Métricas acumuladas por comando SQL (vazio se a instrumentação estiver desligada)"""
+        if self.instrumentacao is None:
+            return []
+        return self.instrumentacao.estatisticas(ordenar_por)
+
+# ---------------------------------------------------------------------------
+# Migrações de esquema
+#
+# Cada migração recebe a conexão já dentro da transação de migrate(). Para
+# evoluir o banco, acrescente uma nova função ao fim de MIGRACOES com a
+# próxima versão; nunca altere uma migração que já foi publicada.
+# ---------------------------------------------------------------------------
+
+def colunas_tabela(conn, tabela):
+    """Nomes das colunas existentes em uma tabela"""
+    return {linha[1] for linha in conn.execute(f'PRAGMA table_info({tabela})')}
+
+def tabela_existe(conn, tabela):
+    """Indica se uma tabela (inclusive virtual) existe no banco"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (tabela,)).fetchone() is not None
+
+def fts5_disponivel(conn, tokenizador='unicode61'):
+    """Indica se o SQLite em uso tem FTS5 (e o tokenizador pedido, ex.: 'trigram')"""
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE temp.teste_fts5 USING fts5(texto, tokenize='{tokenizador}')")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute('DROP TABLE temp.teste_fts5')
+    return True
+
+def adicionar_coluna(conn, tabela, coluna, definicao):
+    """Adiciona uma coluna se ela ainda não existir (ALTER TABLE não reconstrói a tabela)"""
+    if coluna not in colunas_tabela(conn, tabela):
+        conn.execute(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}')
+
+def criar_indices(conn, indices):
+    """Cria uma lista de índices (nome, tabela, colunas) que ainda não existam"""
+    for nome, tabela, colunas in indices:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})')
+
+def _migracao_esquema_inicial(conn):
+    """Cria as tabelas que ainda não existem"""
+    cursor = conn.cursor()
+    
+    # Tabela de Categorias de Produtos
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categorias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL UNIQUE,
+            descricao TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Tabela de Produtos/Estoque
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            categoria_id INTEGER,
+            preco REAL NOT NULL,
+            estoque_atual INTEGER DEFAULT 0,
+            estoque_minimo INTEGER DEFAULT 5,
+            codigo_barras TEXT UNIQUE,
+            descricao TEXT,
+            marca TEXT,
+            peso REAL,
+            unidade_medida TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (categoria_id) REFERENCES categorias (id)
+        )
+    ''')
+    
+    # Tabela de Clientes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            cpf TEXT UNIQUE,
+            telefone TEXT,
+            email TEXT,
+            endereco TEXT,
+            cidade TEXT,
+            cep TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Tabela de Pets
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            cliente_id INTEGER NOT NULL,
+            especie TEXT NOT NULL,
+            raca TEXT,
+            idade INTEGER,
+            peso REAL,
+            cor TEXT,
+            observacoes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+        )
+    ''')
+    
+    # Tabela de Vendas
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vendas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER,
+            total REAL NOT NULL,
+            desconto REAL DEFAULT 0,
+            forma_pagamento TEXT,
+            data_venda TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            observacoes TEXT,
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+        )
+    ''')
+    
+    # Tabela de Itens da Venda
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS itens_venda (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venda_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL,
+            preco_unitario REAL NOT NULL,
+            subtotal REAL NOT NULL,
+            FOREIGN KEY (venda_id) REFERENCES vendas (id),
+            FOREIGN KEY (produto_id) REFERENCES produtos (id)
+        )
+    ''')
+    
+    # Tabela de Tipos de Serviços
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tipos_servicos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL UNIQUE,
+            preco_base REAL NOT NULL,
+            duracao_minutos INTEGER,
+            descricao TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Tabela de Agendamentos/Serviços
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS agendamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            pet_id INTEGER NOT NULL,
+            tipo_servico_id INTEGER NOT NULL,
+            data_agendamento TIMESTAMP NOT NULL,
+            status TEXT DEFAULT 'agendado',
+            preco REAL,
+            observacoes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id),
+            FOREIGN KEY (pet_id) REFERENCES pets (id),
+            FOREIGN KEY (tipo_servico_id) REFERENCES tipos_servicos (id)
+        )
+    ''')
+    
+    # Tabela de Movimentações de Estoque
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS movimentacoes_estoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            tipo_movimentacao TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            motivo TEXT,
+            data_movimentacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (produto_id) REFERENCES produtos (id)
+        )
+    ''')
+
+def _inserir_dados_iniciais(conn):
+    """Insere categorias e serviços padrão que ainda não existem"""
+    cursor = conn.cursor()
+    
+    # Categorias iniciais
+    categorias_iniciais = [
+        ('Ração e Alimentos', 'Rações, petiscos e alimentos para pets'),
+        ('Medicamentos', 'Medicamentos e produtos veterinários'),
+        ('Acessórios', 'Coleiras, guias, brinquedos e acessórios'),
+        ('Higiene', 'Produtos de higiene e limpeza'),
+        ('Camas e Casinhas', 'Camas, casinhas e produtos para descanso')
+    ]
+    
+    for nome, descricao in categorias_iniciais:
+        cursor.execute('''
+            INSERT OR IGNORE INTO categorias (nome, descricao) 
+            VALUES (?, ?)
+        ''', (nome, descricao))
+    
+    # Tipos de serviços iniciais
+    servicos_iniciais = [
+        ('Banho Simples', 25.00, 60, 'Banho básico com shampoo neutro'),
+        ('Banho e Tosa', 45.00, 120, 'Banho completo com tosa higiênica'),
+        ('Tosa Completa', 60.00, 180, 'Tosa completa com acabamento'),
+        ('Consulta Veterinária', 80.00, 30, 'Consulta clínica geral'),
+        ('Vacinação', 35.00, 15, 'Aplicação de vacinas'),
+        ('Hospedagem (diária)', 50.00, 1440, 'Hospedagem por dia')
+    ]
+    
+    for nome, preco, duracao, descricao in servicos_iniciais:
+        cursor.execute('''
+            INSERT OR IGNORE INTO tipos_servicos (nome, preco_base, duracao_minutos, descricao) 
+            VALUES (?, ?, ?, ?)
+        ''', (nome, preco, duracao, descricao))
+
+def _migracao_indices(conn):
+    """Cria os índices das consultas mais frequentes"""
+    criar_indices(conn, INDICES)
+    
+    # Atualiza as estatísticas usadas pelo planejador de consultas
+    conn.execute('ANALYZE')
+
+def criar_gatilhos_alteracao(conn, tabela):
+    """Cria os triggers que incrementam o contador de alterações de uma tabela"""
+    conn.execute('INSERT OR IGNORE INTO contadores_alteracao (tabela) VALUES (?)', (tabela,))
+    for evento in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_alteracao_{evento.lower()}
+            AFTER {evento} ON {tabela}
+            BEGIN
+                UPDATE contadores_alteracao SET versao = versao + 1 WHERE tabela = '{tabela}';
+            END
+        ''')
+
+def _migracao_contadores_alteracao(conn):
+    """Contadores de alteração por tabela, mantidos por triggers"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS contadores_alteracao (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    for tabela in TABELAS_MONITORADAS:
+        criar_gatilhos_alteracao(conn, tabela)
+
+def _migracao_versao_produtos(conn):
+    """Versão de cada produto, para detectar alterações concorrentes (compare-and-swap)"""
+    adicionar_coluna(conn, 'produtos', 'versao', 'INTEGER NOT NULL DEFAULT 0')
+    # Quem atualiza o produto sem mexer na versão (cadastro, preço) também a avança
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_versao
+        AFTER UPDATE ON produtos
+        WHEN NEW.versao = OLD.versao
+        BEGIN
+            UPDATE produtos SET versao = OLD.versao + 1 WHERE id = NEW.id;
+        END
+    ''')
+
+# A cada quantas movimentações de um produto um novo checkpoint é gravado (além
+# do checkpoint na primeira movimentação de cada mês)
+MOVIMENTACOES_POR_CHECKPOINT = 100
+
+# Quantidade com sinal de uma movimentação: entradas somam, saídas subtraem
+SALDO_MOVIMENTACAO = "CASE tipo_movimentacao WHEN 'entrada' THEN quantidade ELSE -quantidade END"
+
+def _migracao_checkpoints_estoque(conn):
+    """Saldos periódicos por produto, para consultar o estoque em uma data sem refazer o histórico"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS checkpoints_estoque (
+            produto_id INTEGER NOT NULL,
+            movimentacao_id INTEGER NOT NULL,
+            data TIMESTAMP NOT NULL,
+            saldo INTEGER NOT NULL,
+            PRIMARY KEY (produto_id, movimentacao_id)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Histórico já existente: um checkpoint na última movimentação de cada mês
+    conn.execute(f'''
+        INSERT OR IGNORE INTO checkpoints_estoque (produto_id, movimentacao_id, data, saldo)
+        SELECT produto_id, id, data_movimentacao, saldo
+        FROM (
+            SELECT produto_id, id, data_movimentacao,
+                   SUM({SALDO_MOVIMENTACAO}) OVER (PARTITION BY produto_id ORDER BY id) AS saldo,
+                   ROW_NUMBER() OVER (PARTITION BY produto_id, strftime('%Y-%m', data_movimentacao)
+                                      ORDER BY id DESC) AS ordem
+            FROM movimentacoes_estoque
+        )
+        WHERE ordem = 1
+    ''')
+    
+    # Novas movimentações: checkpoint na primeira do mês ou a cada N desde o último.
+    # O saldo parte do checkpoint anterior, então o custo é só o das movimentações recentes.
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_movimentacoes_checkpoint
+        AFTER INSERT ON movimentacoes_estoque
+        WHEN NOT EXISTS (
+                SELECT 1 FROM checkpoints_estoque
+                WHERE produto_id = NEW.produto_id
+                  AND data >= strftime('%Y-%m-01', NEW.data_movimentacao)
+            )
+            OR (
+                SELECT COUNT(*) FROM movimentacoes_estoque
+                WHERE produto_id = NEW.produto_id
+                  AND id > (SELECT MAX(movimentacao_id) FROM checkpoints_estoque
+                            WHERE produto_id = NEW.produto_id)
+            ) >= {MOVIMENTACOES_POR_CHECKPOINT}
+        BEGIN
+            INSERT INTO checkpoints_estoque (produto_id, movimentacao_id, data, saldo)
+            SELECT NEW.produto_id, NEW.id, NEW.data_movimentacao,
+                   COALESCE(ultimo.saldo, 0) + (
+                       SELECT COALESCE(SUM({SALDO_MOVIMENTACAO}), 0)
+                       FROM movimentacoes_estoque
+                       WHERE produto_id = NEW.produto_id
+                         AND id > COALESCE(ultimo.movimentacao_id, 0)
+                   )
+            FROM (SELECT 1)
+            LEFT JOIN (
+                SELECT movimentacao_id, saldo FROM checkpoints_estoque
+                WHERE produto_id = NEW.produto_id
+                ORDER BY movimentacao_id DESC
+                LIMIT 1
+            ) ultimo;
+        END
+    ''')
+    criar_gatilhos_alteracao(conn, 'checkpoints_estoque')
+
+def _migracao_busca_produtos(conn):
+    """Índice FTS5 de nome, marca, descrição e código de barras dos produtos"""
+    if not fts5_disponivel(conn):
+        # Sem FTS5 a busca continua funcionando com LIKE (ver Produto.buscar)
+        return
+    
+    # Tabela de conteúdo externo: o texto fica só em produtos, o FTS guarda o índice.
+    # remove_diacritics 2 faz "racao" achar "Ração"; prefix acelera buscas de 2-3 letras.
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+            nome, marca, descricao, codigo_barras,
+            content='produtos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_insert AFTER INSERT ON produtos
+        BEGIN
+            INSERT INTO produtos_fts (rowid, nome, marca, descricao, codigo_barras)
+            VALUES (NEW.id, NEW.nome, NEW.marca, NEW.descricao, NEW.codigo_barras);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_delete AFTER DELETE ON produtos
+        BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome, marca, descricao, codigo_barras)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.marca, OLD.descricao, OLD.codigo_barras);
+        END
+    ''')
+    # Só as colunas indexadas: baixas de estoque não reindexam o produto
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_update
+        AFTER UPDATE OF nome, marca, descricao, codigo_barras ON produtos
+        BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome, marca, descricao, codigo_barras)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.marca, OLD.descricao, OLD.codigo_barras);
+            INSERT INTO produtos_fts (rowid, nome, marca, descricao, codigo_barras)
+            VALUES (NEW.id, NEW.nome, NEW.marca, NEW.descricao, NEW.codigo_barras);
+        END
+    ''')
+    conn.execute("INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild')")
+
+# Monta a linha de busca_clientes de um cliente: nome, nomes dos pets, telefone e CPF normalizados
+_LINHA_BUSCA_CLIENTE = '''
+    INSERT INTO busca_clientes (rowid, nome, pets, telefone, cpf)
+    SELECT c.id, c.nome_busca,
+           (SELECT group_concat(p.nome_busca, ' ') FROM pets p WHERE p.cliente_id = c.id),
+           c.telefone_digitos, c.cpf_digitos
+    FROM clientes c
+'''
+
+def _migracao_busca_clientes(conn):
+    """Colunas normalizadas de busca em clientes e pets e índice trigram sobre elas"""
+    adicionar_coluna(conn, 'clientes', 'nome_busca', 'TEXT')
+    adicionar_coluna(conn, 'clientes', 'cpf_digitos', 'TEXT')
+    adicionar_coluna(conn, 'clientes', 'telefone_digitos', 'TEXT')
+    adicionar_coluna(conn, 'pets', 'nome_busca', 'TEXT')
+    
+    # Preenche as linhas existentes; daqui em diante os modelos gravam as colunas
+    # junto com os dados (tirar acentos exige Python, não há função SQL para isso)
+    clientes = conn.execute('SELECT id, nome, cpf, telefone FROM clientes').fetchall()
+    conn.executemany(
+        'UPDATE clientes SET nome_busca = ?, cpf_digitos = ?, telefone_digitos = ? WHERE id = ?',
+        [(normalizar_nome(nome), somente_digitos(cpf), somente_digitos(telefone), cliente_id)
+         for cliente_id, nome, cpf, telefone in clientes])
+    pets = conn.execute('SELECT id, nome FROM pets').fetchall()
+    conn.executemany('UPDATE pets SET nome_busca = ? WHERE id = ?',
+                     [(normalizar_nome(nome), pet_id) for pet_id, nome in pets])
+    
+    criar_indices(conn, [
+        ('idx_clientes_cpf_digitos', 'clientes', 'cpf_digitos'),
+        ('idx_clientes_telefone_digitos', 'clientes', 'telefone_digitos'),
+    ])
+    
+    if not fts5_disponivel(conn, 'trigram'):
+        # Sem o tokenizador trigram, Cliente.buscar usa LIKE nas colunas normalizadas
+        return
+    
+    # Uma linha por cliente, com os nomes dos pets juntos: dono e pets saem de uma busca só.
+    # Trigramas permitem achar pedaços do nome ou do telefone e tolerar erros de digitação.
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS busca_clientes
+        USING fts5(nome, pets, telefone, cpf, tokenize='trigram')
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_busca_insert AFTER INSERT ON clientes
+        BEGIN
+            {_LINHA_BUSCA_CLIENTE} WHERE c.id = NEW.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_busca_update
+        AFTER UPDATE OF nome_busca, cpf_digitos, telefone_digitos ON clientes
+        BEGIN
+            DELETE FROM busca_clientes WHERE rowid = OLD.id;
+            {_LINHA_BUSCA_CLIENTE} WHERE c.id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_busca_delete AFTER DELETE ON clientes
+        BEGIN
+            DELETE FROM busca_clientes WHERE rowid = OLD.id;
+        END
+    ''')
+    # Pets mudam a linha do dono (e dos dois donos, se o pet trocar de cliente)
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_pets_busca_insert AFTER INSERT ON pets
+        BEGIN
+            DELETE FROM busca_clientes WHERE rowid = NEW.cliente_id;
+            {_LINHA_BUSCA_CLIENTE} WHERE c.id = NEW.cliente_id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_pets_busca_update AFTER UPDATE OF nome_busca, cliente_id ON pets
+        BEGIN
+            DELETE FROM busca_clientes WHERE rowid IN (OLD.cliente_id, NEW.cliente_id);
+            {_LINHA_BUSCA_CLIENTE} WHERE c.id IN (OLD.cliente_id, NEW.cliente_id);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_pets_busca_delete AFTER DELETE ON pets
+        BEGIN
+            DELETE FROM busca_clientes WHERE rowid = OLD.cliente_id;
+            {_LINHA_BUSCA_CLIENTE} WHERE c.id = OLD.cliente_id;
+        END
+    ''')
+    conn.execute('DELETE FROM busca_clientes')
+    conn.execute(_LINHA_BUSCA_CLIENTE)
+
+def _migracao_atualizacao_produtos(conn):
+    """updated_at avança em qualquer alteração de produto e ganha índice (leitura incremental)"""
+    conn.execute('DROP TRIGGER IF EXISTS trg_produtos_versao')
+    conn.execute('''
+        CREATE TRIGGER trg_produtos_versao
+        AFTER UPDATE ON produtos
+        WHEN NEW.versao = OLD.versao
+        BEGIN
+            UPDATE produtos SET versao = OLD.versao + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = NEW.id;
+        END
+    ''')
+    criar_indices(conn, [('idx_produtos_updated_at', 'produtos', 'updated_at')])
+
+# Agendamentos que ocupam o horário do recurso; cancelados e faltas liberam a vaga.
+# O mesmo texto é usado no índice parcial e nas consultas, para o SQLite usar o índice.
+AGENDAMENTO_ATIVO = "status NOT IN ('cancelado', 'nao_compareceu')"
+
+# Duração assumida para serviços sem duracao_minutos
+DURACAO_PADRAO_MINUTOS = 30
+
+# Recurso e fim de um agendamento a partir do tipo de serviço ({linha} é a linha do agendamento)
+_INTERVALO_AGENDAMENTO = f'''
+    recurso = (SELECT recurso FROM tipos_servicos WHERE id = {{linha}}.tipo_servico_id),
+    data_fim = datetime({{linha}}.data_agendamento, '+' || COALESCE(
+        (SELECT duracao_minutos FROM tipos_servicos WHERE id = {{linha}}.tipo_servico_id),
+        {DURACAO_PADRAO_MINUTOS}) || ' minutes')
+'''
+
+def _migracao_recursos_agendamento(conn):
+    """Recursos com capacidade e intervalo (início, fim) de cada agendamento, para detectar conflitos"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS recursos (
+            nome TEXT PRIMARY KEY,
+            capacidade INTEGER NOT NULL DEFAULT 1 CHECK (capacidade > 0),
+            descricao TEXT
+        )
+    ''')
+    conn.executemany('INSERT OR IGNORE INTO recursos (nome, capacidade, descricao) VALUES (?, ?, ?)', [
+        ('geral', 1, 'Atendimento geral'),
+        ('banho_tosa', 1, 'Mesa de banho e tosa'),
+        ('veterinario', 1, 'Consultório veterinário'),
+        ('hospedagem', 10, 'Baias de hospedagem'),
+    ])
+    criar_gatilhos_alteracao(conn, 'recursos')
+    
+    adicionar_coluna(conn, 'tipos_servicos', 'recurso', "TEXT NOT NULL DEFAULT 'geral'")
+    conn.executemany('UPDATE tipos_servicos SET recurso = ? WHERE nome = ?', [
+        ('banho_tosa', 'Banho Simples'),
+        ('banho_tosa', 'Banho e Tosa'),
+        ('banho_tosa', 'Tosa Completa'),
+        ('veterinario', 'Consulta Veterinária'),
+        ('veterinario', 'Vacinação'),
+        ('hospedagem', 'Hospedagem (diária)'),
+    ])
+    
+    adicionar_coluna(conn, 'agendamentos', 'recurso', 'TEXT')
+    adicionar_coluna(conn, 'agendamentos', 'data_fim', 'TIMESTAMP')
+    conn.execute(f'UPDATE agendamentos SET {_INTERVALO_AGENDAMENTO.format(linha="agendamentos")}')
+    
+    # Quem gravar sem recurso/data_fim (ou mudar data ou serviço) tem os dois calculados pelo banco
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_agendamentos_intervalo_insert
+        AFTER INSERT ON agendamentos
+        WHEN NEW.recurso IS NULL OR NEW.data_fim IS NULL
+        BEGIN
+            UPDATE agendamentos SET {_INTERVALO_AGENDAMENTO.format(linha="NEW")} WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_agendamentos_intervalo_update
+        AFTER UPDATE OF data_agendamento, tipo_servico_id ON agendamentos
+        BEGIN
+            UPDATE agendamentos SET {_INTERVALO_AGENDAMENTO.format(linha="NEW")} WHERE id = NEW.id;
+        END
+    ''')
+    
+    # Índice parcial só com os agendamentos ativos: a checagem de conflito é uma faixa dele
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_agendamentos_recurso
+        ON agendamentos (recurso, data_agendamento)
+        WHERE {AGENDAMENTO_ATIVO}
+    ''')
+
+def _migracao_series_agendamento(conn):
+    """Séries de agendamentos recorrentes e o vínculo de cada ocorrência com a sua série"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS series_agendamento (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            pet_id INTEGER NOT NULL,
+            tipo_servico_id INTEGER NOT NULL,
+            inicio TIMESTAMP NOT NULL,
+            intervalo_dias INTEGER NOT NULL CHECK (intervalo_dias > 0),
+            data_limite DATE,
+            ocorrencias INTEGER CHECK (ocorrencias > 0),
+            proxima_ocorrencia INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'ativa',
+            observacoes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id),
+            FOREIGN KEY (pet_id) REFERENCES pets (id),
+            FOREIGN KEY (tipo_servico_id) REFERENCES tipos_servicos (id)
+        )
+    ''')
+    criar_gatilhos_alteracao(conn, 'series_agendamento')
+    
+    adicionar_coluna(conn, 'agendamentos', 'serie_id', 'INTEGER REFERENCES series_agendamento (id)')
+    criar_indices(conn, [
+        ('idx_agendamentos_serie', 'agendamentos', 'serie_id, data_agendamento'),
+        ('idx_series_agendamento_status', 'series_agendamento', 'status'),
+    ])
+
+# Contador (em contadores_alteracao) só das exclusões de produtos: o catálogo de
+# códigos de barras só precisa recarregar tudo quando ele muda
+CONTADOR_EXCLUSOES_PRODUTOS = 'produtos_exclusoes'
+
+def _migracao_exclusoes_produtos(conn):
+    """Contador de exclusões de produtos, mantido por trigger"""
+    conn.execute('INSERT OR IGNORE INTO contadores_alteracao (tabela) VALUES (?)',
+                 (CONTADOR_EXCLUSOES_PRODUTOS,))
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_exclusao
+        AFTER DELETE ON produtos
+        BEGIN
+            UPDATE contadores_alteracao SET versao = versao + 1 WHERE tabela = '{CONTADOR_EXCLUSOES_PRODUTOS}';
+        END
+    ''')
+
+def _migracao_registro_alteracoes_produtos(conn):
+    """Última alteração de cada produto, em ordem de gravação (leitura incremental do catálogo)"""
+    # seq é AUTOINCREMENT: só cresce. Como o SQLite tem um escritor por vez, uma
+    # transação que ainda não deu COMMIT segura a escrita e nenhuma outra consegue
+    # gravar um seq maior antes dela; quem lê seq > último visto não perde linhas.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS produtos_alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL UNIQUE
+        )
+    ''')
+    # Uma linha por produto: a anterior sai e a nova entra com seq maior.
+    # DELETE + INSERT em vez de INSERT OR REPLACE, que um INSERT OR IGNORE em
+    # produtos transformaria em IGNORE dentro do trigger.
+    for evento in ('INSERT', 'UPDATE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_produtos_registro_{evento.lower()}
+            AFTER {evento} ON produtos
+            BEGIN
+                DELETE FROM produtos_alteracoes WHERE produto_id = NEW.id;
+                INSERT INTO produtos_alteracoes (produto_id) VALUES (NEW.id);
+            END
+        ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_registro_delete
+        AFTER DELETE ON produtos
+        BEGIN
+            DELETE FROM produtos_alteracoes WHERE produto_id = OLD.id;
+        END
+    ''')
+
+# Tabelas cujas alterações são contadas em contadores_alteracao. Tabelas novas
+# entram com criar_gatilhos_alteracao() na migração que as cria.
+TABELAS_MONITORADAS = [
+    'categorias', 'produtos', 'clientes', 'pets', 'vendas', 'itens_venda',
+    'tipos_servicos', 'agendamentos', 'movimentacoes_estoque',
+]
+
+# (versão, descrição, função) em ordem crescente de versão
+MIGRACOES = [
+    (1, 'Esquema inicial', _migracao_esquema_inicial),
+    (2, 'Categorias e tipos de serviço padrão', _inserir_dados_iniciais),
+    (3, 'Índices das consultas mais frequentes', _migracao_indices),
+    (4, 'Contadores de alteração por tabela', _migracao_contadores_alteracao),
+    (5, 'Versão das linhas de produtos', _migracao_versao_produtos),
+    (6, 'Checkpoints de saldo do estoque', _migracao_checkpoints_estoque),
+    (7, 'Busca textual de produtos (FTS5)', _migracao_busca_produtos),
+    (8, 'Busca normalizada de clientes e pets', _migracao_busca_clientes),
+    (9, 'Data de atualização automática dos produtos', _migracao_atualizacao_produtos),
+    (10, 'Recursos e conflitos de agendamento', _migracao_recursos_agendamento),
+    (11, 'Séries de agendamentos recorrentes', _migracao_series_agendamento),
+    (12, 'Contador de exclusões de produtos', _migracao_exclusoes_produtos),
+    (13, 'Registro de alterações dos produtos', _migracao_registro_alteracoes_produtos),
+]
+VERSAO_ESQUEMA = MIGRACOES[-1][0]
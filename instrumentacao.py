@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentação das consultas feitas pelo DatabaseManager: tempo de cada
+comando, linhas retornadas, quem chamou, histogramas de latência em memória
+e log rotativo das consultas lentas (com o EXPLAIN QUERY PLAN).
+"""
+
+import bisect
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+# Limites superiores (em ms) das faixas do histograma de latência
+FAIXAS_MS = (1, 5, 10, 50, 100, 500, 1000, float('inf'))
+
+# Arquivos cujos frames são pulados ao procurar quem fez a consulta
+_ARQUIVOS_INTERNOS = {'database.py', 'instrumentacao.py', 'contextlib.py', 'catalogo.py'}
+
+def normalizar_sql(query):
+    """Texto da consulta com os espaços colapsados, usado como chave das estatísticas"""
+    return ' '.join(query.split())
+
+def identificar_chamador(profundidade=2):
+    """Primeiro frame fora da camada de banco, como 'arquivo.py:Classe.metodo'"""
+    frame = sys._getframe(profundidade)
+    while frame is not None:
+        codigo = frame.f_code
+        arquivo = os.path.basename(codigo.co_filename)
+        nome = getattr(codigo, 'co_qualname', codigo.co_name)
+        # Funções auxiliares privadas de módulo (_paginar) contam como parte de quem as chamou
+        auxiliar = nome.startswith('_') and '.' not in nome
+        if arquivo not in _ARQUIVOS_INTERNOS and not auxiliar:
+            return f'{arquivo}:{nome}'
+        frame = frame.f_back
+    return '?'
+
+class EstatisticaConsulta:
+    """Números acumulados de um mesmo comando SQL"""
+    
+    __slots__ = ('sql', 'execucoes', 'tempo_total', 'tempo_maximo', 'linhas', 'histograma', 'chamadores')
+    
+    def __init__(self, sql):
+        self.sql = sql
+        self.execucoes = 0
+        self.tempo_total = 0.0
+        self.tempo_maximo = 0.0
+        self.linhas = 0
+        self.histograma = [0] * len(FAIXAS_MS)
+        self.chamadores = Counter()
+    
+    def registrar(self, segundos, linhas, chamador):
+        """Soma uma execução às estatísticas"""
+        self.execucoes += 1
+        self.tempo_total += segundos
+        self.tempo_maximo = max(self.tempo_maximo, segundos)
+        self.linhas += linhas
+        self.histograma[bisect.bisect_left(FAIXAS_MS, segundos * 1000)] += 1
+        self.chamadores[chamador] += 1
+    
+    def como_dict(self):
+        """Resumo em dicionário, pronto para virar DataFrame ou ser comparado em testes"""
+        return {
+            'sql': self.sql,
+            'execucoes': self.execucoes,
+            'tempo_total_ms': self.tempo_total * 1000,
+            'tempo_medio_ms': self.tempo_total * 1000 / self.execucoes,
+            'tempo_maximo_ms': self.tempo_maximo * 1000,
+            'linhas': self.linhas,
+            'histograma': {f'<= {limite:g} ms': quantidade
+                           for limite, quantidade in zip(FAIXAS_MS, self.histograma)},
+            'chamadores': dict(self.chamadores),
+        }
+
+class Instrumentacao:
+    """Coleta as métricas das consultas e grava as lentas em um log rotativo
+    
+    limite_lento é o tempo (em segundos) a partir do qual a consulta vai para o
+    log; None desliga o log. explicar recebe (query, params) e devolve as linhas
+    do EXPLAIN QUERY PLAN; o DatabaseManager passa o próprio explain_query_plan.
+    """
+    
+    def __init__(self, limite_lento=0.2, arquivo_log='consultas_lentas.log',
+                 tamanho_max_log=1_000_000, backups_log=3):
+        self.limite_lento = limite_lento
+        self.explicar = None
+        self._estatisticas = {}
+        self._lock = threading.Lock()
+        
+        self.logger = logging.getLogger(f'petshop.consultas_lentas.{id(self)}')
+        self.logger.setLevel(logging.WARNING)
+        self.logger.propagate = False
+        if arquivo_log:
+            # delay=True: o arquivo só é criado quando a primeira consulta lenta aparece
+            handler = RotatingFileHandler(arquivo_log, maxBytes=tamanho_max_log,
+                                          backupCount=backups_log, encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.logger.addHandler(handler)
+    
+    def registrar(self, query, params, segundos, linhas, chamador):
+        """Contabiliza uma execução e, se passou do limite, grava no log de lentas"""
+        sql = normalizar_sql(query)
+        with self._lock:
+            estatistica = self._estatisticas.get(sql)
+            if estatistica is None:
+                estatistica = self._estatisticas[sql] = EstatisticaConsulta(sql)
+            estatistica.registrar(segundos, linhas, chamador)
+        
+        if self.limite_lento is not None and segundos >= self.limite_lento:
+            self._registrar_lenta(query, params, segundos, linhas, chamador)
+    
+    def _registrar_lenta(self, query, params, segundos, linhas, chamador):
+        """Grava a consulta lenta com o plano de execução"""
+        plano = ''
+        if self.explicar is not None:
+            try:
+                plano = '\n'.join(f'    {detalhe}' for _, _, detalhe in self.explicar(query, params))
+            except Exception as e:
+                plano = f'    (plano indisponível: {e})'
+        
+        self.logger.warning('%.1f ms, %d linha(s), %s\n  %s\n  params: %r\n%s',
+                            segundos * 1000, linhas, chamador, normalizar_sql(query), params, plano)
+    
+    def estatisticas(self, ordenar_por='tempo_total_ms'):
+        """Resumo de todas as consultas vistas, da mais custosa para a menos"""
+        with self._lock:
+            resumo = [estatistica.como_dict() for estatistica in self._estatisticas.values()]
+        return sorted(resumo, key=lambda item: item[ordenar_por], reverse=True)
+    
+    def limpar(self):
+        """Zera as estatísticas acumuladas"""
+        with self._lock:
+            self._estatisticas.clear()
+    
+    def fechar(self):
+        """Fecha o arquivo do log de consultas lentas"""
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
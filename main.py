@@ -4,8 +4,12 @@
 import os
 import sys
 from datetime import datetime, date, timedelta
-from database import DatabaseManager
-from models import Produto, Cliente, Pet, Venda, Agendamento, Categoria
+from database import DatabaseManager, intervalo_datas, intervalo_mes
+from models import (Produto, Cliente, Pet, Venda, Agendamento, Categoria, ConflitoEstoqueError,
+                    EstoqueInsuficienteError, ConflitoAgendamentoError, HORIZONTE_SERIES_DIAS)
+
+# Linhas por página nas listagens do terminal
+TAMANHO_PAGINA = 20
 
 class PetShopSystem:
     def __init__(self):
@@ -25,6 +29,21 @@ class PetShopSystem:
         """Pausa e aguarda o usuário pressionar Enter"""
         input("\nPressione Enter para continuar...")
     
+    def paginas(self, buscar_pagina):
+        """Percorre uma listagem página por página, perguntando antes de buscar a próxima
+        
+        buscar_pagina recebe o cursor (apos) e devolve uma Pagina do modelo.
+        """
+        cursor = None
+        while True:
+            pagina = buscar_pagina(cursor)
+            yield from pagina.itens
+            if pagina.proximo is None:
+                return
+            if input("\n-- Enter para a próxima página, 'q' para parar: ").strip().lower() == 'q':
+                return
+            cursor = pagina.proximo
+    
     def exibir_header(self, titulo):
         """Exibe cabeçalho formatado"""
         print("=" * 60)
@@ -116,7 +135,7 @@ class PetShopSystem:
             categorias = self.categoria_manager.listar_todas()
             print("\nCategorias disponíveis:")
             for cat in categorias:
-                print(f"{cat[0]}. {cat[1]}")
+                print(f"{cat.id}. {cat.nome}")
             
             categoria_id = int(input("\nID da categoria: "))
             preco = float(input("Preço (R$): "))
@@ -148,16 +167,18 @@ class PetShopSystem:
         self.limpar_tela()
         self.exibir_header("LISTA DE PRODUTOS")
         
-        produtos = self.produto_manager.listar_todos()
-        
-        if not produtos:
+        # Uma página por vez: nem o catálogo inteiro na memória nem na tela
+        encontrou = False
+        for produto in self.paginas(lambda apos: self.produto_manager.listar_pagina(apos, TAMANHO_PAGINA)):
+            if not encontrou:
+                print(f"{'ID':<5} {'Nome':<30} {'Categoria':<20} {'Preço':<10} {'Estoque':<10}")
+                print("-" * 75)
+                encontrou = True
+            categoria = produto.categoria_nome if produto.categoria_nome else "Sem categoria"
+            print(f"{produto.id:<5} {produto.nome[:29]:<30} {categoria[:19]:<20} R${produto.preco:<9.2f} {produto.estoque_atual:<10}")
+        
+        if not encontrou:
             print("❌ Nenhum produto cadastrado!")
-        else:
-            print(f"{'ID':<5} {'Nome':<30} {'Categoria':<20} {'Preço':<10} {'Estoque':<10}")
-            print("-" * 75)
-            for produto in produtos:
-                categoria = produto[12] if produto[12] else "Sem categoria"
-                print(f"{produto[0]:<5} {produto[1][:29]:<30} {categoria[:19]:<20} R${produto[3]:<9.2f} {produto[4]:<10}")
         
         self.pausar()
     
@@ -166,13 +187,13 @@ class PetShopSystem:
         self.limpar_tela()
         self.exibir_header("BUSCAR PRODUTO")
         
-        nome = input("Digite parte do nome do produto: ").strip()
+        nome = input("Digite nome, marca ou código (pode ser só o início das palavras): ").strip()
         if not nome:
             print("❌ Nome é obrigatório!")
             self.pausar()
             return
         
-        produtos = self.produto_manager.buscar_por_nome(nome)
+        produtos = self.produto_manager.buscar(nome)
         
         if not produtos:
             print("❌ Nenhum produto encontrado!")
@@ -180,8 +201,8 @@ class PetShopSystem:
             print(f"{'ID':<5} {'Nome':<30} {'Categoria':<20} {'Preço':<10} {'Estoque':<10}")
             print("-" * 75)
             for produto in produtos:
-                categoria = produto[12] if produto[12] else "Sem categoria"
-                print(f"{produto[0]:<5} {produto[1][:29]:<30} {categoria[:19]:<20} R${produto[3]:<9.2f} {produto[4]:<10}")
+                categoria = produto.categoria_nome if produto.categoria_nome else "Sem categoria"
+                print(f"{produto.id:<5} {produto.nome[:29]:<30} {categoria[:19]:<20} R${produto.preco:<9.2f} {produto.estoque_atual:<10}")
         
         self.pausar()
     
@@ -198,8 +219,8 @@ class PetShopSystem:
             print(f"{'ID':<5} {'Nome':<30} {'Categoria':<20} {'Atual':<8} {'Mínimo':<8}")
             print("-" * 73)
             for produto in produtos:
-                categoria = produto[12] if produto[12] else "Sem categoria"
-                print(f"{produto[0]:<5} {produto[1][:29]:<30} {categoria[:19]:<20} {produto[4]:<8} {produto[5]:<8}")
+                categoria = produto.categoria_nome if produto.categoria_nome else "Sem categoria"
+                print(f"{produto.id:<5} {produto.nome[:29]:<30} {categoria[:19]:<20} {produto.estoque_atual:<8} {produto.estoque_minimo:<8}")
         
         self.pausar()
     
@@ -217,17 +238,19 @@ class PetShopSystem:
                 self.pausar()
                 return
             
-            print(f"\nProduto: {produto[1]}")
-            print(f"Estoque atual: {produto[4]}")
+            print(f"\nProduto: {produto.nome}")
+            print(f"Estoque atual: {produto.estoque_atual}")
             
             nova_quantidade = int(input("Nova quantidade: "))
             motivo = input("Motivo da alteração: ").strip() or "Ajuste manual"
             
-            if self.produto_manager.atualizar_estoque(produto_id, nova_quantidade, motivo):
+            if self.produto_manager.atualizar_estoque(produto_id, nova_quantidade, motivo, versao=produto.versao):
                 print("✅ Estoque atualizado com sucesso!")
             else:
                 print("❌ Erro ao atualizar estoque!")
             
+        except ConflitoEstoqueError as e:
+            print(f"❌ O produto foi alterado por outra operação (estoque agora: {e.itens[0][3]}). Tente novamente.")
         except ValueError:
             print("❌ ID deve ser um número!")
         except Exception as e:
@@ -270,8 +293,8 @@ class PetShopSystem:
             print(f"{'ID':<5} {'Nome':<25} {'Descrição':<40}")
             print("-" * 70)
             for categoria in categorias:
-                descricao = categoria[2] if categoria[2] else ""
-                print(f"{categoria[0]:<5} {categoria[1]:<25} {descricao[:39]:<40}")
+                descricao = categoria.descricao if categoria.descricao else ""
+                print(f"{categoria.id:<5} {categoria.nome:<25} {descricao[:39]:<40}")
         
         self.pausar()
     
@@ -357,17 +380,18 @@ class PetShopSystem:
         self.limpar_tela()
         self.exibir_header("LISTA DE CLIENTES")
         
-        clientes = self.cliente_manager.listar_todos()
-        
-        if not clientes:
+        encontrou = False
+        for cliente in self.paginas(lambda apos: self.cliente_manager.listar_pagina(apos, TAMANHO_PAGINA)):
+            if not encontrou:
+                print(f"{'ID':<5} {'Nome':<30} {'Telefone':<15} {'Email':<25}")
+                print("-" * 75)
+                encontrou = True
+            telefone = cliente.telefone if cliente.telefone else ""
+            email = cliente.email if cliente.email else ""
+            print(f"{cliente.id:<5} {cliente.nome[:29]:<30} {telefone:<15} {email[:24]:<25}")
+        
+        if not encontrou:
             print("❌ Nenhum cliente cadastrado!")
-        else:
-            print(f"{'ID':<5} {'Nome':<30} {'Telefone':<15} {'Email':<25}")
-            print("-" * 75)
-            for cliente in clientes:
-                telefone = cliente[3] if cliente[3] else ""
-                email = cliente[4] if cliente[4] else ""
-                print(f"{cliente[0]:<5} {cliente[1][:29]:<30} {telefone:<15} {email[:24]:<25}")
         
         self.pausar()
     
@@ -376,23 +400,25 @@ class PetShopSystem:
         self.limpar_tela()
         self.exibir_header("BUSCAR CLIENTE")
         
-        nome = input("Digite parte do nome do cliente: ").strip()
+        nome = input("Digite nome, telefone, CPF ou nome do pet: ").strip()
         if not nome:
             print("❌ Nome é obrigatório!")
             self.pausar()
             return
         
-        clientes = self.cliente_manager.buscar_por_nome(nome)
+        encontrados = self.cliente_manager.buscar(nome)
         
-        if not clientes:
+        if not encontrados:
             print("❌ Nenhum cliente encontrado!")
         else:
             print(f"{'ID':<5} {'Nome':<30} {'Telefone':<15} {'Email':<25}")
             print("-" * 75)
-            for cliente in clientes:
-                telefone = cliente[3] if cliente[3] else ""
-                email = cliente[4] if cliente[4] else ""
-                print(f"{cliente[0]:<5} {cliente[1][:29]:<30} {telefone:<15} {email[:24]:<25}")
+            for cliente, pets in encontrados:
+                telefone = cliente.telefone if cliente.telefone else ""
+                email = cliente.email if cliente.email else ""
+                print(f"{cliente.id:<5} {cliente.nome[:29]:<30} {telefone:<15} {email[:24]:<25}")
+                if pets:
+                    print(f"{'':<5} 🐾 {', '.join(f'{pet.nome} ({pet.especie})' for pet in pets)}")
         
         self.pausar()
     
@@ -411,23 +437,23 @@ class PetShopSystem:
                 return
             
             print(f"\nDados atuais do cliente:")
-            print(f"Nome: {cliente[1]}")
-            print(f"CPF: {cliente[2] if cliente[2] else 'Não informado'}")
-            print(f"Telefone: {cliente[3] if cliente[3] else 'Não informado'}")
-            print(f"Email: {cliente[4] if cliente[4] else 'Não informado'}")
-            print(f"Endereço: {cliente[5] if cliente[5] else 'Não informado'}")
-            print(f"Cidade: {cliente[6] if cliente[6] else 'Não informado'}")
-            print(f"CEP: {cliente[7] if cliente[7] else 'Não informado'}")
+            print(f"Nome: {cliente.nome}")
+            print(f"CPF: {cliente.cpf if cliente.cpf else 'Não informado'}")
+            print(f"Telefone: {cliente.telefone if cliente.telefone else 'Não informado'}")
+            print(f"Email: {cliente.email if cliente.email else 'Não informado'}")
+            print(f"Endereço: {cliente.endereco if cliente.endereco else 'Não informado'}")
+            print(f"Cidade: {cliente.cidade if cliente.cidade else 'Não informado'}")
+            print(f"CEP: {cliente.cep if cliente.cep else 'Não informado'}")
             
             print("\nDigite os novos dados (pressione Enter para manter o atual):")
             
-            nome = input(f"Nome [{cliente[1]}]: ").strip() or cliente[1]
-            cpf = input(f"CPF [{cliente[2] if cliente[2] else ''}]: ").strip() or cliente[2]
-            telefone = input(f"Telefone [{cliente[3] if cliente[3] else ''}]: ").strip() or cliente[3]
-            email = input(f"Email [{cliente[4] if cliente[4] else ''}]: ").strip() or cliente[4]
-            endereco = input(f"Endereço [{cliente[5] if cliente[5] else ''}]: ").strip() or cliente[5]
-            cidade = input(f"Cidade [{cliente[6] if cliente[6] else ''}]: ").strip() or cliente[6]
-            cep = input(f"CEP [{cliente[7] if cliente[7] else ''}]: ").strip() or cliente[7]
+            nome = input(f"Nome [{cliente.nome}]: ").strip() or cliente.nome
+            cpf = input(f"CPF [{cliente.cpf if cliente.cpf else ''}]: ").strip() or cliente.cpf
+            telefone = input(f"Telefone [{cliente.telefone if cliente.telefone else ''}]: ").strip() or cliente.telefone
+            email = input(f"Email [{cliente.email if cliente.email else ''}]: ").strip() or cliente.email
+            endereco = input(f"Endereço [{cliente.endereco if cliente.endereco else ''}]: ").strip() or cliente.endereco
+            cidade = input(f"Cidade [{cliente.cidade if cliente.cidade else ''}]: ").strip() or cliente.cidade
+            cep = input(f"CEP [{cliente.cep if cliente.cep else ''}]: ").strip() or cliente.cep
             
             if self.cliente_manager.atualizar(cliente_id, nome, cpf, telefone, email, endereco, cidade, cep):
                 print("✅ Cliente atualizado com sucesso!")
@@ -484,7 +510,7 @@ class PetShopSystem:
             
             print("Clientes cadastrados:")
             for cliente in clientes[:10]:  # Mostrar apenas os primeiros 10
-                print(f"{cliente[0]}. {cliente[1]} - {cliente[3] if cliente[3] else 'Sem telefone'}")
+                print(f"{cliente.id}. {cliente.nome} - {cliente.telefone if cliente.telefone else 'Sem telefone'}")
             
             if len(clientes) > 10:
                 print("... (digite o ID do cliente desejado)")
@@ -533,17 +559,18 @@ class PetShopSystem:
         self.limpar_tela()
         self.exibir_header("LISTA DE PETS")
         
-        pets = self.pet_manager.listar_todos()
-        
-        if not pets:
+        encontrou = False
+        for pet in self.paginas(lambda apos: self.pet_manager.listar_pagina(apos, TAMANHO_PAGINA)):
+            if not encontrou:
+                print(f"{'ID':<5} {'Nome':<20} {'Espécie':<15} {'Raça':<15} {'Cliente':<25}")
+                print("-" * 80)
+                encontrou = True
+            raca = pet.raca if pet.raca else "Não informada"
+            cliente_nome = pet.cliente_nome  # cliente_nome vem da query JOIN
+            print(f"{pet.id:<5} {pet.nome[:19]:<20} {pet.especie[:14]:<15} {raca[:14]:<15} {cliente_nome[:24]:<25}")
+        
+        if not encontrou:
             print("❌ Nenhum pet cadastrado!")
-        else:
-            print(f"{'ID':<5} {'Nome':<20} {'Espécie':<15} {'Raça':<15} {'Cliente':<25}")
-            print("-" * 80)
-            for pet in pets:
-                raca = pet[4] if pet[4] else "Não informada"
-                cliente_nome = pet[9]  # cliente_nome vem da query JOIN
-                print(f"{pet[0]:<5} {pet[1][:19]:<20} {pet[3][:14]:<15} {raca[:14]:<15} {cliente_nome[:24]:<25}")
         
         self.pausar()
     
@@ -566,9 +593,9 @@ class PetShopSystem:
             print(f"{'ID':<5} {'Nome':<20} {'Espécie':<15} {'Raça':<15} {'Cliente':<25}")
             print("-" * 80)
             for pet in pets:
-                raca = pet[4] if pet[4] else "Não informada"
-                cliente_nome = pet[9]  # cliente_nome vem da query JOIN
-                print(f"{pet[0]:<5} {pet[1][:19]:<20} {pet[3][:14]:<15} {raca[:14]:<15} {cliente_nome[:24]:<25}")
+                raca = pet.raca if pet.raca else "Não informada"
+                cliente_nome = pet.cliente_nome  # cliente_nome vem da query JOIN
+                print(f"{pet.id:<5} {pet.nome[:19]:<20} {pet.especie[:14]:<15} {raca[:14]:<15} {cliente_nome[:24]:<25}")
         
         self.pausar()
     
@@ -588,7 +615,7 @@ class PetShopSystem:
             
             pets = self.pet_manager.listar_por_cliente(cliente_id)
             
-            print(f"\nPets do cliente: {cliente[1]}")
+            print(f"\nPets do cliente: {cliente.nome}")
             print("-" * 60)
             
             if not pets:
@@ -597,8 +624,8 @@ class PetShopSystem:
                 print(f"{'ID':<5} {'Nome':<20} {'Espécie':<15} {'Raça':<15}")
                 print("-" * 55)
                 for pet in pets:
-                    raca = pet[4] if pet[4] else "Não informada"
-                    print(f"{pet[0]:<5} {pet[1][:19]:<20} {pet[3][:14]:<15} {raca[:14]:<15}")
+                    raca = pet.raca if pet.raca else "Não informada"
+                    print(f"{pet.id:<5} {pet.nome[:19]:<20} {pet.especie[:14]:<15} {raca[:14]:<15}")
             
         except ValueError:
             print("❌ ID deve ser um número!")
@@ -643,13 +670,13 @@ class PetShopSystem:
             cliente_id = None
             
             if resposta == 's':
-                cliente_nome = input("Digite parte do nome do cliente: ").strip()
+                cliente_nome = input("Digite nome, telefone ou CPF do cliente: ").strip()
                 if cliente_nome:
-                    clientes = self.cliente_manager.buscar_por_nome(cliente_nome)
+                    clientes = self.cliente_manager.buscar(cliente_nome, limite=5)
                     if clientes:
                         print("\nClientes encontrados:")
-                        for cliente in clientes[:5]:
-                            print(f"{cliente[0]}. {cliente[1]} - {cliente[3] if cliente[3] else 'Sem telefone'}")
+                        for cliente, _ in clientes:
+                            print(f"{cliente.id}. {cliente.nome} - {cliente.telefone if cliente.telefone else 'Sem telefone'}")
                         
                         cliente_id = int(input("ID do cliente (0 para venda sem cliente): "))
                         if cliente_id == 0:
@@ -657,75 +684,90 @@ class PetShopSystem:
                     else:
                         print("❌ Cliente não encontrado. Venda será sem cliente.")
             
-            # Criar venda
+            # Dados da venda
             forma_pagamento = input("Forma de pagamento (Dinheiro/Cartão/PIX): ").strip() or "Dinheiro"
             desconto = float(input("Desconto em R$ (0 para sem desconto): ") or "0")
             
-            venda_id = self.venda_manager.criar_venda(cliente_id, desconto, forma_pagamento)
-            print(f"\n✅ Venda #{venda_id} criada!")
-            
-            # Adicionar itens
+            # Montar o carrinho; nada é gravado até a confirmação
+            carrinho = []
             while True:
-                print(f"\n--- VENDA #{venda_id} ---")
-                produto_nome = input("Nome do produto (ou 'fim' para finalizar): ").strip()
+                print(f"\n--- CARRINHO ({len(carrinho)} item(ns)) ---")
+                produto_nome = input("Nome, marca ou código do produto (ou 'fim' para finalizar): ").strip()
                 
                 if produto_nome.lower() == 'fim':
                     break
                 
-                produtos = self.produto_manager.buscar_por_nome(produto_nome)
-                if not produtos:
-                    print("❌ Produto não encontrado!")
-                    continue
-                
-                print("\nProdutos encontrados:")
-                for produto in produtos[:5]:
-                    print(f"{produto[0]}. {produto[1]} - R${produto[3]:.2f} (Estoque: {produto[4]})")
-                
-                produto_id = int(input("ID do produto: "))
-                produto = self.produto_manager.buscar_por_id(produto_id)
+                # Código de barras exato (leitor) vai direto ao produto, sem lista para escolher
+                produto = self.produto_manager.buscar_por_codigo_barras(produto_nome)
+                if produto is None:
+                    produtos = self.produto_manager.buscar(produto_nome, limite=5)
+                    if not produtos:
+                        print("❌ Produto não encontrado!")
+                        continue
+                    
+                    print("\nProdutos encontrados:")
+                    for produto in produtos[:5]:
+                        print(f"{produto.id}. {produto.nome} - R${produto.preco:.2f} (Estoque: {produto.estoque_atual})")
+                    
+                    produto_id = int(input("ID do produto: "))
+                    produto = self.produto_manager.buscar_por_id(produto_id)
+                    
+                    if not produto:
+                        print("❌ Produto não encontrado!")
+                        continue
+                else:
+                    produto_id = produto.id
+                    print(f"📷 {produto.nome} - R${produto.preco:.2f} (Estoque: {produto.estoque_atual})")
                 
-                if not produto:
-                    print("❌ Produto não encontrado!")
-                    continue
+                no_carrinho = sum(item['quantidade'] for item in carrinho if item['produto_id'] == produto_id)
+                disponivel = produto.estoque_atual - no_carrinho
                 
-                if produto[4] <= 0:  # estoque_atual
+                if disponivel <= 0:
                     print("❌ Produto sem estoque!")
                     continue
                 
-                quantidade = int(input(f"Quantidade (máx {produto[4]}): "))
+                quantidade = int(input(f"Quantidade (máx {disponivel}): "))
                 
-                if quantidade > produto[4]:
-                    print(f"❌ Estoque insuficiente! Disponível: {produto[4]}")
+                if quantidade > disponivel:
+                    print(f"❌ Estoque insuficiente! Disponível: {disponivel}")
                     continue
                 
-                if self.venda_manager.adicionar_item(venda_id, produto_id, quantidade):
-                    print(f"✅ {quantidade}x {produto[1]} adicionado à venda!")
-                else:
-                    print("❌ Erro ao adicionar item!")
+                carrinho.append({
+                    'produto_id': produto.id,
+                    'nome': produto.nome,
+                    'quantidade': quantidade,
+                    'preco_unitario': produto.preco,
+                    'subtotal': quantidade * produto.preco
+                })
+                print(f"✅ {quantidade}x {produto.nome} adicionado à venda!")
             
             # Finalizar venda
-            venda_info = self.venda_manager.buscar_venda(venda_id)
-            if venda_info and venda_info['itens']:
-                print(f"\n--- RESUMO DA VENDA #{venda_id} ---")
-                print(f"Cliente: {venda_info['venda'][7] if venda_info['venda'][7] else 'Não informado'}")
-                print(f"Forma de pagamento: {venda_info['venda'][4]}")
+            if carrinho:
+                print("\n--- RESUMO DA VENDA ---")
+                print(f"Forma de pagamento: {forma_pagamento}")
                 
                 print("\nItens:")
-                for item in venda_info['itens']:
-                    print(f"- {item[3]}x {item[6]} - R${item[5]:.2f}")
+                for item in carrinho:
+                    print(f"- {item['quantidade']}x {item['nome']} - R${item['subtotal']:.2f}")
                 
-                print(f"\nDesconto: R${venda_info['venda'][2]:.2f}")
-                print(f"TOTAL: R${venda_info['venda'][1]:.2f}")
+                print(f"\nDesconto: R${desconto:.2f}")
+                print(f"TOTAL: R${sum(item['subtotal'] for item in carrinho) - desconto:.2f}")
                 
                 confirma = input("\nConfirmar venda? (s/n): ").strip().lower()
                 if confirma == 's':
-                    self.venda_manager.finalizar_venda(venda_id)
-                    print("✅ Venda finalizada com sucesso!")
+                    venda_id = self.venda_manager.registrar_venda_completa(
+                        cliente_id, carrinho, desconto, forma_pagamento
+                    )
+                    print(f"✅ Venda #{venda_id} finalizada com sucesso!")
                 else:
                     print("❌ Venda cancelada!")
             else:
                 print("❌ Nenhum item foi adicionado à venda!")
             
+        except EstoqueInsuficienteError as e:
+            print("❌ Venda não gravada: estoque insuficiente (outra venda pode ter baixado antes):")
+            for _, nome, quantidade, estoque in e.itens:
+                print(f"   - {nome}: pedido {quantidade}, disponível agora {estoque}")
         except ValueError:
             print("❌ Erro nos valores inseridos!")
         except Exception as e:
@@ -738,17 +780,18 @@ class PetShopSystem:
         self.limpar_tela()
         self.exibir_header("VENDAS RECENTES")
         
-        vendas = self.venda_manager.listar_vendas(30)
-        
-        if not vendas:
+        encontrou = False
+        for venda in self.paginas(lambda apos: self.venda_manager.listar_pagina(apos=apos, limite=TAMANHO_PAGINA)):
+            if not encontrou:
+                print(f"{'ID':<5} {'Data':<12} {'Cliente':<25} {'Total':<12} {'Pagamento':<12}")
+                print("-" * 66)
+                encontrou = True
+            data = venda.data_venda[:10] if venda.data_venda else ""  # Só a data, sem hora
+            cliente = venda.cliente_nome if venda.cliente_nome else "Não informado"
+            print(f"{venda.id:<5} {data:<12} {cliente[:24]:<25} R${venda.total:<11.2f} {venda.forma_pagamento[:11]:<12}")
+        
+        if not encontrou:
             print("❌ Nenhuma venda registrada!")
-        else:
-            print(f"{'ID':<5} {'Data':<12} {'Cliente':<25} {'Total':<12} {'Pagamento':<12}")
-            print("-" * 66)
-            for venda in vendas:
-                data = venda[5][:10] if venda[5] else ""  # Só a data, sem hora
-                cliente = venda[6] if venda[6] else "Não informado"
-                print(f"{venda[0]:<5} {data:<12} {cliente[:24]:<25} R${venda[1]:<11.2f} {venda[4][:11]:<12}")
         
         self.pausar()
     
@@ -767,18 +810,18 @@ class PetShopSystem:
                 venda = venda_info['venda']
                 itens = venda_info['itens']
                 
-                print(f"\n--- VENDA #{venda[0]} ---")
-                print(f"Data: {venda[5]}")
-                print(f"Cliente: {venda[7] if venda[7] else 'Não informado'}")
-                print(f"Forma de pagamento: {venda[4]}")
+                print(f"\n--- VENDA #{venda.id} ---")
+                print(f"Data: {venda.data_venda}")
+                print(f"Cliente: {venda.cliente_nome if venda.cliente_nome else 'Não informado'}")
+                print(f"Forma de pagamento: {venda.forma_pagamento}")
                 
                 if itens:
                     print("\nItens:")
                     for item in itens:
-                        print(f"- {item[3]}x {item[6]} - R${item[4]:.2f} cada = R${item[5]:.2f}")
+                        print(f"- {item.quantidade}x {item.produto_nome} - R${item.preco_unitario:.2f} cada = R${item.subtotal:.2f}")
                 
-                print(f"\nDesconto: R${venda[2]:.2f}")
-                print(f"TOTAL: R${venda[1]:.2f}")
+                print(f"\nDesconto: R${venda.desconto:.2f}")
+                print(f"TOTAL: R${venda.total:.2f}")
             
         except ValueError:
             print("❌ ID deve ser um número!")
@@ -789,13 +832,17 @@ class PetShopSystem:
     
     def menu_agendamentos(self):
         """Menu de agendamentos e serviços"""
+        # Horizonte das séries recorrentes avança a cada entrada no menu
+        self.agendamento_manager.gerar_ocorrencias()
+        
         while True:
             self.limpar_tela()
             self.exibir_header("AGENDAMENTOS E SERVIÇOS")
             print("1. 📅 Novo Agendamento")
             print("2. 📋 Listar Agendamentos")
             print("3. ✅ Atualizar Status")
-            print("4. 🛠️  Tipos de Serviços")
+            print("4. 🔁 Séries Recorrentes")
+            print("5. 🛠️  Tipos de Serviços")
             print("0. ⬅️  Voltar")
             print("-" * 60)
             
@@ -808,6 +855,8 @@ class PetShopSystem:
             elif opcao == "3":
                 self.atualizar_status_agendamento()
             elif opcao == "4":
+                self.menu_series()
+            elif opcao == "5":
                 self.listar_tipos_servicos()
             elif opcao == "0":
                 break
@@ -815,6 +864,153 @@ class PetShopSystem:
                 print("❌ Opção inválida!")
                 self.pausar()
     
+    def menu_series(self):
+        """Menu de séries de agendamentos recorrentes"""
+        while True:
+            self.limpar_tela()
+            self.exibir_header("SÉRIES RECORRENTES")
+            print("1. ➕ Nova Série")
+            print("2. 📋 Listar Séries")
+            print("3. 🕐 Remarcar Horário")
+            print("4. 🚫 Cancelar Série")
+            print("0. ⬅️  Voltar")
+            print("-" * 60)
+            
+            opcao = input("Escolha uma opção: ").strip()
+            
+            if opcao == "1":
+                self.nova_serie()
+            elif opcao == "2":
+                self.listar_series()
+                self.pausar()
+            elif opcao == "3":
+                self.remarcar_serie()
+            elif opcao == "4":
+                self.cancelar_serie()
+            elif opcao == "0":
+                break
+            else:
+                print("❌ Opção inválida!")
+                self.pausar()
+    
+    def nova_serie(self):
+        """Cria uma série de agendamentos recorrentes"""
+        self.limpar_tela()
+        self.exibir_header("NOVA SÉRIE")
+        
+        try:
+            cliente_id = int(input("ID do cliente: "))
+            cliente = self.cliente_manager.buscar_por_id(cliente_id)
+            if not cliente:
+                print("❌ Cliente não encontrado!")
+                self.pausar()
+                return
+            
+            pets = self.pet_manager.listar_por_cliente(cliente_id)
+            if not pets:
+                print("❌ Este cliente não possui pets cadastrados!")
+                self.pausar()
+                return
+            
+            print(f"\nPets de {cliente.nome}:")
+            for pet in pets:
+                print(f"{pet.id}. {pet.nome} ({pet.especie})")
+            pet_id = int(input("ID do pet: "))
+            
+            print("\nServiços disponíveis:")
+            for servico in self.agendamento_manager.listar_tipos_servicos():
+                print(f"{servico.id}. {servico.nome} - R${servico.preco_base:.2f}")
+            tipo_servico_id = int(input("ID do serviço: "))
+            
+            try:
+                inicio = datetime.strptime(input("\nPrimeira data e hora (DD/MM/AAAA HH:MM): ").strip(), "%d/%m/%Y %H:%M")
+            except ValueError:
+                print("❌ Formato de data inválido!")
+                self.pausar()
+                return
+            
+            intervalo_dias = int(input("Repetir a cada quantos dias: "))
+            
+            # Sem data limite nem número de vezes, a série segue até ser cancelada
+            data_limite = input("Última data (DD/MM/AAAA, opcional): ").strip()
+            data_limite = datetime.strptime(data_limite, "%d/%m/%Y").date() if data_limite else None
+            ocorrencias = input("Número de vezes (opcional): ").strip()
+            ocorrencias = int(ocorrencias) if ocorrencias else None
+            
+            observacoes = input("Observações (opcional): ").strip() or None
+            
+            serie_id, criados, conflitos = self.agendamento_manager.criar_serie(
+                cliente_id, pet_id, tipo_servico_id, inicio, intervalo_dias, data_limite, ocorrencias, observacoes
+            )
+            
+            print(f"✅ Série #{serie_id} criada com {criados} agendamento(s) nos próximos {HORIZONTE_SERIES_DIAS} dias!")
+            for _, data_hora in conflitos:
+                print(f"⚠️  {data_hora.strftime('%d/%m/%Y %H:%M')} pulado: horário sem vaga")
+        
+        except ValueError:
+            print("❌ Erro nos valores inseridos!")
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+        
+        self.pausar()
+    
+    def listar_series(self):
+        """Lista as séries ativas"""
+        self.limpar_tela()
+        self.exibir_header("SÉRIES ATIVAS")
+        
+        series = self.agendamento_manager.listar_series()
+        if not series:
+            print("Nenhuma série ativa.")
+            return False
+        
+        print(f"{'ID':<5} {'Cliente':<20} {'Pet':<15} {'Serviço':<20} {'Início':<17} {'A cada':<8}")
+        print("-" * 90)
+        for serie in series:
+            print(f"{serie.id:<5} {serie.cliente_nome[:19]:<20} {serie.pet_nome[:14]:<15} "
+                  f"{serie.servico_nome[:19]:<20} {str(serie.inicio)[:16]:<17} {serie.intervalo_dias} dias")
+        return True
+    
+    def remarcar_serie(self):
+        """Muda o horário de todas as próximas ocorrências de uma série"""
+        if not self.listar_series():
+            self.pausar()
+            return
+        
+        try:
+            serie_id = int(input("\nID da série: "))
+            horario = datetime.strptime(input("Novo horário (HH:MM): ").strip(), "%H:%M").time()
+            
+            alterados = self.agendamento_manager.atualizar_serie(serie_id, horario=horario)
+            print(f"✅ {alterados} agendamento(s) remarcado(s)!")
+        except ConflitoAgendamentoError as e:
+            print(f"❌ {e}")
+        except ValueError:
+            print("❌ Erro nos valores inseridos!")
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+        
+        self.pausar()
+    
+    def cancelar_serie(self):
+        """Cancela uma série e as próximas ocorrências dela"""
+        if not self.listar_series():
+            self.pausar()
+            return
+        
+        try:
+            serie_id = int(input("\nID da série: "))
+            confirmacao = input("Confirma o cancelamento da série? (s/n): ").strip().lower()
+            if confirmacao == 's':
+                cancelados = self.agendamento_manager.cancelar_serie(serie_id)
+                print(f"✅ Série cancelada: {cancelados} agendamento(s) futuro(s) cancelado(s)!")
+        except ValueError:
+            print("❌ ID inválido!")
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+        
+        self.pausar()
+    
     def novo_agendamento(self):
         """Cria um novo agendamento"""
         self.limpar_tela()
@@ -822,21 +1018,22 @@ class PetShopSystem:
         
         try:
             # Selecionar cliente
-            cliente_nome = input("Digite parte do nome do cliente: ").strip()
+            cliente_nome = input("Digite nome, telefone ou CPF do cliente, ou nome do pet: ").strip()
             if not cliente_nome:
                 print("❌ Nome é obrigatório!")
                 self.pausar()
                 return
             
-            clientes = self.cliente_manager.buscar_por_nome(cliente_nome)
+            clientes = self.cliente_manager.buscar(cliente_nome, limite=5)
             if not clientes:
                 print("❌ Cliente não encontrado!")
                 self.pausar()
                 return
             
             print("\nClientes encontrados:")
-            for cliente in clientes[:5]:
-                print(f"{cliente[0]}. {cliente[1]} - {cliente[3] if cliente[3] else 'Sem telefone'}")
+            for cliente, pets in clientes:
+                nomes_pets = f" (pets: {', '.join(pet.nome for pet in pets)})" if pets else ""
+                print(f"{cliente.id}. {cliente.nome} - {cliente.telefone if cliente.telefone else 'Sem telefone'}{nomes_pets}")
             
             cliente_id = int(input("ID do cliente: "))
             cliente = self.cliente_manager.buscar_por_id(cliente_id)
@@ -852,9 +1049,9 @@ class PetShopSystem:
                 self.pausar()
                 return
             
-            print(f"\nPets de {cliente[1]}:")
+            print(f"\nPets de {cliente.nome}:")
             for pet in pets:
-                print(f"{pet[0]}. {pet[1]} ({pet[3]})")
+                print(f"{pet.id}. {pet.nome} ({pet.especie})")
             
             pet_id = int(input("ID do pet: "))
             pet = self.pet_manager.buscar_por_id(pet_id)
@@ -867,22 +1064,40 @@ class PetShopSystem:
             servicos = self.agendamento_manager.listar_tipos_servicos()
             print("\nServiços disponíveis:")
             for servico in servicos:
-                duracao = f"{servico[3]}min" if servico[3] else "N/A"
-                print(f"{servico[0]}. {servico[1]} - R${servico[2]:.2f} ({duracao})")
+                duracao = f"{servico.duracao_minutos}min" if servico.duracao_minutos else "N/A"
+                print(f"{servico.id}. {servico.nome} - R${servico.preco_base:.2f} ({duracao})")
             
             tipo_servico_id = int(input("ID do serviço: "))
             
-            # Data e hora
-            print("\nData do agendamento (formato: DD/MM/AAAA HH:MM):")
-            data_str = input("Data e hora: ").strip()
+            # Data: mostra os horários livres do dia antes de pedir a hora
+            data_str = input("\nData do agendamento (DD/MM/AAAA): ").strip()
             
             try:
-                data_agendamento = datetime.strptime(data_str, "%d/%m/%Y %H:%M")
+                dia = datetime.strptime(data_str, "%d/%m/%Y").date()
             except ValueError:
                 print("❌ Formato de data inválido!")
                 self.pausar()
                 return
             
+            livres = self.agendamento_manager.slots_livres(dia, tipo_servico_id, dias=1).get(dia, [])
+            if not livres:
+                print("❌ Nenhum horário livre neste dia para este serviço!")
+                self.pausar()
+                return
+            
+            print("\nHorários livres:")
+            for i in range(0, len(livres), 8):
+                print("  " + "  ".join(horario.strftime("%H:%M") for horario in livres[i:i + 8]))
+            
+            hora_str = input("Hora (HH:MM): ").strip()
+            
+            try:
+                data_agendamento = datetime.combine(dia, datetime.strptime(hora_str, "%H:%M").time())
+            except ValueError:
+                print("❌ Formato de hora inválido!")
+                self.pausar()
+                return
+            
             observacoes = input("Observações (opcional): ").strip() or None
             
             agendamento_id = self.agendamento_manager.criar_agendamento(
@@ -890,10 +1105,12 @@ class PetShopSystem:
             )
             
             print(f"✅ Agendamento #{agendamento_id} criado com sucesso!")
-            print(f"Cliente: {cliente[1]}")
-            print(f"Pet: {pet[1]}")
+            print(f"Cliente: {cliente.nome}")
+            print(f"Pet: {pet.nome}")
             print(f"Data: {data_agendamento.strftime('%d/%m/%Y às %H:%M')}")
             
+        except ConflitoAgendamentoError as e:
+            print(f"❌ {e}")
         except ValueError:
             print("❌ Erro nos valores inseridos!")
         except Exception as e:
@@ -939,29 +1156,31 @@ class PetShopSystem:
             self.pausar()
             return
         
-        agendamentos = self.agendamento_manager.listar_agendamentos(data_inicio, data_fim)
-        
-        if not agendamentos:
+        encontrou = False
+        for agendamento in self.paginas(lambda apos: self.agendamento_manager.listar_pagina(
+                data_inicio, data_fim, apos, TAMANHO_PAGINA)):
+            if not encontrou:
+                print(f"\n{'ID':<5} {'Data/Hora':<17} {'Cliente':<20} {'Pet':<15} {'Serviço':<20} {'Status':<12}")
+                print("-" * 89)
+                encontrou = True
+            data_hora = agendamento.data_agendamento[:16] if agendamento.data_agendamento else ""  # YYYY-MM-DD HH:MM
+            # Converter para formato brasileiro
+            if data_hora:
+                try:
+                    dt = datetime.strptime(data_hora, "%Y-%m-%d %H:%M")
+                    data_hora = dt.strftime("%d/%m/%Y %H:%M")
+                except:
+                    pass
+            
+            cliente_nome = agendamento.cliente_nome[:19] if agendamento.cliente_nome else ""
+            pet_nome = agendamento.pet_nome[:14] if agendamento.pet_nome else ""
+            servico_nome = agendamento.servico_nome[:19] if agendamento.servico_nome else ""
+            status = agendamento.status[:11] if agendamento.status else ""
+            
+            print(f"{agendamento.id:<5} {data_hora:<17} {cliente_nome:<20} {pet_nome:<15} {servico_nome:<20} {status:<12}")
+        
+        if not encontrou:
             print("❌ Nenhum agendamento encontrado!")
-        else:
-            print(f"\n{'ID':<5} {'Data/Hora':<17} {'Cliente':<20} {'Pet':<15} {'Serviço':<20} {'Status':<12}")
-            print("-" * 89)
-            for agendamento in agendamentos:
-                data_hora = agendamento[4][:16] if agendamento[4] else ""  # YYYY-MM-DD HH:MM
-                # Converter para formato brasileiro
-                if data_hora:
-                    try:
-                        dt = datetime.strptime(data_hora, "%Y-%m-%d %H:%M")
-                        data_hora = dt.strftime("%d/%m/%Y %H:%M")
-                    except:
-                        pass
-                
-                cliente_nome = agendamento[8][:19] if agendamento[8] else ""
-                pet_nome = agendamento[9][:14] if agendamento[9] else ""
-                servico_nome = agendamento[10][:19] if agendamento[10] else ""
-                status = agendamento[5][:11] if agendamento[5] else ""
-                
-                print(f"{agendamento[0]:<5} {data_hora:<17} {cliente_nome:<20} {pet_nome:<15} {servico_nome:<20} {status:<12}")
         
         self.pausar()
     
@@ -1024,9 +1243,9 @@ class PetShopSystem:
             print(f"{'ID':<5} {'Nome':<25} {'Preço':<12} {'Duração':<15} {'Descrição':<30}")
             print("-" * 87)
             for servico in servicos:
-                duracao = f"{servico[3]} min" if servico[3] else "N/A"
-                descricao = servico[4][:29] if servico[4] else ""
-                print(f"{servico[0]:<5} {servico[1][:24]:<25} R${servico[2]:<11.2f} {duracao:<15} {descricao:<30}")
+                duracao = f"{servico.duracao_minutos} min" if servico.duracao_minutos else "N/A"
+                descricao = servico.descricao[:29] if servico.descricao else ""
+                print(f"{servico.id:<5} {servico.nome[:24]:<25} R${servico.preco_base:<11.2f} {duracao:<15} {descricao:<30}")
         
         self.pausar()
     
@@ -1041,6 +1260,7 @@ class PetShopSystem:
             print("4. 👥 Clientes Cadastrados")
             print("5. 🐕 Pets por Espécie")
             print("6. 📅 Agendamentos do Dia")
+            print("7. 🗓️  Inventário em uma Data")
             print("0. ⬅️  Voltar")
             print("-" * 60)
             
@@ -1058,6 +1278,8 @@ class PetShopSystem:
                 self.relatorio_pets_especie()
             elif opcao == "6":
                 self.relatorio_agendamentos_dia()
+            elif opcao == "7":
+                self.relatorio_inventario_data()
             elif opcao == "0":
                 break
             else:
@@ -1070,17 +1292,19 @@ class PetShopSystem:
         self.exibir_header("RESUMO GERAL")
         
         try:
-            # Contar registros
-            total_produtos = len(self.produto_manager.listar_todos())
-            total_clientes = len(self.cliente_manager.listar_todos())
-            total_pets = len(self.pet_manager.listar_todos())
+            # Contar registros sem trazer as tabelas para a memória
+            total_produtos, total_clientes, total_pets = self.db.execute_query('''
+                SELECT (SELECT COUNT(*) FROM produtos),
+                       (SELECT COUNT(*) FROM clientes),
+                       (SELECT COUNT(*) FROM pets)
+            ''')[0]
             
             # Vendas do mês atual
             vendas_mes = self.db.execute_query('''
                 SELECT COUNT(*), COALESCE(SUM(total), 0)
                 FROM vendas 
-                WHERE strftime('%Y-%m', data_venda) = strftime('%Y-%m', 'now')
-            ''')
+                WHERE data_venda >= ? AND data_venda < ?
+            ''', intervalo_mes())
             
             total_vendas_mes = vendas_mes[0][0] if vendas_mes else 0
             valor_vendas_mes = vendas_mes[0][1] if vendas_mes else 0
@@ -1089,8 +1313,8 @@ class PetShopSystem:
             agendamentos_hoje = self.db.execute_query('''
                 SELECT COUNT(*)
                 FROM agendamentos 
-                WHERE DATE(data_agendamento) = DATE('now')
-            ''')
+                WHERE data_agendamento >= ? AND data_agendamento < ?
+            ''', intervalo_datas(date.today()))
             
             total_agendamentos_hoje = agendamentos_hoje[0][0] if agendamentos_hoje else 0
             
@@ -1135,10 +1359,10 @@ class PetShopSystem:
             vendas = self.db.execute_query('''
                 SELECT DATE(data_venda) as data, COUNT(*) as qtd_vendas, SUM(total) as total_vendas
                 FROM vendas 
-                WHERE DATE(data_venda) BETWEEN ? AND ?
+                WHERE data_venda >= ? AND data_venda < ?
                 GROUP BY DATE(data_venda)
                 ORDER BY data
-            ''', (data_inicio, data_fim))
+            ''', intervalo_datas(data_inicio, data_fim))
             
             if not vendas:
                 print("❌ Nenhuma venda encontrada no período!")
@@ -1171,47 +1395,85 @@ class PetShopSystem:
         self.limpar_tela()
         self.exibir_header("RELATÓRIO DE ESTOQUE")
         
-        produtos = self.produto_manager.listar_todos()
+        encontrou = False
+        valor_total_estoque = 0
         
-        if not produtos:
+        # Total acumulado enquanto os produtos são lidos em lotes
+        for produto in self.produto_manager.iterar_todos():
+            if not encontrou:
+                print(f"{'Nome':<30} {'Categoria':<20} {'Estoque':<10} {'Valor Total':<15}")
+                print("-" * 75)
+                encontrou = True
+            
+            categoria = produto.categoria_nome if produto.categoria_nome else "Sem categoria"
+            valor_total_produto = produto.preco * produto.estoque_atual
+            valor_total_estoque += valor_total_produto
+            
+            print(f"{produto.nome[:29]:<30} {categoria[:19]:<20} {produto.estoque_atual:<10} R${valor_total_produto:<14.2f}")
+        
+        if not encontrou:
             print("❌ Nenhum produto cadastrado!")
         else:
-            print(f"{'Nome':<30} {'Categoria':<20} {'Estoque':<10} {'Valor Total':<15}")
             print("-" * 75)
+            print(f"{'VALOR TOTAL DO ESTOQUE':<60} R${valor_total_estoque:<14.2f}")
+        
+        self.pausar()
+    
+    def relatorio_inventario_data(self):
+        """Inventário (estoque de cada produto) ao fim de uma data"""
+        self.limpar_tela()
+        self.exibir_header("INVENTÁRIO EM UMA DATA")
+        
+        try:
+            data = input("Data (DD/MM/AAAA, Enter para o fim do mês anterior): ").strip()
+            if data:
+                data = datetime.strptime(data, "%d/%m/%Y").date()
+            else:
+                data = date.today().replace(day=1) - timedelta(days=1)
             
-            valor_total_estoque = 0
+            inventario = self.produto_manager.inventario_em(data)
             
-            for produto in produtos:
-                categoria = produto[12] if produto[12] else "Sem categoria"
-                valor_total_produto = produto[3] * produto[4]  # preço * estoque
-                valor_total_estoque += valor_total_produto
+            if not inventario:
+                print("❌ Nenhum produto cadastrado até essa data!")
+            else:
+                print(f"Estoque ao fim de {data.strftime('%d/%m/%Y')}\n")
+                print(f"{'Nome':<30} {'Categoria':<20} {'Estoque':<10}")
+                print("-" * 60)
                 
-                print(f"{produto[1][:29]:<30} {categoria[:19]:<20} {produto[4]:<10} R${valor_total_produto:<14.2f}")
-            
-            print("-" * 75)
-            print(f"{'VALOR TOTAL DO ESTOQUE':<60} R${valor_total_estoque:<14.2f}")
+                total_unidades = 0
+                for _, nome, categoria, _, estoque in inventario:
+                    total_unidades += estoque
+                    print(f"{nome[:29]:<30} {(categoria or 'Sem categoria')[:19]:<20} {estoque:<10}")
+                
+                print("-" * 60)
+                print(f"{'TOTAL DE UNIDADES':<51} {total_unidades:<10}")
+        
+        except ValueError:
+            print("❌ Formato de data inválido!")
+        except Exception as e:
+            print(f"❌ Erro ao gerar relatório: {e}")
         
         self.pausar()
-    
+
     def relatorio_clientes(self):
         """Relatório de clientes cadastrados"""
         self.limpar_tela()
         self.exibir_header("CLIENTES CADASTRADOS")
         
-        clientes = self.cliente_manager.listar_todos()
+        total_clientes = self.db.execute_query('SELECT COUNT(*) FROM clientes')[0][0]
         
-        if not clientes:
+        if not total_clientes:
             print("❌ Nenhum cliente cadastrado!")
         else:
-            print(f"Total de clientes: {len(clientes)}")
+            print(f"Total de clientes: {total_clientes}")
             print(f"\n{'Nome':<30} {'Telefone':<15} {'Email':<25} {'Cidade':<20}")
             print("-" * 90)
             
-            for cliente in clientes:
-                telefone = cliente[3] if cliente[3] else ""
-                email = cliente[4] if cliente[4] else ""
-                cidade = cliente[6] if cliente[6] else ""
-                print(f"{cliente[1][:29]:<30} {telefone:<15} {email[:24]:<25} {cidade[:19]:<20}")
+            for cliente in self.cliente_manager.iterar_todos():
+                telefone = cliente.telefone if cliente.telefone else ""
+                email = cliente.email if cliente.email else ""
+                cidade = cliente.cidade if cliente.cidade else ""
+                print(f"{cliente.nome[:29]:<30} {telefone:<15} {email[:24]:<25} {cidade[:19]:<20}")
         
         self.pausar()
     
@@ -1263,11 +1525,11 @@ class PetShopSystem:
             
             for agendamento in agendamentos:
                 # Extrair hora
-                hora = agendamento[4][11:16] if len(agendamento[4]) > 16 else agendamento[4][-5:]
-                cliente_nome = agendamento[8][:24] if agendamento[8] else ""
-                pet_nome = agendamento[9][:14] if agendamento[9] else ""
-                servico_nome = agendamento[10][:19] if agendamento[10] else ""
-                status = agendamento[5][:11] if agendamento[5] else ""
+                hora = agendamento.data_agendamento[11:16] if len(agendamento.data_agendamento) > 16 else agendamento.data_agendamento[-5:]
+                cliente_nome = agendamento.cliente_nome[:24] if agendamento.cliente_nome else ""
+                pet_nome = agendamento.pet_nome[:14] if agendamento.pet_nome else ""
+                servico_nome = agendamento.servico_nome[:19] if agendamento.servico_nome else ""
+                status = agendamento.status[:11] if agendamento.status else ""
                 
                 print(f"{hora:<8} {cliente_nome:<25} {pet_nome:<15} {servico_nome:<20} {status:<12}")
         
@@ -1275,6 +1537,7 @@ class PetShopSystem:
 
 def main():
     """Função principal"""
+    sistema = None
     try:
         sistema = PetShopSystem()
         sistema.menu_principal()
@@ -1283,6 +1546,9 @@ def main():
     except Exception as e:
         print(f"\n❌ Erro fatal: {e}")
         print("Por favor, contate o suporte técnico.")
+    finally:
+        if sistema:
+            sistema.db.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
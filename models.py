@@ -1,10 +1,194 @@
-from database import DatabaseManager
-from datetime import datetime, timedelta
+from database import (DatabaseManager, intervalo_datas, fabrica_registro, tabela_existe,
+                      normalizar_nome, somente_digitos, SALDO_MOVIMENTACAO, AGENDAMENTO_ATIVO,
+                      DURACAO_PADRAO_MINUTOS)
+from catalogo import catalogo_de
+from datetime import datetime, date, time, timedelta
+from collections import namedtuple
+import bisect
 import re
 
+# Registros devolvidos pelas consultas dos modelos. São namedtuples: ocupam o mesmo
+# que uma tupla, o acesso por atributo não custa nada a mais e o acesso por
+# posição continua funcionando. A ordem dos campos é a das colunas nos SELECTs.
+ProdutoRegistro = namedtuple('ProdutoRegistro', [
+    'id', 'nome', 'categoria_id', 'preco', 'estoque_atual', 'estoque_minimo',
+    'codigo_barras', 'descricao', 'marca', 'peso', 'unidade_medida',
+    'created_at', 'updated_at', 'versao', 'categoria_nome'
+])
+ClienteRegistro = namedtuple('ClienteRegistro', [
+    'id', 'nome', 'cpf', 'telefone', 'email', 'endereco', 'cidade', 'cep', 'created_at'
+])
+PetRegistro = namedtuple('PetRegistro', [
+    'id', 'nome', 'cliente_id', 'especie', 'raca', 'idade', 'peso', 'cor',
+    'observacoes', 'created_at', 'cliente_nome', 'cliente_telefone'
+])
+VendaRegistro = namedtuple('VendaRegistro', [
+    'id', 'cliente_id', 'total', 'desconto', 'forma_pagamento', 'data_venda',
+    'observacoes', 'cliente_nome', 'cliente_telefone'
+])
+ItemVendaRegistro = namedtuple('ItemVendaRegistro', [
+    'id', 'venda_id', 'produto_id', 'quantidade', 'preco_unitario', 'subtotal', 'produto_nome'
+])
+AgendamentoRegistro = namedtuple('AgendamentoRegistro', [
+    'id', 'cliente_id', 'pet_id', 'tipo_servico_id', 'data_agendamento', 'status',
+    'preco', 'observacoes', 'created_at', 'cliente_nome', 'pet_nome', 'servico_nome', 'serie_id'
+])
+SerieRegistro = namedtuple('SerieRegistro', [
+    'id', 'cliente_id', 'pet_id', 'tipo_servico_id', 'inicio', 'intervalo_dias', 'data_limite',
+    'ocorrencias', 'proxima_ocorrencia', 'status', 'observacoes', 'created_at',
+    'cliente_nome', 'pet_nome', 'servico_nome'
+])
+TipoServicoRegistro = namedtuple('TipoServicoRegistro', [
+    'id', 'nome', 'preco_base', 'duracao_minutos', 'descricao', 'created_at', 'recurso'
+])
+CategoriaRegistro = namedtuple('CategoriaRegistro', ['id', 'nome', 'descricao', 'created_at'])
+# Resultado de Cliente.buscar: o cliente e a lista dos seus pets (PetRegistro)
+ClienteComPets = namedtuple('ClienteComPets', ['cliente', 'pets'])
+
+_produto = fabrica_registro(ProdutoRegistro)
+_cliente = fabrica_registro(ClienteRegistro)
+_pet = fabrica_registro(PetRegistro)
+_venda = fabrica_registro(VendaRegistro)
+_item_venda = fabrica_registro(ItemVendaRegistro)
+_agendamento = fabrica_registro(AgendamentoRegistro)
+_tipo_servico = fabrica_registro(TipoServicoRegistro)
+_serie = fabrica_registro(SerieRegistro)
+_categoria = fabrica_registro(CategoriaRegistro)
+
+def _completar(registro, obrigatorios, padroes):
+    """Completa uma tupla de argumentos posicionais com os valores padrão que faltam"""
+    registro = tuple(registro)
+    return registro + padroes[len(registro) - obrigatorios:]
+
+def _ids_inseridos(db, tabela, ultimo_id):
+    """IDs gerados por uma inserção em lote (AUTOINCREMENT nunca reaproveita IDs)"""
+    return [linha[0] for linha in db.execute_query(
+        f'SELECT id FROM {tabela} WHERE id > ? ORDER BY id', (ultimo_id,))]
+
+def _trigramas(texto):
+    """Conjunto de trechos de 3 letras do texto, usado para comparar nomes parecidos"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def _como_datahora(valor):
+    """Normaliza datetime, date ou texto ISO ('AAAA-MM-DD HH:MM[:SS]') para datetime"""
+    if isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, date):
+        return datetime.combine(valor, time())
+    return datetime.fromisoformat(str(valor))
+
+def _intervalos_lotados(ocupados, capacidade):
+    """Trechos em que os intervalos [início, fim) ocupados chegam à capacidade
+    
+    Devolve os trechos em ordem e sem sobreposição, em uma varredura dos
+    inícios e fins ordenados (um fim conta antes de um início no mesmo instante).
+    """
+    eventos = sorted([(inicio, 1) for inicio, _ in ocupados] + [(fim, -1) for _, fim in ocupados])
+    lotados = []
+    em_uso = 0
+    for instante, delta in eventos:
+        antes, em_uso = em_uso, em_uso + delta
+        if antes < capacidade <= em_uso:
+            lotado_desde = instante
+        elif em_uso < capacidade <= antes and lotado_desde < instante:
+            if lotados and lotados[-1][1] == lotado_desde:
+                lotados[-1] = (lotados[-1][0], instante)
+            else:
+                lotados.append((lotado_desde, instante))
+    return lotados
+
+def _maior_id(db, tabela):
+    """Maior ID atual da tabela, usado como marco antes de uma inserção em lote"""
+    return db.execute_query(f'SELECT COALESCE(MAX(id), 0) FROM {tabela}')[0][0]
+
+# Uma página de uma listagem: itens e o cursor da próxima página (None na última)
+Pagina = namedtuple('Pagina', ['itens', 'proximo'])
+
+def _paginar(db, select, ordem, apos, limite, row_factory, filtros=(), params=(),
+             decrescente=False, cached=False):
+    """Página por keyset: as linhas depois do cursor na ordem (chave, id), sem OFFSET
+    
+    select é a consulta sem WHERE nem ORDER BY e ordem é o par de colunas, por
+    exemplo ('p.nome', 'p.id'); o id desempata chaves repetidas. apos é o
+    cursor (valor da chave, id) da última linha da página anterior. Com o
+    índice da chave, qualquer página custa o mesmo que a primeira.
+    """
+    chave, coluna_id = ordem
+    comparacao, sentido = ('<', 'DESC') if decrescente else ('>', 'ASC')
+    filtros = list(filtros)
+    params = list(params)
+    if apos is not None:
+        filtros.append(f'({chave}, {coluna_id}) {comparacao} (?, ?)')
+        params.extend(apos)
+    
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ''
+    query = f'{select} {where} ORDER BY {chave} {sentido}, {coluna_id} {sentido} LIMIT ?'
+    # Uma linha a mais só para saber se existe próxima página
+    itens = db.execute_query(query, (*params, limite + 1), row_factory=row_factory, cached=cached)
+    if len(itens) <= limite:
+        return Pagina(itens, None)
+    
+    itens = itens[:limite]
+    ultimo = itens[-1]
+    return Pagina(itens, (getattr(ultimo, chave.split('.')[-1]), ultimo.id))
+
+class EstoqueInsuficienteError(Exception):
+    """Levantada quando uma venda deixaria algum produto com estoque negativo"""
+    
+    mensagem = 'Estoque insuficiente para'
+    
+    def __init__(self, itens):
+        # itens: lista de (produto_id, nome, quantidade_pedida, estoque_atual)
+        self.itens = itens
+        detalhes = ', '.join(f'{nome} (pedido: {quantidade}, disponível: {estoque})'
+                             for _, nome, quantidade, estoque in itens)
+        super().__init__(f'{self.mensagem}: {detalhes}')
+
+class ConflitoEstoqueError(EstoqueInsuficienteError):
+    """Levantada quando um produto mudou desde que foi lido (a versão não confere)
+    
+    itens tem o mesmo formato de EstoqueInsuficienteError, com o estoque atual;
+    versoes traz a versão atual de cada produto, para atualizar o carrinho.
+    """
+    
+    mensagem = 'Produto(s) alterado(s) desde a leitura'
+    
+    def __init__(self, itens, versoes):
+        super().__init__(itens)
+        self.versoes = versoes
+
+class ConflitoAgendamentoError(Exception):
+    """Levantada quando o recurso do serviço não tem vaga no horário pedido
+    
+    conflitos traz os agendamentos ativos que cruzam o intervalo, como
+    (agendamento_id, início, fim, pet_nome, servico_nome).
+    """
+    
+    def __init__(self, recurso, inicio, fim, conflitos):
+        self.recurso = recurso
+        self.inicio = inicio
+        self.fim = fim
+        self.conflitos = conflitos
+        detalhes = ', '.join(f'#{agendamento_id} {pet} - {servico} ({str(de)[11:16]} às {str(ate)[11:16]})'
+                             for agendamento_id, de, ate, pet, servico in conflitos)
+        super().__init__(f'Horário indisponível em {recurso} ({inicio:%d/%m/%Y %H:%M} às {fim:%H:%M}): {detalhes}')
+
 class Produto:
+    # Chamadas que plano_consultas.py executa (e desfaz) para ver o plano das
+    # consultas montadas em tempo de execução; os valores não importam
+    EXEMPLOS_PLANO = [
+        ('listar_pagina', ()),
+        ('listar_pagina', (('', 0),)),
+        ('buscar', ('racao premium',)),
+        ('buscar_por_codigo_barras', ('7891000001234',)),
+        ('estoque_em', (1, date(2024, 1, 2))),
+        ('inventario_em', (date(2024, 1, 2),)),
+        ('ajustar_estoque_lote', ([(1, 1), (2, -1)],)),
+    ]
+    
     def __init__(self, db_manager):
         self.db = db_manager
+        self._busca_textual = None
     
     def adicionar(self, nome, categoria_id, preco, estoque_atual=0, estoque_minimo=5, 
                   codigo_barras=None, descricao=None, marca=None, peso=None, unidade_medida=None):
@@ -14,68 +198,235 @@ class Produto:
                                 codigo_barras, descricao, marca, peso, unidade_medida)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
-        _, produto_id = self.db.execute_update(query, (nome, categoria_id, preco, estoque_atual, 
-                                                      estoque_minimo, codigo_barras, descricao, 
-                                                      marca, peso, unidade_medida))
-        
-        # Registrar movimentação de estoque se houver estoque inicial
-        if estoque_atual > 0:
-            self.registrar_movimentacao(produto_id, 'entrada', estoque_atual, 'Estoque inicial')
+        with self.db.transaction():
+            _, produto_id = self.db.execute_update(query, (nome, categoria_id, preco, estoque_atual, 
+                                                          estoque_minimo, codigo_barras, descricao, 
+                                                          marca, peso, unidade_medida))
+            
+            # Registrar movimentação de estoque se houver estoque inicial
+            if estoque_atual > 0:
+                self.registrar_movimentacao(produto_id, 'entrada', estoque_atual, 'Estoque inicial')
         
         return produto_id
     
-    def listar_todos(self):
-        """Lista todos os produtos com informações da categoria"""
+    def adicionar_varios(self, produtos):
+        """Adiciona vários produtos de uma vez, em uma única transação
+        
+        Cada item é uma tupla com os mesmos argumentos posicionais de adicionar()
+        (os opcionais do fim podem ser omitidos). As movimentações de estoque
+        inicial são gravadas por um único INSERT ... SELECT. Retorna os IDs criados.
+        """
         query = '''
-            SELECT p.*, c.nome as categoria_nome 
-            FROM produtos p 
-            LEFT JOIN categorias c ON p.categoria_id = c.id 
-            ORDER BY p.nome
+            INSERT INTO produtos (nome, categoria_id, preco, estoque_atual, estoque_minimo, 
+                                codigo_barras, descricao, marca, peso, unidade_medida)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
-        return self.db.execute_query(query)
+        padroes = (0, 5, None, None, None, None, None)
+        
+        with self.db.transaction():
+            ultimo_id = _maior_id(self.db, 'produtos')
+            self.db.execute_many(query, (_completar(p, 3, padroes) for p in produtos))
+            
+            self.db.execute_update('''
+                INSERT INTO movimentacoes_estoque (produto_id, tipo_movimentacao, quantidade, motivo)
+                SELECT id, 'entrada', estoque_atual, 'Estoque inicial'
+                FROM produtos
+                WHERE id > ? AND estoque_atual > 0
+            ''', (ultimo_id,))
+            
+            return _ids_inseridos(self.db, 'produtos', ultimo_id)
+    
+    _SELECT = '''
+        SELECT p.id, p.nome, p.categoria_id, p.preco, p.estoque_atual, p.estoque_minimo,
+               p.codigo_barras, p.descricao, p.marca, p.peso, p.unidade_medida,
+               p.created_at, p.updated_at, p.versao, c.nome as categoria_nome
+        FROM produtos p 
+        LEFT JOIN categorias c ON p.categoria_id = c.id 
+    '''
+    _QUERY_TODOS = _SELECT + 'ORDER BY p.nome, p.id'
+    
+    def listar_todos(self):
+        """Lista todos os produtos com informações da categoria"""
+        return self.db.execute_query(self._QUERY_TODOS, row_factory=_produto, cached=True)
+    
+    def listar_pagina(self, apos=None, limite=50):
+        """Uma página dos produtos em ordem de nome (Pagina com itens e cursor da próxima)"""
+        return _paginar(self.db, self._SELECT, ('p.nome', 'p.id'), apos, limite, _produto, cached=True)
+    
+    def iterar_todos(self, tamanho_lote=500):
+        """Percorre todos os produtos em lotes, sem carregar a tabela inteira na memória"""
+        for lote in self.db.iter_query(self._QUERY_TODOS, batch_size=tamanho_lote, row_factory=_produto):
+            yield from lote
     
     def buscar_por_id(self, produto_id):
         """Busca um produto por ID"""
         query = '''
-            SELECT p.*, c.nome as categoria_nome 
+            SELECT p.id, p.nome, p.categoria_id, p.preco, p.estoque_atual, p.estoque_minimo,
+                   p.codigo_barras, p.descricao, p.marca, p.peso, p.unidade_medida,
+                   p.created_at, p.updated_at, p.versao, c.nome as categoria_nome
             FROM produtos p 
             LEFT JOIN categorias c ON p.categoria_id = c.id 
             WHERE p.id = ?
         '''
-        resultado = self.db.execute_query(query, (produto_id,))
+        resultado = self.db.execute_query(query, (produto_id,), row_factory=_produto)
         return resultado[0] if resultado else None
     
+    def buscar_por_codigo_barras(self, codigo_barras):
+        """Produto com o código de barras exato, ou None
+        
+        Vem do catálogo em memória (catalogo.py), feito para o leitor do caixa:
+        devolve ItemCatalogo (id, codigo_barras, nome, preco, estoque_atual,
+        versao), que pode levar até um segundo para refletir alterações.
+        """
+        return catalogo_de(self.db).buscar(codigo_barras)
+    
     def buscar_por_nome(self, nome):
         """Busca produtos por nome (busca parcial)"""
         query = '''
-            SELECT p.*, c.nome as categoria_nome 
+            SELECT p.id, p.nome, p.categoria_id, p.preco, p.estoque_atual, p.estoque_minimo,
+                   p.codigo_barras, p.descricao, p.marca, p.peso, p.unidade_medida,
+                   p.created_at, p.updated_at, p.versao, c.nome as categoria_nome
             FROM produtos p 
             LEFT JOIN categorias c ON p.categoria_id = c.id 
             WHERE p.nome LIKE ?
             ORDER BY p.nome
         '''
-        return self.db.execute_query(query, (f'%{nome}%',))
+        return self.db.execute_query(query, (f'%{nome}%',), row_factory=_produto)
+    
+    def buscar(self, texto, limite=50):
+        """Busca produtos por nome, marca, descrição ou código de barras
+        
+        Cada palavra digitada vale como prefixo ("rac pre" acha "Ração Premium"),
+        sem diferenciar acentos, e todas precisam aparecer. Usa o índice FTS5
+        com os resultados mais relevantes primeiro; se o SQLite não tiver FTS5,
+        cai para LIKE em ordem alfabética.
+        """
+        termos = re.findall(r'\w+', texto)
+        if not termos:
+            return []
+        
+        if self._tem_busca_textual():
+            # Nome pesa mais que marca, que pesa mais que código e descrição
+            query = '''
+                SELECT p.id, p.nome, p.categoria_id, p.preco, p.estoque_atual, p.estoque_minimo,
+                       p.codigo_barras, p.descricao, p.marca, p.peso, p.unidade_medida,
+                       p.created_at, p.updated_at, p.versao, c.nome as categoria_nome
+                FROM produtos_fts
+                JOIN produtos p ON p.id = produtos_fts.rowid
+                LEFT JOIN categorias c ON p.categoria_id = c.id
+                WHERE produtos_fts MATCH ?
+                ORDER BY bm25(produtos_fts, 10.0, 5.0, 1.0, 2.0)
+                LIMIT ?
+            '''
+            consulta = ' '.join(f'"{termo}"*' for termo in termos)
+            return self.db.execute_query(query, (consulta, limite), row_factory=_produto)
+        
+        condicoes = ' AND '.join(
+            '(p.nome LIKE ? OR p.marca LIKE ? OR p.descricao LIKE ? OR p.codigo_barras LIKE ?)'
+            for _ in termos)
+        query = f'''
+            SELECT p.id, p.nome, p.categoria_id, p.preco, p.estoque_atual, p.estoque_minimo,
+                   p.codigo_barras, p.descricao, p.marca, p.peso, p.unidade_medida,
+                   p.created_at, p.updated_at, p.versao, c.nome as categoria_nome
+            FROM produtos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE {condicoes}
+            ORDER BY p.nome
+            LIMIT ?
+        '''
+        params = [f'%{termo}%' for termo in termos for _ in range(4)]
+        return self.db.execute_query(query, (*params, limite), row_factory=_produto)
     
-    def atualizar_estoque(self, produto_id, nova_quantidade, motivo='Ajuste manual'):
-        """Atualiza o estoque de um produto"""
-        # Buscar estoque atual
-        produto = self.buscar_por_id(produto_id)
-        if not produto:
-            return False
+    def _tem_busca_textual(self):
+        """Indica se o banco tem o índice produtos_fts (verificado uma vez)"""
+        if self._busca_textual is None:
+            with self.db.connection() as conn:
+                self._busca_textual = tabela_existe(conn, 'produtos_fts')
+        return self._busca_textual
+
+    def atualizar_estoque(self, produto_id, nova_quantidade, motivo='Ajuste manual', versao=None):
+        """Define o estoque de um produto (valor absoluto) registrando a diferença
         
-        estoque_atual = produto[4]  # estoque_atual está na posição 4
-        diferenca = nova_quantidade - estoque_atual
+        Com versao (a do produto quando o valor foi lido), levanta
+        ConflitoEstoqueError se o produto tiver mudado desde então.
+        """
+        with self.db.transaction():
+            # Dentro da transação (BEGIN IMMEDIATE) ninguém mais grava entre a leitura e o ajuste
+            atual = self.db.execute_query('SELECT nome, estoque_atual, versao FROM produtos WHERE id = ?',
+                                          (produto_id,))
+            if not atual:
+                return False
+            nome, estoque_atual, versao_atual = atual[0]
+            if versao is not None and versao != versao_atual:
+                raise ConflitoEstoqueError([(produto_id, nome, nova_quantidade, estoque_atual)],
+                                           {produto_id: versao_atual})
+            self.ajustar_estoque(produto_id, nova_quantidade - estoque_atual, motivo)
         
-        # Atualizar estoque
-        query = 'UPDATE produtos SET estoque_atual = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?'
-        rows_affected, _ = self.db.execute_update(query, (nova_quantidade, produto_id))
+        return True
+    
+    def ajustar_estoque(self, produto_id, delta, motivo='Ajuste manual'):
+        """Soma delta ao estoque (negativo para saída) e registra a movimentação
         
-        # Registrar movimentação
-        if diferenca != 0:
-            tipo_mov = 'entrada' if diferenca > 0 else 'saida'
-            self.registrar_movimentacao(produto_id, tipo_mov, abs(diferenca), motivo)
+        Retorna o novo estoque, ou None se o produto não existir. Se o estoque
+        ficaria negativo, levanta EstoqueInsuficienteError e nada é gravado.
+        """
+        return self.ajustar_estoque_lote([(produto_id, delta)], motivo).get(produto_id)
+    
+    def ajustar_estoque_lote(self, ajustes, motivo='Ajuste manual'):
+        """Aplica vários ajustes relativos de estoque em uma única transação
         
-        return rows_affected > 0
+        ajustes é um iterável de (produto_id, delta); deltas do mesmo produto são
+        somados. Retorna {produto_id: novo estoque}, sem os produtos que não
+        existem. Se algum produto ficaria negativo, levanta
+        EstoqueInsuficienteError com todos os que faltaram e nada é gravado.
+        """
+        deltas = {}
+        for produto_id, delta in ajustes:
+            deltas[produto_id] = deltas.get(produto_id, 0) + delta
+        if not deltas:
+            return {}
+        
+        with self.db.transaction():
+            # UPDATE relativo e condicional: o banco só aceita se o estoque não ficar negativo
+            recusados = []
+            for produto_id, delta in deltas.items():
+                rows_affected, _ = self.db.execute_update('''
+                    UPDATE produtos
+                    SET estoque_atual = estoque_atual + ?, versao = versao + 1,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND estoque_atual + ? >= 0
+                ''', (delta, produto_id, delta))
+                if rows_affected == 0:
+                    recusados.append(produto_id)
+            
+            # Recusado e existente = estoque insuficiente; o resto não existe
+            faltantes = self.db.execute_query(f'''
+                SELECT id, nome, estoque_atual FROM produtos WHERE id IN ({', '.join('?' * len(recusados))})
+            ''', recusados) if recusados else []
+            if faltantes:
+                raise EstoqueInsuficienteError([(produto_id, nome, -deltas[produto_id], estoque)
+                                                for produto_id, nome, estoque in faltantes])
+            
+            ajustados = [produto_id for produto_id in deltas if produto_id not in recusados]
+            movimentacoes = [(produto_id, 'entrada' if deltas[produto_id] > 0 else 'saida',
+                              abs(deltas[produto_id]), motivo)
+                             for produto_id in ajustados if deltas[produto_id] != 0]
+            if movimentacoes:
+                self.db.execute_many('''
+                    INSERT INTO movimentacoes_estoque (produto_id, tipo_movimentacao, quantidade, motivo)
+                    VALUES (?, ?, ?, ?)
+                ''', movimentacoes)
+            
+            return self._estoques(ajustados)
+    
+    def _estoques(self, produto_ids, tamanho_lote=500):
+        """Estoque atual de vários produtos, como {produto_id: estoque}"""
+        estoques = {}
+        for inicio in range(0, len(produto_ids), tamanho_lote):
+            lote = produto_ids[inicio:inicio + tamanho_lote]
+            estoques.update(self.db.execute_query(
+                f"SELECT id, estoque_atual FROM produtos WHERE id IN ({', '.join('?' * len(lote))})", lote))
+        return estoques
     
     def registrar_movimentacao(self, produto_id, tipo, quantidade, motivo):
         """Registra uma movimentação de estoque"""
@@ -85,16 +436,75 @@ class Produto:
         '''
         return self.db.execute_update(query, (produto_id, tipo, quantidade, motivo))
     
+    def estoque_em(self, produto_id, data):
+        """Estoque de um produto ao fim do dia data
+        
+        Parte do último checkpoint de saldo até a data e soma só as
+        movimentações posteriores a ele, sem refazer o histórico inteiro.
+        """
+        _, limite = intervalo_datas(data)
+        resultado = self.db.execute_query(f'''
+            SELECT COALESCE(c.saldo, 0) + (
+                       SELECT COALESCE(SUM({SALDO_MOVIMENTACAO}), 0)
+                       FROM movimentacoes_estoque
+                       WHERE produto_id = :produto_id
+                         AND id > COALESCE(c.movimentacao_id, 0)
+                         AND data_movimentacao < :limite
+                   )
+            FROM (SELECT 1)
+            LEFT JOIN (
+                SELECT movimentacao_id, saldo FROM checkpoints_estoque
+                WHERE produto_id = :produto_id AND data < :limite
+                ORDER BY movimentacao_id DESC
+                LIMIT 1
+            ) c
+        ''', {'produto_id': produto_id, 'limite': limite})
+        return resultado[0][0]
+    
+    def inventario_em(self, data):
+        """Estoque de todos os produtos ao fim do dia data (ex.: inventário de fim de mês)
+        
+        Retorna (id, nome, categoria_nome, preco, estoque) por produto,
+        calculado a partir do último checkpoint de cada um até a data.
+        """
+        _, limite = intervalo_datas(data)
+        query = f'''
+            WITH ultimos AS (
+                SELECT produto_id, MAX(movimentacao_id) AS movimentacao_id
+                FROM checkpoints_estoque
+                WHERE data < :limite
+                GROUP BY produto_id
+            )
+            SELECT p.id, p.nome, c.nome AS categoria_nome, p.preco,
+                   COALESCE(ck.saldo, 0) + (
+                       SELECT COALESCE(SUM({SALDO_MOVIMENTACAO}), 0)
+                       FROM movimentacoes_estoque m
+                       WHERE m.produto_id = p.id
+                         AND m.id > COALESCE(u.movimentacao_id, 0)
+                         AND m.data_movimentacao < :limite
+                   ) AS estoque
+            FROM produtos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            LEFT JOIN ultimos u ON u.produto_id = p.id
+            LEFT JOIN checkpoints_estoque ck
+                   ON ck.produto_id = u.produto_id AND ck.movimentacao_id = u.movimentacao_id
+            WHERE p.created_at < :limite
+            ORDER BY p.nome
+        '''
+        return self.db.execute_query(query, {'limite': limite})
+
     def produtos_estoque_baixo(self):
         """Lista produtos com estoque abaixo do mínimo"""
         query = '''
-            SELECT p.*, c.nome as categoria_nome 
+            SELECT p.id, p.nome, p.categoria_id, p.preco, p.estoque_atual, p.estoque_minimo,
+                   p.codigo_barras, p.descricao, p.marca, p.peso, p.unidade_medida,
+                   p.created_at, p.updated_at, p.versao, c.nome as categoria_nome
             FROM produtos p 
             LEFT JOIN categorias c ON p.categoria_id = c.id 
             WHERE p.estoque_atual <= p.estoque_minimo
             ORDER BY p.estoque_atual
         '''
-        return self.db.execute_query(query)
+        return self.db.execute_query(query, row_factory=_produto)
     
     def excluir(self, produto_id):
         """Exclui um produto"""
@@ -102,49 +512,206 @@ class Produto:
         rows_affected, _ = self.db.execute_update(query, (produto_id,))
         return rows_affected > 0
 
+def _com_campos_busca_cliente(nome, cpf, telefone, *outros):
+    """Argumentos de um cliente seguidos das colunas normalizadas de busca"""
+    return (nome, cpf, telefone, *outros, normalizar_nome(nome), somente_digitos(cpf), somente_digitos(telefone))
+
 class Cliente:
+    EXEMPLOS_PLANO = [
+        ('listar_pagina', ()),
+        ('listar_pagina', (('', 0),)),
+        ('buscar', ('maria',)),
+        ('buscar', ('9999',)),
+        ('buscar', ('maria 9999',)),
+        ('buscar_por_nome', ('maria',)),
+        ('buscar_por_cpf', ('123.456.789-01',)),
+    ]
+    
     def __init__(self, db_manager):
         self.db = db_manager
+        self._busca_textual = None
     
     def adicionar(self, nome, cpf=None, telefone=None, email=None, endereco=None, cidade=None, cep=None):
         """Adiciona um novo cliente"""
         query = '''
-            INSERT INTO clientes (nome, cpf, telefone, email, endereco, cidade, cep)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO clientes (nome, cpf, telefone, email, endereco, cidade, cep,
+                                  nome_busca, cpf_digitos, telefone_digitos)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
-        _, cliente_id = self.db.execute_update(query, (nome, cpf, telefone, email, endereco, cidade, cep))
+        _, cliente_id = self.db.execute_update(
+            query, _com_campos_busca_cliente(nome, cpf, telefone, email, endereco, cidade, cep))
         return cliente_id
     
+    def adicionar_varios(self, clientes):
+        """Adiciona vários clientes em uma única transação e retorna os IDs criados
+        
+        Cada item é uma tupla com os mesmos argumentos posicionais de adicionar().
+        """
+        query = '''
+            INSERT INTO clientes (nome, cpf, telefone, email, endereco, cidade, cep,
+                                  nome_busca, cpf_digitos, telefone_digitos)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        padroes = (None,) * 6
+        
+        with self.db.transaction():
+            ultimo_id = _maior_id(self.db, 'clientes')
+            self.db.execute_many(query, (_com_campos_busca_cliente(*_completar(c, 1, padroes))
+                                         for c in clientes))
+            return _ids_inseridos(self.db, 'clientes', ultimo_id)
+    
+    _SELECT = '''
+        SELECT id, nome, cpf, telefone, email, endereco, cidade, cep, created_at
+        FROM clientes
+    '''
+    _QUERY_TODOS = _SELECT + 'ORDER BY nome, id'
+    
     def listar_todos(self):
         """Lista todos os clientes"""
-        query = 'SELECT * FROM clientes ORDER BY nome'
-        return self.db.execute_query(query)
+        return self.db.execute_query(self._QUERY_TODOS, row_factory=_cliente, cached=True)
+    
+    def listar_pagina(self, apos=None, limite=50):
+        """Uma página dos clientes em ordem de nome (Pagina com itens e cursor da próxima)"""
+        return _paginar(self.db, self._SELECT, ('nome', 'id'), apos, limite, _cliente, cached=True)
+    
+    def iterar_todos(self, tamanho_lote=500):
+        """Percorre todos os clientes em lotes, sem carregar a tabela inteira na memória"""
+        for lote in self.db.iter_query(self._QUERY_TODOS, batch_size=tamanho_lote, row_factory=_cliente):
+            yield from lote
     
     def buscar_por_id(self, cliente_id):
         """Busca um cliente por ID"""
-        query = 'SELECT * FROM clientes WHERE id = ?'
-        resultado = self.db.execute_query(query, (cliente_id,))
+        query = '''
+            SELECT id, nome, cpf, telefone, email, endereco, cidade, cep, created_at
+            FROM clientes
+            WHERE id = ?
+        '''
+        resultado = self.db.execute_query(query, (cliente_id,), row_factory=_cliente)
         return resultado[0] if resultado else None
     
     def buscar_por_nome(self, nome):
-        """Busca clientes por nome"""
-        query = 'SELECT * FROM clientes WHERE nome LIKE ? ORDER BY nome'
-        return self.db.execute_query(query, (f'%{nome}%',))
+        """Busca clientes por parte do nome, sem diferenciar acentos"""
+        query = '''
+            SELECT id, nome, cpf, telefone, email, endereco, cidade, cep, created_at
+            FROM clientes
+            WHERE nome_busca LIKE ?
+            ORDER BY nome
+        '''
+        return self.db.execute_query(query, (f'%{normalizar_nome(nome) or ""}%',), row_factory=_cliente)
     
     def buscar_por_cpf(self, cpf):
-        """Busca cliente por CPF"""
-        query = 'SELECT * FROM clientes WHERE cpf = ?'
-        resultado = self.db.execute_query(query, (cpf,))
+        """Busca cliente por CPF, com ou sem pontuação"""
+        query = '''
+            SELECT id, nome, cpf, telefone, email, endereco, cidade, cep, created_at
+            FROM clientes
+            WHERE cpf_digitos = ?
+        '''
+        resultado = self.db.execute_query(query, (somente_digitos(cpf),), row_factory=_cliente)
         return resultado[0] if resultado else None
     
+    def buscar(self, texto, limite=20):
+        """Busca clientes por nome, telefone, CPF ou nome do pet, já com os pets de cada um
+        
+        Sem diferenciar acentos e maiúsculas. Números acham pedaços do telefone
+        ou do CPF ("9876", "123.456"); palavras acham pedaços do nome do cliente
+        ou dos pets e toleram erros de digitação ("fernada" acha "Fernanda").
+        Retorna uma lista de ClienteComPets, os mais parecidos primeiro.
+        """
+        nome = normalizar_nome(texto) or ''
+        palavras = re.findall(r'[^\W\d_]+', nome)
+        digitos = somente_digitos(texto) or ''
+        
+        if not palavras and len(digitos) < 3:
+            return []
+        
+        # O índice trigram só acha termos com 3 ou mais caracteres
+        trigramas = sorted({t for p in palavras for t in _trigramas(p)})
+        if self._tem_busca_textual() and (len(digitos) >= 3 or trigramas):
+            termos = []
+            if trigramas:
+                # Qualquer trigrama de qualquer palavra; bm25 põe os mais parecidos primeiro
+                termos.append('{nome pets} : (' + ' OR '.join(f'"{t}"' for t in trigramas) + ')')
+            if len(digitos) >= 3:
+                # Trecho contínuo do telefone ou do CPF
+                termos.append(f'{{telefone cpf}} : "{digitos}"')
+            consulta = ' AND '.join(termos)
+            encontrados = '''
+                SELECT rowid AS cliente_id, nome, pets, bm25(busca_clientes) AS relevancia
+                FROM busca_clientes
+                WHERE busca_clientes MATCH ?
+                ORDER BY relevancia
+                LIMIT ?
+            '''
+            # Candidatos a mais, porque os pouco parecidos são descartados abaixo
+            params = (consulta, limite * 3)
+        else:
+            # Sem o índice trigram: LIKE nas colunas normalizadas
+            condicoes = ['(c.nome_busca LIKE ? OR EXISTS (SELECT 1 FROM pets p WHERE p.cliente_id = c.id '
+                         'AND p.nome_busca LIKE ?))' for _ in palavras]
+            params = tuple(f'%{p}%' for p in palavras for _ in range(2))
+            if digitos:
+                condicoes.append('(c.telefone_digitos LIKE ? OR c.cpf_digitos LIKE ?)')
+                params += (f'%{digitos}%',) * 2
+            condicao = ' AND '.join(condicoes)
+            encontrados = f'''
+                SELECT c.id AS cliente_id, c.nome_busca AS nome, NULL AS pets, 0 AS relevancia
+                FROM clientes c
+                WHERE {condicao}
+                ORDER BY c.nome_busca
+                LIMIT ?
+            '''
+            params = (*params, limite)
+            palavras = []
+        
+        linhas = self.db.execute_query(f'''
+            WITH encontrados AS ({encontrados})
+            SELECT e.nome, e.pets,
+                   c.id, c.nome, c.cpf, c.telefone, c.email, c.endereco, c.cidade, c.cep, c.created_at,
+                   p.id, p.nome, p.cliente_id, p.especie, p.raca, p.idade, p.peso, p.cor,
+                   p.observacoes, p.created_at
+            FROM encontrados e
+            JOIN clientes c ON c.id = e.cliente_id
+            LEFT JOIN pets p ON p.cliente_id = c.id
+            ORDER BY e.relevancia, c.nome, c.id, p.nome
+        ''', params)
+        
+        resultados = {}
+        descartados = set()
+        for linha in linhas:
+            nome_busca, pets_busca = linha[0], linha[1]
+            cliente = ClienteRegistro._make(linha[2:11])
+            if cliente.id in descartados:
+                continue
+            if cliente.id not in resultados:
+                # Com erro de digitação vale o que tiver ao menos metade dos trigramas
+                alvo = _trigramas(f'{nome_busca or ""} {pets_busca or ""}')
+                if any(len(_trigramas(p) & alvo) < len(_trigramas(p)) / 2 for p in palavras if len(p) >= 3):
+                    descartados.add(cliente.id)
+                    continue
+                resultados[cliente.id] = ClienteComPets(cliente, [])
+            if linha[11] is not None:
+                resultados[cliente.id].pets.append(
+                    PetRegistro._make(linha[11:21] + (cliente.nome, cliente.telefone)))
+        
+        return list(resultados.values())[:limite]
+    
+    def _tem_busca_textual(self):
+        """Indica se o banco tem o índice busca_clientes (verificado uma vez)"""
+        if self._busca_textual is None:
+            with self.db.connection() as conn:
+                self._busca_textual = tabela_existe(conn, 'busca_clientes')
+        return self._busca_textual
+    
     def atualizar(self, cliente_id, nome, cpf=None, telefone=None, email=None, endereco=None, cidade=None, cep=None):
         """Atualiza dados de um cliente"""
         query = '''
             UPDATE clientes 
-            SET nome = ?, cpf = ?, telefone = ?, email = ?, endereco = ?, cidade = ?, cep = ?
+            SET nome = ?, cpf = ?, telefone = ?, email = ?, endereco = ?, cidade = ?, cep = ?,
+                nome_busca = ?, cpf_digitos = ?, telefone_digitos = ?
             WHERE id = ?
         '''
-        rows_affected, _ = self.db.execute_update(query, (nome, cpf, telefone, email, endereco, cidade, cep, cliente_id))
+        rows_affected, _ = self.db.execute_update(
+            query, (*_com_campos_busca_cliente(nome, cpf, telefone, email, endereco, cidade, cep), cliente_id))
         return rows_affected > 0
     
     def excluir(self, cliente_id):
@@ -154,63 +721,102 @@ class Cliente:
         return rows_affected > 0
 
 class Pet:
+    EXEMPLOS_PLANO = [
+        ('listar_pagina', ()),
+        ('listar_pagina', (('', 0),)),
+    ]
+    
     def __init__(self, db_manager):
         self.db = db_manager
     
     def adicionar(self, nome, cliente_id, especie, raca=None, idade=None, peso=None, cor=None, observacoes=None):
         """Adiciona um novo pet"""
         query = '''
-            INSERT INTO pets (nome, cliente_id, especie, raca, idade, peso, cor, observacoes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO pets (nome, cliente_id, especie, raca, idade, peso, cor, observacoes, nome_busca)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
-        _, pet_id = self.db.execute_update(query, (nome, cliente_id, especie, raca, idade, peso, cor, observacoes))
+        _, pet_id = self.db.execute_update(query, (nome, cliente_id, especie, raca, idade, peso, cor, observacoes,
+                                                   normalizar_nome(nome)))
         return pet_id
     
+    def adicionar_varios(self, pets):
+        """Adiciona vários pets em uma única transação e retorna os IDs criados
+        
+        Cada item é uma tupla com os mesmos argumentos posicionais de adicionar().
+        """
+        query = '''
+            INSERT INTO pets (nome, cliente_id, especie, raca, idade, peso, cor, observacoes, nome_busca)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        padroes = (None,) * 5
+        
+        with self.db.transaction():
+            ultimo_id = _maior_id(self.db, 'pets')
+            self.db.execute_many(query, ((*registro, normalizar_nome(registro[0]))
+                                         for registro in (_completar(p, 3, padroes) for p in pets)))
+            return _ids_inseridos(self.db, 'pets', ultimo_id)
+    
+    _SELECT = '''
+        SELECT p.id, p.nome, p.cliente_id, p.especie, p.raca, p.idade, p.peso, p.cor,
+               p.observacoes, p.created_at, c.nome as cliente_nome, c.telefone as cliente_telefone
+        FROM pets p
+        JOIN clientes c ON p.cliente_id = c.id
+    '''
+    _QUERY_TODOS = _SELECT + 'ORDER BY p.nome, p.id'
+    
     def listar_todos(self):
         """Lista todos os pets com informações do cliente"""
+        return self.db.execute_query(self._QUERY_TODOS, row_factory=_pet)
+    
+    def listar_pagina(self, apos=None, limite=50):
+        """Uma página dos pets em ordem de nome (Pagina com itens e cursor da próxima)"""
+        return _paginar(self.db, self._SELECT, ('p.nome', 'p.id'), apos, limite, _pet)
+    
+    def listar_por_cliente(self, cliente_id):
+        """Lista pets de um cliente específico"""
         query = '''
-            SELECT p.*, c.nome as cliente_nome, c.telefone as cliente_telefone
+            SELECT p.id, p.nome, p.cliente_id, p.especie, p.raca, p.idade, p.peso, p.cor,
+                   p.observacoes, p.created_at, c.nome as cliente_nome, c.telefone as cliente_telefone
             FROM pets p
             JOIN clientes c ON p.cliente_id = c.id
+            WHERE p.cliente_id = ?
             ORDER BY p.nome
         '''
-        return self.db.execute_query(query)
-    
-    def listar_por_cliente(self, cliente_id):
-        """Lista pets de um cliente específico"""
-        query = 'SELECT * FROM pets WHERE cliente_id = ? ORDER BY nome'
-        return self.db.execute_query(query, (cliente_id,))
+        return self.db.execute_query(query, (cliente_id,), row_factory=_pet)
     
     def buscar_por_id(self, pet_id):
         """Busca um pet por ID"""
         query = '''
-            SELECT p.*, c.nome as cliente_nome, c.telefone as cliente_telefone
+            SELECT p.id, p.nome, p.cliente_id, p.especie, p.raca, p.idade, p.peso, p.cor,
+                   p.observacoes, p.created_at, c.nome as cliente_nome, c.telefone as cliente_telefone
             FROM pets p
             JOIN clientes c ON p.cliente_id = c.id
             WHERE p.id = ?
         '''
-        resultado = self.db.execute_query(query, (pet_id,))
+        resultado = self.db.execute_query(query, (pet_id,), row_factory=_pet)
         return resultado[0] if resultado else None
     
     def buscar_por_nome(self, nome):
-        """Busca pets por nome"""
+        """Busca pets por parte do nome, sem diferenciar acentos"""
         query = '''
-            SELECT p.*, c.nome as cliente_nome, c.telefone as cliente_telefone
+            SELECT p.id, p.nome, p.cliente_id, p.especie, p.raca, p.idade, p.peso, p.cor,
+                   p.observacoes, p.created_at, c.nome as cliente_nome, c.telefone as cliente_telefone
             FROM pets p
             JOIN clientes c ON p.cliente_id = c.id
-            WHERE p.nome LIKE ?
+            WHERE p.nome_busca LIKE ?
             ORDER BY p.nome
         '''
-        return self.db.execute_query(query, (f'%{nome}%',))
+        return self.db.execute_query(query, (f'%{normalizar_nome(nome) or ""}%',), row_factory=_pet)
     
     def atualizar(self, pet_id, nome, especie, raca=None, idade=None, peso=None, cor=None, observacoes=None):
         """Atualiza dados de um pet"""
         query = '''
             UPDATE pets 
-            SET nome = ?, especie = ?, raca = ?, idade = ?, peso = ?, cor = ?, observacoes = ?
+            SET nome = ?, especie = ?, raca = ?, idade = ?, peso = ?, cor = ?, observacoes = ?, nome_busca = ?
             WHERE id = ?
         '''
-        rows_affected, _ = self.db.execute_update(query, (nome, especie, raca, idade, peso, cor, observacoes, pet_id))
+        rows_affected, _ = self.db.execute_update(query, (nome, especie, raca, idade, peso, cor, observacoes,
+                                                          normalizar_nome(nome), pet_id))
         return rows_affected > 0
     
     def excluir(self, pet_id):
@@ -220,6 +826,12 @@ class Pet:
         return rows_affected > 0
 
 class Venda:
+    EXEMPLOS_PLANO = [
+        ('listar_pagina', ()),
+        ('listar_pagina', (date(2024, 1, 1), date(2024, 1, 31), ('2024-01-31', 0))),
+        ('registrar_venda_completa', (None, [{'produto_id': 1, 'quantidade': 1}])),
+    ]
+    
     def __init__(self, db_manager):
         self.db = db_manager
     
@@ -234,25 +846,26 @@ class Venda:
     
     def adicionar_item(self, venda_id, produto_id, quantidade, preco_unitario=None):
         """Adiciona um item à venda"""
-        # Se não foi informado preço unitário, usar o preço atual do produto
-        if preco_unitario is None:
-            produto_query = 'SELECT preco FROM produtos WHERE id = ?'
-            resultado = self.db.execute_query(produto_query, (produto_id,))
-            if not resultado:
-                return False
-            preco_unitario = resultado[0][0]
-        
-        subtotal = quantidade * preco_unitario
-        
-        # Adicionar item
-        query = '''
-            INSERT INTO itens_venda (venda_id, produto_id, quantidade, preco_unitario, subtotal)
-            VALUES (?, ?, ?, ?, ?)
-        '''
-        rows_affected, _ = self.db.execute_update(query, (venda_id, produto_id, quantidade, preco_unitario, subtotal))
-        
-        # Atualizar total da venda
-        self.atualizar_total_venda(venda_id)
+        with self.db.transaction():
+            # Se não foi informado preço unitário, usar o preço atual do produto
+            if preco_unitario is None:
+                produto_query = 'SELECT preco FROM produtos WHERE id = ?'
+                resultado = self.db.execute_query(produto_query, (produto_id,))
+                if not resultado:
+                    return False
+                preco_unitario = resultado[0][0]
+            
+            subtotal = quantidade * preco_unitario
+            
+            # Adicionar item
+            query = '''
+                INSERT INTO itens_venda (venda_id, produto_id, quantidade, preco_unitario, subtotal)
+                VALUES (?, ?, ?, ?, ?)
+            '''
+            rows_affected, _ = self.db.execute_update(query, (venda_id, produto_id, quantidade, preco_unitario, subtotal))
+            
+            # Atualizar total da venda
+            self.atualizar_total_venda(venda_id)
         
         return rows_affected > 0
     
@@ -269,117 +882,626 @@ class Venda:
         '''
         return self.db.execute_update(query, (venda_id, venda_id))
     
-    def finalizar_venda(self, venda_id):
-        """Finaliza a venda e atualiza o estoque"""
-        # Buscar itens da venda
-        query = '''
-            SELECT produto_id, quantidade 
-            FROM itens_venda 
-            WHERE venda_id = ?
-        '''
-        itens = self.db.execute_query(query, (venda_id,))
+    def registrar_venda_completa(self, cliente_id, itens, desconto=0, forma_pagamento='Dinheiro',
+                                 observacoes=None):
+        """Grava a venda inteira (venda, itens e baixa de estoque) em uma transação
         
-        produto_manager = Produto(self.db)
+        itens é uma lista de dicionários com produto_id, quantidade e,
+        opcionalmente, preco_unitario (o formato do carrinho do app); sem preço
+        vale o preço atual do produto. Os preços são buscados em uma consulta,
+        os itens inseridos em bloco e o total calculado uma vez. Retorna o id
+        da venda.
         
-        # Reduzir estoque para cada item
-        for produto_id, quantidade in itens:
-            produto = produto_manager.buscar_por_id(produto_id)
-            if produto:
-                novo_estoque = produto[4] - quantidade  # estoque_atual está na posição 4
-                produto_manager.atualizar_estoque(produto_id, novo_estoque, f'Venda #{venda_id}')
+        A baixa é um compare-and-swap no próprio estoque: cada produto só é
+        baixado se ainda tiver a quantidade pedida (somando as linhas repetidas).
+        Alterações no produto desde que foi posto no carrinho (preço, outra venda,
+        ajuste) não recusam a venda; se faltar estoque, a venda inteira é recusada
+        com EstoqueInsuficienteError, trazendo o estoque atual de cada item.
+        """
+        itens = list(itens)
+        if not itens:
+            raise ValueError('A venda precisa de pelo menos um item')
+        
+        with self.db.transaction():
+            # Preços atuais de todos os produtos do carrinho de uma vez
+            produto_ids = list({item['produto_id'] for item in itens})
+            precos = dict(self.db.execute_query(
+                f"SELECT id, preco FROM produtos WHERE id IN ({', '.join('?' * len(produto_ids))})",
+                produto_ids))
+            inexistentes = [produto_id for produto_id in produto_ids if produto_id not in precos]
+            if inexistentes:
+                raise ValueError(f'Produto(s) não encontrado(s): {inexistentes}')
+            
+            linhas = []
+            for item in itens:
+                preco_unitario = item.get('preco_unitario')
+                if preco_unitario is None:
+                    preco_unitario = precos[item['produto_id']]
+                linhas.append((item['produto_id'], item['quantidade'], preco_unitario,
+                               item['quantidade'] * preco_unitario))
+            total = sum(subtotal for *_, subtotal in linhas) - desconto
+            
+            _, venda_id = self.db.execute_update('''
+                INSERT INTO vendas (cliente_id, total, desconto, forma_pagamento, observacoes)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (cliente_id, total, desconto, forma_pagamento, observacoes))
+            
+            self.db.execute_many('''
+                INSERT INTO itens_venda (venda_id, produto_id, quantidade, preco_unitario, subtotal)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(venda_id, *linha) for linha in linhas])
+            
+            # Baixa com compare-and-swap: cada produto só é atualizado se ainda tiver o estoque pedido
+            quantidades = {}
+            for item in itens:
+                quantidades[item['produto_id']] = quantidades.get(item['produto_id'], 0) + item['quantidade']
+            
+            recusados = []
+            for produto_id, quantidade in quantidades.items():
+                rows_affected, _ = self.db.execute_update('''
+                    UPDATE produtos
+                    SET estoque_atual = estoque_atual - ?, versao = versao + 1,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND estoque_atual >= ?
+                ''', (quantidade, produto_id, quantidade))
+                if rows_affected == 0:
+                    recusados.append(produto_id)
+            
+            if recusados:
+                atuais = self.db.execute_query(f'''
+                    SELECT id, nome, estoque_atual FROM produtos
+                    WHERE id IN ({', '.join('?' * len(recusados))})
+                ''', recusados)
+                raise EstoqueInsuficienteError([(produto_id, nome, quantidades[produto_id], estoque)
+                                                for produto_id, nome, estoque in atuais])
+            
+            self._registrar_saidas(venda_id)
+        
+        return venda_id
+
+    def finalizar_venda(self, venda_id):
+        """Finaliza a venda e atualiza o estoque
+        
+        A baixa é feita em bloco para todos os itens da venda: uma conferência,
+        um UPDATE relativo e um INSERT das movimentações. Se algum produto ficar
+        com estoque negativo, levanta EstoqueInsuficienteError e nada é gravado.
+        """
+        with self.db.transaction():
+            # Conferir de uma vez se algum item deixaria o estoque negativo
+            faltantes = self.db.execute_query('''
+                SELECT p.id, p.nome, SUM(iv.quantidade) as quantidade, p.estoque_atual
+                FROM itens_venda iv
+                JOIN produtos p ON iv.produto_id = p.id
+                WHERE iv.venda_id = ?
+                GROUP BY p.id
+                HAVING SUM(iv.quantidade) > p.estoque_atual
+            ''', (venda_id,))
+            if faltantes:
+                raise EstoqueInsuficienteError(faltantes)
+            
+            # Reduzir o estoque de todos os produtos da venda de uma vez
+            self.db.execute_update('''
+                UPDATE produtos
+                SET estoque_atual = estoque_atual - (
+                        SELECT SUM(iv.quantidade)
+                        FROM itens_venda iv
+                        WHERE iv.venda_id = ? AND iv.produto_id = produtos.id
+                    ),
+                    versao = versao + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (SELECT produto_id FROM itens_venda WHERE venda_id = ?)
+            ''', (venda_id, venda_id))
+            
+            self._registrar_saidas(venda_id)
         
         return True
     
+    def _registrar_saidas(self, venda_id):
+        """Registra as movimentações de saída de uma venda em um único INSERT"""
+        self.db.execute_update('''
+            INSERT INTO movimentacoes_estoque (produto_id, tipo_movimentacao, quantidade, motivo)
+            SELECT produto_id, 'saida', SUM(quantidade), ?
+            FROM itens_venda
+            WHERE venda_id = ?
+            GROUP BY produto_id
+        ''', (f'Venda #{venda_id}', venda_id))
+    
+    _SELECT = '''
+        SELECT v.id, v.cliente_id, v.total, v.desconto, v.forma_pagamento, v.data_venda,
+               v.observacoes, c.nome as cliente_nome, c.telefone as cliente_telefone
+        FROM vendas v
+        LEFT JOIN clientes c ON v.cliente_id = c.id
+    '''
+    
     def listar_vendas(self, limite=50):
         """Lista as vendas mais recentes"""
-        query = '''
-            SELECT v.*, c.nome as cliente_nome
-            FROM vendas v
-            LEFT JOIN clientes c ON v.cliente_id = c.id
-            ORDER BY v.data_venda DESC
-            LIMIT ?
-        '''
-        return self.db.execute_query(query, (limite,))
+        return self.listar_pagina(limite=limite).itens
+    
+    def listar_vendas_periodo(self, data_inicio, data_fim, limite=50):
+        """Lista as vendas mais recentes de um período (datas inclusivas)"""
+        return self.listar_pagina(data_inicio, data_fim, limite=limite).itens
+    
+    def listar_pagina(self, data_inicio=None, data_fim=None, apos=None, limite=50):
+        """Uma página das vendas, das mais recentes para as mais antigas
+        
+        Com data_inicio e data_fim (inclusivas), só as do período. Devolve
+        Pagina com os itens e o cursor da próxima página.
+        """
+        filtros, params = (), ()
+        if data_inicio and data_fim:
+            filtros = ('v.data_venda >= ?', 'v.data_venda < ?')
+            params = intervalo_datas(data_inicio, data_fim)
+        return _paginar(self.db, self._SELECT, ('v.data_venda', 'v.id'), apos, limite, _venda,
+                        filtros, params, decrescente=True)
     
     def buscar_venda(self, venda_id):
         """Busca uma venda específica com seus itens"""
         # Buscar venda
         query = '''
-            SELECT v.*, c.nome as cliente_nome, c.telefone as cliente_telefone
+            SELECT v.id, v.cliente_id, v.total, v.desconto, v.forma_pagamento, v.data_venda,
+                   v.observacoes, c.nome as cliente_nome, c.telefone as cliente_telefone
             FROM vendas v
             LEFT JOIN clientes c ON v.cliente_id = c.id
             WHERE v.id = ?
         '''
-        venda = self.db.execute_query(query, (venda_id,))
+        venda = self.db.execute_query(query, (venda_id,), row_factory=_venda)
         if not venda:
             return None
         
         # Buscar itens da venda
         query_itens = '''
-            SELECT iv.*, p.nome as produto_nome
+            SELECT iv.id, iv.venda_id, iv.produto_id, iv.quantidade, iv.preco_unitario,
+                   iv.subtotal, p.nome as produto_nome
             FROM itens_venda iv
             JOIN produtos p ON iv.produto_id = p.id
             WHERE iv.venda_id = ?
         '''
-        itens = self.db.execute_query(query_itens, (venda_id,))
+        itens = self.db.execute_query(query_itens, (venda_id,), row_factory=_item_venda)
         
         return {
             'venda': venda[0],
             'itens': itens
         }
 
+# Expediente da loja e passo da grade de horários oferecidos por slots_livres
+HORARIO_ABERTURA = time(8, 0)
+HORARIO_FECHAMENTO = time(18, 0)
+INTERVALO_SLOTS_MINUTOS = 30
+
+# Até quantos dias à frente as ocorrências das séries recorrentes viram agendamentos
+HORIZONTE_SERIES_DIAS = 60
+
 class Agendamento:
+    EXEMPLOS_PLANO = [
+        ('listar_pagina', ()),
+        ('listar_pagina', (date(2024, 1, 1), date(2024, 1, 31), ('2024-01-01', 0), 50, 'agendado')),
+        ('slots_livres', (date(2024, 1, 2), 1)),
+        ('criar_agendamento', (1, 1, 1, datetime(2024, 1, 2, 10))),
+        ('_conflitos_em_lote', ([('geral', 1, datetime(2024, 1, 2, 10), datetime(2024, 1, 2, 11))],)),
+        ('criar_serie', (1, 1, 1, datetime(2024, 1, 2, 10), 7, None, 2)),
+        ('gerar_ocorrencias', ()),
+        ('atualizar_serie', (1, None, time(10))),
+        ('cancelar_serie', (1,)),
+        ('listar_series', ()),
+    ]
+    
     def __init__(self, db_manager):
         self.db = db_manager
     
     def criar_agendamento(self, cliente_id, pet_id, tipo_servico_id, data_agendamento, observacoes=None):
-        """Cria um novo agendamento"""
-        # Buscar preço do serviço
-        query_preco = 'SELECT preco_base FROM tipos_servicos WHERE id = ?'
-        resultado = self.db.execute_query(query_preco, (tipo_servico_id,))
-        preco = resultado[0][0] if resultado else 0
+        """Cria um novo agendamento
         
-        query = '''
-            INSERT INTO agendamentos (cliente_id, pet_id, tipo_servico_id, data_agendamento, preco, observacoes)
-            VALUES (?, ?, ?, ?, ?, ?)
-        '''
-        _, agendamento_id = self.db.execute_update(query, (cliente_id, pet_id, tipo_servico_id, data_agendamento, preco, observacoes))
+        Se o recurso do serviço (mesa de banho, consultório...) já estiver com a
+        capacidade tomada em algum momento do intervalo, levanta
+        ConflitoAgendamentoError e nada é gravado.
+        """
+        inicio = _como_datahora(data_agendamento).replace(microsecond=0)
+        with self.db.transaction():
+            # Checagem e inserção na mesma transação (BEGIN IMMEDIATE): dois pedidos não levam a mesma vaga
+            servico = self._servico(tipo_servico_id)
+            preco, duracao, recurso, capacidade = servico if servico else (0, DURACAO_PADRAO_MINUTOS, None, 1)
+            fim = inicio + timedelta(minutes=duracao)
+            if recurso is not None:
+                self._verificar_vaga(recurso, capacidade, inicio, fim)
+            
+            query = '''
+                INSERT INTO agendamentos (cliente_id, pet_id, tipo_servico_id, data_agendamento, data_fim,
+                                          recurso, preco, observacoes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            '''
+            _, agendamento_id = self.db.execute_update(query, (cliente_id, pet_id, tipo_servico_id, str(inicio),
+                                                               str(fim), recurso, preco, observacoes))
         return agendamento_id
     
-    def listar_agendamentos(self, data_inicio=None, data_fim=None):
-        """Lista agendamentos por período"""
+    def _servico(self, tipo_servico_id):
+        """(preço, duração em minutos, recurso, capacidade do recurso) do tipo de serviço, ou None"""
+        resultado = self.db.execute_query('''
+            SELECT ts.preco_base, COALESCE(ts.duracao_minutos, ?), ts.recurso, COALESCE(r.capacidade, 1)
+            FROM tipos_servicos ts
+            LEFT JOIN recursos r ON r.nome = ts.recurso
+            WHERE ts.id = ?
+        ''', (DURACAO_PADRAO_MINUTOS, tipo_servico_id))
+        return resultado[0] if resultado else None
+    
+    def _duracao_maxima(self):
+        """Duração em minutos do serviço mais longo: nenhum agendamento ocupa mais que isso"""
+        return self.db.execute_query(
+            'SELECT MAX(COALESCE(duracao_minutos, ?)) FROM tipos_servicos', (DURACAO_PADRAO_MINUTOS,),
+            cached=True)[0][0] or DURACAO_PADRAO_MINUTOS
+    
+    def _ocupados(self, recurso, inicio, fim):
+        """Agendamentos ativos do recurso que cruzam [inicio, fim)
+        
+        Nenhum agendamento dura mais que o serviço mais longo, então basta ler a
+        faixa do índice parcial que começa uma duração máxima antes do início.
+        """
+        desde = inicio - timedelta(minutes=self._duracao_maxima())
+        return self.db.execute_query(f'''
+            SELECT a.id, a.data_agendamento, a.data_fim, p.nome, ts.nome
+            FROM agendamentos a
+            JOIN pets p ON a.pet_id = p.id
+            JOIN tipos_servicos ts ON a.tipo_servico_id = ts.id
+            WHERE a.recurso = ? AND {AGENDAMENTO_ATIVO}
+              AND a.data_agendamento >= ? AND a.data_agendamento < ? AND a.data_fim > ?
+            ORDER BY a.data_agendamento
+        ''', (recurso, str(desde), str(fim), str(inicio)))
+    
+    def _verificar_vaga(self, recurso, capacidade, inicio, fim):
+        """Levanta ConflitoAgendamentoError se o recurso lotar em algum momento de [inicio, fim)"""
+        conflitos = self._ocupados(recurso, inicio, fim)
+        intervalos = [(_como_datahora(de), _como_datahora(ate)) for _, de, ate, _, _ in conflitos]
+        if any(de < fim and inicio < ate for de, ate in _intervalos_lotados(intervalos, capacidade)):
+            raise ConflitoAgendamentoError(recurso, inicio, fim, conflitos)
+    
+    def _conflitos_em_lote(self, pedidos, ignorar=()):
+        """Confere vários intervalos de uma vez e devolve os índices dos que não têm vaga
+        
+        pedidos é uma lista de (recurso, capacidade, início, fim). Os agendamentos
+        ativos de cada recurso vêm de uma única faixa do índice, do primeiro ao
+        último pedido; os pedidos são testados em ordem de início, contando os já
+        aceitos. ignorar traz IDs de agendamentos que não ocupam mais a vaga (os
+        que estão sendo remarcados).
+        """
+        janela = timedelta(minutes=self._duracao_maxima())
+        ignorar = set(ignorar)
+        por_recurso = {}
+        for indice, (recurso, capacidade, inicio, fim) in enumerate(pedidos):
+            if recurso is not None:
+                por_recurso.setdefault((recurso, capacidade), []).append((inicio, fim, indice))
+        
+        recusados = set()
+        for (recurso, capacidade), intervalos in por_recurso.items():
+            intervalos.sort()
+            ocupados = sorted((_como_datahora(de), _como_datahora(ate))
+                              for agendamento_id, de, ate, _, _ in self._ocupados(
+                                  recurso, intervalos[0][0], max(fim for _, fim, _ in intervalos))
+                              if agendamento_id not in ignorar)
+            
+            for inicio, fim, indice in intervalos:
+                # Só quem começa até uma duração máxima antes pode cruzar o intervalo
+                cruzam = [(de, ate) for de, ate in ocupados[bisect.bisect_left(ocupados, (inicio - janela,)):
+                                                           bisect.bisect_left(ocupados, (fim,))]
+                          if ate > inicio]
+                if any(de < fim and inicio < ate for de, ate in _intervalos_lotados(cruzam, capacidade)):
+                    recusados.add(indice)
+                else:
+                    bisect.insort(ocupados, (inicio, fim))
+        
+        return recusados
+    
+    def slots_livres(self, data, tipo_servico_id, dias=7):
+        """Horários livres para o serviço nos dias a partir de data
+        
+        Devolve {date: [datetime de início, ...]} com todos os dias do período,
+        na grade de INTERVALO_SLOTS_MINUTOS dentro do expediente e sem horários
+        já passados. Os agendamentos do recurso no período vêm de uma única
+        consulta e a grade é percorrida uma vez.
+        """
+        servico = self._servico(tipo_servico_id)
+        if servico is None:
+            return {}
+        _, duracao, recurso, capacidade = servico
+        duracao = timedelta(minutes=duracao)
+        passo = timedelta(minutes=INTERVALO_SLOTS_MINUTOS)
+        primeiro_dia = _como_datahora(data).date()
+        
+        periodo = (datetime.combine(primeiro_dia, HORARIO_ABERTURA),
+                   datetime.combine(primeiro_dia + timedelta(days=dias - 1), HORARIO_FECHAMENTO) + duracao)
+        ocupados = [(_como_datahora(de), _como_datahora(ate)) for _, de, ate, _, _ in self._ocupados(recurso, *periodo)]
+        lotados = _intervalos_lotados(ocupados, capacidade)
+        
+        agora = datetime.now()
+        slots = {}
+        proximo_lotado = 0
+        for deslocamento in range(dias):
+            dia = primeiro_dia + timedelta(days=deslocamento)
+            inicio = datetime.combine(dia, HORARIO_ABERTURA)
+            fechamento = datetime.combine(dia, HORARIO_FECHAMENTO)
+            # Serviços mais longos que o expediente (hospedagem) só precisam começar dentro dele
+            ultimo_inicio = fechamento - duracao if duracao <= fechamento - inicio else fechamento - passo
+            
+            livres = slots[dia] = []
+            while inicio <= ultimo_inicio:
+                # A grade só avança: trechos lotados que já terminaram não voltam a importar
+                while proximo_lotado < len(lotados) and lotados[proximo_lotado][1] <= inicio:
+                    proximo_lotado += 1
+                livre = proximo_lotado == len(lotados) or lotados[proximo_lotado][0] >= inicio + duracao
+                if livre and inicio >= agora:
+                    livres.append(inicio)
+                inicio += passo
+        
+        return slots
+    
+    _SELECT = '''
+        SELECT a.id, a.cliente_id, a.pet_id, a.tipo_servico_id, a.data_agendamento,
+               a.status, a.preco, a.observacoes, a.created_at,
+               c.nome as cliente_nome, p.nome as pet_nome, ts.nome as servico_nome, a.serie_id
+        FROM agendamentos a
+        JOIN clientes c ON a.cliente_id = c.id
+        JOIN pets p ON a.pet_id = p.id
+        JOIN tipos_servicos ts ON a.tipo_servico_id = ts.id
+    '''
+    
+    def listar_agendamentos(self, data_inicio, data_fim):
+        """Lista agendamentos por período (a agenda inteira é lida por listar_pagina)"""
+        query = self._SELECT + '''
+            WHERE a.data_agendamento >= ? AND a.data_agendamento < ?
+            ORDER BY a.data_agendamento, a.id
+        '''
+        return self.db.execute_query(query, intervalo_datas(data_inicio, data_fim), row_factory=_agendamento)
+    
+    def listar_pagina(self, data_inicio=None, data_fim=None, apos=None, limite=50, status=None):
+        """Uma página dos agendamentos do período (ou de todos) em ordem de data
+        
+        Com status, só os agendamentos nesse status. Devolve Pagina com os
+        itens e o cursor da próxima página.
+        """
+        filtros, params = [], []
         if data_inicio and data_fim:
-            query = '''
-                SELECT a.*, c.nome as cliente_nome, p.nome as pet_nome, ts.nome as servico_nome
-                FROM agendamentos a
-                JOIN clientes c ON a.cliente_id = c.id
-                JOIN pets p ON a.pet_id = p.id
-                JOIN tipos_servicos ts ON a.tipo_servico_id = ts.id
-                WHERE DATE(a.data_agendamento) BETWEEN ? AND ?
-                ORDER BY a.data_agendamento
-            '''
-            return self.db.execute_query(query, (data_inicio, data_fim))
-        else:
-            query = '''
-                SELECT a.*, c.nome as cliente_nome, p.nome as pet_nome, ts.nome as servico_nome
-                FROM agendamentos a
-                JOIN clientes c ON a.cliente_id = c.id
-                JOIN pets p ON a.pet_id = p.id
-                JOIN tipos_servicos ts ON a.tipo_servico_id = ts.id
-                ORDER BY a.data_agendamento
-            '''
-            return self.db.execute_query(query)
+            filtros += ['a.data_agendamento >= ?', 'a.data_agendamento < ?']
+            params += intervalo_datas(data_inicio, data_fim)
+        if status:
+            filtros.append('a.status = ?')
+            params.append(status)
+        return _paginar(self.db, self._SELECT, ('a.data_agendamento', 'a.id'), apos, limite, _agendamento,
+                        filtros, params)
+    
+    def listar_pendentes(self):
+        """Lista os agendamentos que ainda não foram concluídos nem cancelados"""
+        query = '''
+            SELECT a.id, a.cliente_id, a.pet_id, a.tipo_servico_id, a.data_agendamento,
+                   a.status, a.preco, a.observacoes, a.created_at,
+                   c.nome as cliente_nome, p.nome as pet_nome, ts.nome as servico_nome, a.serie_id
+            FROM agendamentos a
+            JOIN clientes c ON a.cliente_id = c.id
+            JOIN pets p ON a.pet_id = p.id
+            JOIN tipos_servicos ts ON a.tipo_servico_id = ts.id
+            WHERE a.status != 'concluido' AND a.status != 'cancelado'
+            ORDER BY a.data_agendamento
+        '''
+        return self.db.execute_query(query, row_factory=_agendamento)
     
     def atualizar_status(self, agendamento_id, novo_status):
-        """Atualiza o status de um agendamento"""
-        query = 'UPDATE agendamentos SET status = ? WHERE id = ?'
-        rows_affected, _ = self.db.execute_update(query, (novo_status, agendamento_id))
+        """Atualiza o status de um agendamento
+        
+        Reativar um agendamento cancelado (ou falta) volta a ocupar o recurso:
+        se o horário já tiver sido tomado, levanta ConflitoAgendamentoError.
+        """
+        with self.db.transaction():
+            atual = self.db.execute_query(f'''
+                SELECT {AGENDAMENTO_ATIVO}, a.data_agendamento, a.data_fim, a.recurso, COALESCE(r.capacidade, 1)
+                FROM agendamentos a
+                LEFT JOIN recursos r ON r.nome = a.recurso
+                WHERE a.id = ?
+            ''', (agendamento_id,))
+            if not atual:
+                return False
+            
+            ativo, inicio, fim, recurso, capacidade = atual[0]
+            if not ativo and novo_status not in ('cancelado', 'nao_compareceu') and recurso is not None:
+                self._verificar_vaga(recurso, capacidade, _como_datahora(inicio), _como_datahora(fim))
+            
+            query = 'UPDATE agendamentos SET status = ? WHERE id = ?'
+            rows_affected, _ = self.db.execute_update(query, (novo_status, agendamento_id))
         return rows_affected > 0
     
     def listar_tipos_servicos(self):
         """Lista todos os tipos de serviços disponíveis"""
-        query = 'SELECT * FROM tipos_servicos ORDER BY nome'
-        return self.db.execute_query(query)
+        query = '''
+            SELECT id, nome, preco_base, duracao_minutos, descricao, created_at, recurso
+            FROM tipos_servicos
+            ORDER BY nome
+        '''
+        return self.db.execute_query(query, row_factory=_tipo_servico, cached=True)
+    
+    # Ocorrências de série que ainda podem ser remarcadas ou canceladas junto com ela
+    _EM_ABERTO = "status IN ('agendado', 'confirmado')"
+    # Séries ativas (todas ou a do id) cuja próxima ocorrência cai antes do limite
+    _SERIE_PENDENTE = '''s.status = 'ativa' AND (? IS NULL OR s.id = ?)
+              AND datetime(s.inicio, '+' || (s.proxima_ocorrencia * s.intervalo_dias) || ' days') < ?'''
+    
+    def criar_serie(self, cliente_id, pet_id, tipo_servico_id, inicio, intervalo_dias,
+                    data_limite=None, ocorrencias=None, observacoes=None):
+        """Cria uma série recorrente (a cada intervalo_dias a partir de inicio) e grava as primeiras ocorrências
+        
+        A série termina na data_limite (inclusive), depois de ocorrencias datas
+        ou nunca, se os dois forem None. Devolve (serie_id, criados, conflitos),
+        como gerar_ocorrencias.
+        """
+        inicio = _como_datahora(inicio).replace(microsecond=0)
+        data_limite = str(_como_datahora(data_limite).date()) if data_limite else None
+        with self.db.transaction():
+            _, serie_id = self.db.execute_update('''
+                INSERT INTO series_agendamento (cliente_id, pet_id, tipo_servico_id, inicio, intervalo_dias,
+                                                data_limite, ocorrencias, observacoes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (cliente_id, pet_id, tipo_servico_id, str(inicio), intervalo_dias, data_limite,
+                  ocorrencias, observacoes))
+            criados, conflitos = self.gerar_ocorrencias(serie_id=serie_id)
+        return serie_id, criados, conflitos
+    
+    def gerar_ocorrencias(self, horizonte_dias=HORIZONTE_SERIES_DIAS, serie_id=None):
+        """Grava como agendamentos as ocorrências das séries ativas até o horizonte
+        
+        Tudo em uma transação: as ocorrências de todas as séries são conferidas
+        juntas e inseridas em lote. Ocorrências já passadas ou sem vaga são
+        puladas (e contam para o limite de ocorrências da série). Devolve
+        (criados, conflitos), com conflitos como lista de (serie_id, data e hora).
+        """
+        limite = datetime.combine(date.today() + timedelta(days=horizonte_dias), time())
+        agora = datetime.now()
+        
+        # Leitura barata (e em cache até a série mudar ou o dia virar) antes de pedir a trava de escrita
+        pendentes = self.db.execute_query(f'''
+            SELECT 1 FROM series_agendamento s
+            WHERE {self._SERIE_PENDENTE}
+            LIMIT 1
+        ''', (serie_id, serie_id, str(limite)), cached=True)
+        if not pendentes:
+            return 0, []
+        
+        with self.db.transaction():
+            # Só as séries cuja próxima ocorrência cai antes do horizonte
+            series = self.db.execute_query(f'''
+                SELECT s.id, s.cliente_id, s.pet_id, s.tipo_servico_id, s.inicio, s.intervalo_dias,
+                       s.data_limite, s.ocorrencias, s.proxima_ocorrencia, s.observacoes,
+                       ts.preco_base, COALESCE(ts.duracao_minutos, ?), ts.recurso, COALESCE(r.capacidade, 1)
+                FROM series_agendamento s
+                JOIN tipos_servicos ts ON s.tipo_servico_id = ts.id
+                LEFT JOIN recursos r ON r.nome = ts.recurso
+                WHERE {self._SERIE_PENDENTE}
+            ''', (DURACAO_PADRAO_MINUTOS, serie_id, serie_id, str(limite)))
+            
+            novos, pedidos, avancos, encerradas = [], [], [], []
+            for (id_serie, cliente_id, pet_id, tipo_servico_id, inicio, intervalo_dias, data_limite,
+                 maximo, proxima, observacoes, preco, duracao, recurso, capacidade) in series:
+                inicio = _como_datahora(inicio)
+                ultimo_dia = _como_datahora(data_limite).date() if data_limite else None
+                while True:
+                    data_hora = inicio + timedelta(days=proxima * intervalo_dias)
+                    if (maximo is not None and proxima >= maximo) or (ultimo_dia and data_hora.date() > ultimo_dia):
+                        encerradas.append((id_serie,))
+                        break
+                    if data_hora >= limite:
+                        break
+                    proxima += 1
+                    if data_hora < agora:
+                        continue
+                    fim = data_hora + timedelta(minutes=duracao)
+                    novos.append((cliente_id, pet_id, tipo_servico_id, str(data_hora), str(fim),
+                                  recurso, preco, observacoes, id_serie))
+                    pedidos.append((recurso, capacidade, data_hora, fim))
+                avancos.append((proxima, id_serie))
+            
+            recusados = self._conflitos_em_lote(pedidos)
+            aceitos = [novo for indice, novo in enumerate(novos) if indice not in recusados]
+            if aceitos:
+                self.db.execute_many('''
+                    INSERT INTO agendamentos (cliente_id, pet_id, tipo_servico_id, data_agendamento, data_fim,
+                                              recurso, preco, observacoes, serie_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', aceitos)
+            if avancos:
+                self.db.execute_many('UPDATE series_agendamento SET proxima_ocorrencia = ? WHERE id = ?', avancos)
+            if encerradas:
+                self.db.execute_many("UPDATE series_agendamento SET status = 'encerrada' WHERE id = ?", encerradas)
+        
+        conflitos = [(novos[indice][-1], pedidos[indice][2]) for indice in sorted(recusados)]
+        return len(aceitos), conflitos
+    
+    def atualizar_serie(self, serie_id, tipo_servico_id=None, horario=None, observacoes=None):
+        """Altera a série e, em um único UPDATE, todas as ocorrências futuras em aberto
+        
+        horario (datetime.time) muda a hora das ocorrências, mantendo o dia. As
+        novas posições são conferidas juntas; se alguma não tiver vaga, levanta
+        ConflitoAgendamentoError e nada muda. Recurso e fim são recalculados
+        pelos triggers. Devolve quantas ocorrências foram alteradas.
+        """
+        agora = str(datetime.now().replace(microsecond=0))
+        hora = horario.strftime('%H:%M:%S') if horario is not None else None
+        with self.db.transaction():
+            if tipo_servico_id is not None or horario is not None:
+                futuras = self.db.execute_query(f'''
+                    SELECT id, data_agendamento, tipo_servico_id
+                    FROM agendamentos
+                    WHERE serie_id = ? AND data_agendamento >= ? AND {self._EM_ABERTO}
+                ''', (serie_id, agora))
+                
+                servicos = {}
+                pedidos = []
+                for _, data_hora, tipo_atual in futuras:
+                    tipo = tipo_servico_id or tipo_atual
+                    if tipo not in servicos:
+                        servicos[tipo] = self._servico(tipo)
+                        if servicos[tipo] is None:
+                            raise ValueError(f'Tipo de serviço {tipo} não encontrado')
+                    _, duracao, recurso, capacidade = servicos[tipo]
+                    inicio = _como_datahora(data_hora)
+                    if horario is not None:
+                        inicio = datetime.combine(inicio.date(), horario)
+                    pedidos.append((recurso, capacidade, inicio, inicio + timedelta(minutes=duracao)))
+                
+                remarcados = {agendamento_id for agendamento_id, _, _ in futuras}
+                recusados = self._conflitos_em_lote(pedidos, ignorar=remarcados)
+                if recusados:
+                    recurso, _, inicio, fim = min((pedidos[indice] for indice in recusados), key=lambda p: p[2])
+                    raise ConflitoAgendamentoError(recurso, inicio, fim, [
+                        conflito for conflito in self._ocupados(recurso, inicio, fim) if conflito[0] not in remarcados])
+            
+            rows_affected, _ = self.db.execute_update(f'''
+                UPDATE agendamentos
+                SET tipo_servico_id = COALESCE(?, tipo_servico_id),
+                    data_agendamento = COALESCE(date(data_agendamento) || ' ' || ?, data_agendamento),
+                    preco = COALESCE((SELECT preco_base FROM tipos_servicos WHERE id = ?), preco),
+                    observacoes = COALESCE(?, observacoes)
+                WHERE serie_id = ? AND data_agendamento >= ? AND {self._EM_ABERTO}
+            ''', (tipo_servico_id, hora, tipo_servico_id, observacoes, serie_id, agora))
+            self.db.execute_update('''
+                UPDATE series_agendamento
+                SET tipo_servico_id = COALESCE(?, tipo_servico_id),
+                    inicio = COALESCE(date(inicio) || ' ' || ?, inicio),
+                    observacoes = COALESCE(?, observacoes)
+                WHERE id = ?
+            ''', (tipo_servico_id, hora, observacoes, serie_id))
+        return rows_affected
+    
+    def cancelar_serie(self, serie_id):
+        """Cancela a série e, em um único UPDATE, todas as ocorrências futuras em aberto
+        
+        Devolve quantas ocorrências foram canceladas.
+        """
+        agora = str(datetime.now().replace(microsecond=0))
+        with self.db.transaction():
+            self.db.execute_update("UPDATE series_agendamento SET status = 'cancelada' WHERE id = ?", (serie_id,))
+            rows_affected, _ = self.db.execute_update(f'''
+                UPDATE agendamentos SET status = 'cancelado'
+                WHERE serie_id = ? AND data_agendamento >= ? AND {self._EM_ABERTO}
+            ''', (serie_id, agora))
+        return rows_affected
+    
+    def listar_series(self, cliente_id=None, status=None, em_andamento=True):
+        """Lista as séries recorrentes
+        
+        Com em_andamento, só as que ainda geram ocorrências ou têm ocorrências
+        futuras em aberto (uma série encerrada pode ter agendamentos pela frente).
+        """
+        agora = str(datetime.now().replace(microsecond=0))
+        query = f'''
+            SELECT s.id, s.cliente_id, s.pet_id, s.tipo_servico_id, s.inicio, s.intervalo_dias,
+                   s.data_limite, s.ocorrencias, s.proxima_ocorrencia, s.status, s.observacoes,
+                   s.created_at, c.nome as cliente_nome, p.nome as pet_nome, ts.nome as servico_nome
+            FROM series_agendamento s
+            JOIN clientes c ON s.cliente_id = c.id
+            JOIN pets p ON s.pet_id = p.id
+            JOIN tipos_servicos ts ON s.tipo_servico_id = ts.id
+            WHERE (? IS NULL OR s.status = ?) AND (? IS NULL OR s.cliente_id = ?)
+              AND (NOT ? OR s.status = 'ativa' OR EXISTS (
+                  SELECT 1 FROM agendamentos a
+                  WHERE a.serie_id = s.id AND a.data_agendamento >= ? AND a.{self._EM_ABERTO}))
+            ORDER BY c.nome, s.id
+        '''
+        params = (status, status, cliente_id, cliente_id, em_andamento, agora)
+        return self.db.execute_query(query, params, row_factory=_serie)
 
 class Categoria:
     def __init__(self, db_manager):
@@ -387,8 +1509,8 @@ class Categoria:
     
     def listar_todas(self):
         """Lista todas as categorias"""
-        query = 'SELECT * FROM categorias ORDER BY nome'
-        return self.db.execute_query(query)
+        query = 'SELECT id, nome, descricao, created_at FROM categorias ORDER BY nome'
+        return self.db.execute_query(query, row_factory=_categoria, cached=True)
     
     def adicionar(self, nome, descricao=None):
         """Adiciona uma nova categoria"""
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mostra o EXPLAIN QUERY PLAN de todas as consultas SQL de models.py e app.py
+Use para conferir se as consultas estão aproveitando os índices do banco:
+
+    python plano_consultas.py [caminho_do_banco]
+
+Os literais SQL são lidos do código-fonte. As consultas montadas em tempo de
+execução (f-strings de paginação, busca, estoque e agenda) são capturadas
+rodando as chamadas de EXEMPLOS_PLANO de cada modelo dentro de uma transação
+que é desfeita no fim, e analisadas com os parâmetros reais.
+"""
+
+import ast
+import os
+import re
+import sys
+import models
+from database import DatabaseManager
+from instrumentacao import Instrumentacao, normalizar_sql
+
+ARQUIVOS = ['models.py', 'app.py']
+COMANDO_SQL = re.compile(r'^(SELECT|INSERT|UPDATE|DELETE|WITH)\s', re.IGNORECASE)
+PARAMETRO_NOMEADO = re.compile(r'(?<![:\w]):([A-Za-z_]\w*)')
+MODELOS = [models.Produto, models.Cliente, models.Pet, models.Venda, models.Agendamento]
+
+class ColetorConsultas(Instrumentacao):
+    """Instrumentação que guarda cada comando executado com os parâmetros da primeira execução"""
+    
+    def __init__(self):
+        super().__init__(limite_lento=None, arquivo_log=None)
+        self.consultas = {}
+    
+    def registrar(self, query, params, segundos, linhas, chamador):
+        super().registrar(query, params, segundos, linhas, chamador)
+        self.consultas.setdefault(normalizar_sql(query), (chamador, query, params))
+
+class _Desfazer(Exception):
+    """Levantada no fim da coleta para desfazer o que os exemplos gravaram"""
+
+def extrair_consultas(caminho):
+    """Encontra os literais SQL de um arquivo Python, com o número da linha"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read(), caminho)
+    
+    # Pedaços de f-strings não são consultas completas
+    partes_fstring = set()
+    for node in ast.walk(arvore):
+        if isinstance(node, ast.JoinedStr):
+            partes_fstring.update(id(valor) for valor in node.values)
+    
+    for node in ast.walk(arvore):
+        if (isinstance(node, ast.Constant) and isinstance(node.value, str)
+                and id(node) not in partes_fstring):
+            texto = node.value.strip()
+            if COMANDO_SQL.match(texto):
+                yield node.lineno, texto
+
+def parametros_ficticios(consulta):
+    """Parâmetros só para o planejador conseguir compilar a consulta (nomeados viram dicionário)"""
+    nomes = PARAMETRO_NOMEADO.findall(consulta)
+    if nomes:
+        return dict.fromkeys(nomes)
+    return [None] * consulta.count('?')
+
+def executar_exemplos(db):
+    """Roda os EXEMPLOS_PLANO de cada modelo e devolve os erros como (chamada, exceção)"""
+    erros = []
+    for modelo in MODELOS:
+        instancia = modelo(db)
+        for metodo, args in modelo.EXEMPLOS_PLANO:
+            try:
+                # Cada chamada em um SAVEPOINT: a que falhar não estraga as outras
+                with db.transaction():
+                    getattr(instancia, metodo)(*args)
+            except Exception as e:
+                erros.append((f'{modelo.__name__}.{metodo}', e))
+    return erros
+
+def formatar_plano(plano):
+    """Monta a árvore do plano com indentação, marcando varreduras completas"""
+    profundidade = {0: 0}
+    linhas = []
+    for id_no, pai, detalhe in plano:
+        nivel = profundidade.get(pai, 0) + 1
+        profundidade[id_no] = nivel
+        # "SCAN tabela" sem índice percorre a tabela inteira
+        alerta = '  ⚠️' if detalhe.startswith('SCAN') and 'INDEX' not in detalhe else ''
+        linhas.append(f"{'   ' * nivel}{detalhe}{alerta}")
+    return linhas
+
+def mostrar_planos(db_name='petshop.db'):
+    """Imprime o plano de execução de cada consulta encontrada"""
+    base = os.path.dirname(os.path.abspath(__file__))
+    coletor = ColetorConsultas()
+    db = DatabaseManager(db_name, instrumentacao=coletor)
+    
+    total = 0
+    varreduras = 0
+    
+    def mostrar(titulo, consulta, params):
+        nonlocal total, varreduras
+        total += 1
+        print(f"\n📄 {titulo}  {normalizar_sql(consulta)[:90]}")
+        try:
+            plano = db.explain_query_plan(consulta, params)
+        except Exception as e:
+            print(f"   ❌ Não foi possível analisar: {e}")
+            return
+        
+        linhas_plano = formatar_plano(plano)
+        for texto in linhas_plano:
+            print(texto)
+        if any('⚠️' in texto for texto in linhas_plano):
+            varreduras += 1
+    
+    try:
+        literais = set()
+        for nome_arquivo in ARQUIVOS:
+            for linha, consulta in sorted(extrair_consultas(os.path.join(base, nome_arquivo))):
+                literais.add(normalizar_sql(consulta))
+                mostrar(f"{nome_arquivo}:{linha}", consulta, parametros_ficticios(consulta))
+        
+        print("\n" + "=" * 60)
+        print("Consultas montadas em tempo de execução (EXEMPLOS_PLANO dos modelos)")
+        try:
+            with db.transaction():
+                coletor.consultas.clear()
+                erros = executar_exemplos(db)
+                # Os planos saem dentro da transação, antes de desfazer o que os exemplos gravaram
+                for sql, (chamador, consulta, params) in coletor.consultas.items():
+                    if sql not in literais:
+                        mostrar(chamador, consulta, params)
+                raise _Desfazer()
+        except _Desfazer:
+            pass
+        for chamada, erro in erros:
+            print(f"\n⚠️  {chamada}: {erro}")
+    finally:
+        db.close()
+    
+    print("\n" + "-" * 60)
+    print(f"{total} consultas analisadas, {varreduras} com varredura completa de tabela")
+
+if __name__ == "__main__":
+    mostrar_planos(sys.argv[1] if len(sys.argv) > 1 else 'petshop.db')
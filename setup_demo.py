@@ -8,13 +8,19 @@ Executa quando o app é iniciado no Streamlit Cloud
 
 import os
 from database import DatabaseManager
-from models import Produto, Cliente, Pet, Categoria
+from models import Produto, Cliente, Pet, Categoria, EstoqueInsuficienteError
 
-def setup_demo_data():
-    """Configura dados de demonstração se não existirem"""
+def setup_demo_data(db=None):
+    """Configura dados de demonstração se não existirem
+    
+    Recebe o DatabaseManager já aberto pelo app para não criar outro pool;
+    sem ele, abre (e fecha ao final) um próprio.
+    """
     
     # Verificar se já existe dados
-    db = DatabaseManager()
+    proprio_db = db is None
+    if proprio_db:
+        db = DatabaseManager()
     
     try:
         # Verificar se já tem produtos
@@ -58,8 +64,7 @@ def setup_demo_data():
             ("Cama Pet Macia M", cat_ids.get('Camas e Casinhas', 5), 78.00, 6, 2, "7891000005234", "Cama macia e confortável", "Furacão Pet", 1.2, "un"),
         ]
         
-        for produto_data in produtos_demo:
-            produto_manager.adicionar(*produto_data)
+        produto_manager.adicionar_varios(produtos_demo)
         
         # Clientes de demonstração
         clientes_demo = [
@@ -70,10 +75,7 @@ def setup_demo_data():
             ("Fernanda Alves Rocha", "789.123.456-05", "(11) 55555-5555", "fernanda.rocha@email.com", "Av. Central, 654", "São Paulo", "01234-571"),
         ]
         
-        cliente_ids = []
-        for cliente_data in clientes_demo:
-            cliente_id = cliente_manager.adicionar(*cliente_data)
-            cliente_ids.append(cliente_id)
+        cliente_ids = cliente_manager.adicionar_varios(clientes_demo)
         
         # Pets de demonstração
         pets_demo = [
@@ -87,8 +89,7 @@ def setup_demo_data():
             ("Mel", cliente_ids[4], "Cão", "Beagle", 2, 15.2, "Tricolor", "Adora comer"),
         ]
         
-        for pet_data in pets_demo:
-            pet_manager.adicionar(*pet_data)
+        pet_manager.adicionar_varios(pets_demo)
         
         # Criar algumas vendas de exemplo para demonstrar relatórios
         from models import Venda
@@ -111,32 +112,34 @@ def setup_demo_data():
             # Desconto aleatório
             desconto = random.choice([0, 0, 0, 5.00, 10.00, 15.00])  # Maioria sem desconto
             
-            # Criar venda
-            venda_id = venda_manager.criar_venda(cliente_id, desconto, forma_pagamento)
-            
-            # Adicionar 1-4 itens aleatórios
-            num_itens = random.randint(1, 4)
-            produtos_disponiveis = produto_manager.listar_todos()
-            
-            for _ in range(num_itens):
+            # Sortear 1-4 itens entre os produtos com estoque
+            produtos_disponiveis = [p for p in produto_manager.listar_todos() if p.estoque_atual > 0]
+            itens = []
+            for _ in range(random.randint(1, 4)):
                 produto = random.choice(produtos_disponiveis)
-                if produto[4] > 0:  # Se tem estoque
-                    quantidade = random.randint(1, min(3, produto[4]))
-                    venda_manager.adicionar_item(venda_id, produto[0], quantidade)
-            
-            # Finalizar venda
-            venda_manager.finalizar_venda(venda_id)
+                itens.append({'produto_id': produto.id,
+                              'quantidade': random.randint(1, min(3, produto.estoque_atual))})
             
-            # Atualizar data da venda manualmente
-            db.execute_update(
-                "UPDATE vendas SET data_venda = ? WHERE id = ?",
-                (data_venda.strftime('%Y-%m-%d %H:%M:%S'), venda_id)
-            )
+            try:
+                with db.transaction():
+                    venda_id = venda_manager.registrar_venda_completa(cliente_id, itens, desconto, forma_pagamento)
+                    
+                    # Atualizar data da venda manualmente
+                    db.execute_update(
+                        "UPDATE vendas SET data_venda = ? WHERE id = ?",
+                        (data_venda.strftime('%Y-%m-%d %H:%M:%S'), venda_id)
+                    )
+            except EstoqueInsuficienteError:
+                # Itens sorteados acima do estoque: a venda inteira é descartada
+                continue
         
         print("✅ Dados de demonstração configurados com sucesso!")
         
     except Exception as e:
         print(f"❌ Erro ao configurar dados de demonstração: {e}")
+    finally:
+        if proprio_db:
+            db.close()
 
 if __name__ == "__main__":
     setup_demo_data() 
\ No newline at end of file
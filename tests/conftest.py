@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+"""Fixtures compartilhadas: cada teste ganha um banco novo em um diretório temporário"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from setup_demo import setup_demo_data
+
+@pytest.fixture
+def db(tmp_path):
+    """Banco vazio (só com o esquema e os dados iniciais)"""
+    banco = DatabaseManager(str(tmp_path / 'petshop.db'), intervalo_checkpoint=None)
+    yield banco
+    banco.close()
+
+@pytest.fixture
+def db_demo(db):
+    """Banco com os produtos, clientes e pets de demonstração"""
+    setup_demo_data(db)
+    return db
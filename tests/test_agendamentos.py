@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from models import Agendamento, Cliente, Pet, ConflitoAgendamentoError, _intervalos_lotados
+
+AMANHA = date.today() + timedelta(days=1)
+
+def em(dia, hora, minuto=0):
+    return datetime.combine(dia, time(hora, minuto))
+
+@pytest.fixture
+def agenda(db):
+    """Agendamento com um cliente, dois pets e os serviços por nome"""
+    agendamentos = Agendamento(db)
+    cliente_id = Cliente(db).adicionar('Ana')
+    pets = Pet(db).adicionar_varios([('Rex', cliente_id, 'Cão'), ('Bob', cliente_id, 'Cão')])
+    agendamentos.cliente_id = cliente_id
+    agendamentos.pets = pets
+    agendamentos.servicos = {servico.nome: servico.id for servico in agendamentos.listar_tipos_servicos()}
+    return agendamentos
+
+def da_serie(agenda, serie_id):
+    return [a for a in agenda.listar_agendamentos(AMANHA, AMANHA + timedelta(days=365)) if a.serie_id == serie_id]
+
+def test_intervalos_lotados():
+    ocupados = [(1, 4), (2, 6), (5, 8), (8, 9)]
+    assert _intervalos_lotados(ocupados, 1) == [(1, 9)]
+    assert _intervalos_lotados(ocupados, 2) == [(2, 4), (5, 6)]
+    assert _intervalos_lotados(ocupados, 3) == []
+    # Um fim e um início no mesmo instante não se sobrepõem
+    assert _intervalos_lotados([(1, 2), (2, 3)], 2) == []
+
+def test_conflito_no_mesmo_recurso(agenda):
+    banho = agenda.servicos['Banho Simples']
+    primeiro = agenda.criar_agendamento(agenda.cliente_id, agenda.pets[0], banho, em(AMANHA, 10))
+    
+    with pytest.raises(ConflitoAgendamentoError) as erro:
+        agenda.criar_agendamento(agenda.cliente_id, agenda.pets[1], agenda.servicos['Tosa Completa'],
+                                 em(AMANHA, 10, 30))
+    assert erro.value.recurso == 'banho_tosa'
+    assert [conflito[0] for conflito in erro.value.conflitos] == [primeiro]
+    
+    # Encostado no fim do anterior e em outro recurso: sem conflito
+    agenda.criar_agendamento(agenda.cliente_id, agenda.pets[1], banho, em(AMANHA, 11))
+    agenda.criar_agendamento(agenda.cliente_id, agenda.pets[1], agenda.servicos['Consulta Veterinária'],
+                             em(AMANHA, 10, 30))
+
+def test_capacidade_do_recurso(agenda):
+    hospedagem = agenda.servicos['Hospedagem (diária)']
+    agenda.db.execute_update("UPDATE recursos SET capacidade = 2 WHERE nome = 'hospedagem'")
+    agenda.criar_agendamento(agenda.cliente_id, agenda.pets[0], hospedagem, em(AMANHA, 9))
+    agenda.criar_agendamento(agenda.cliente_id, agenda.pets[1], hospedagem, em(AMANHA, 9))
+    with pytest.raises(ConflitoAgendamentoError):
+        agenda.criar_agendamento(agenda.cliente_id, agenda.pets[1], hospedagem, em(AMANHA, 12))
+
+def test_cancelar_libera_e_reativar_confere_de_novo(agenda):
+    banho = agenda.servicos['Banho Simples']
+    primeiro = agenda.criar_agendamento(agenda.cliente_id, agenda.pets[0], banho, em(AMANHA, 10))
+    agenda.atualizar_status(primeiro, 'cancelado')
+    agenda.criar_agendamento(agenda.cliente_id, agenda.pets[1], banho, em(AMANHA, 10))
+    
+    with pytest.raises(ConflitoAgendamentoError):
+        agenda.atualizar_status(primeiro, 'agendado')
+    assert agenda.db.execute_query('SELECT status FROM agendamentos WHERE id = ?', (primeiro,)) == [('cancelado',)]
+
+def test_slots_livres_pulam_o_horario_ocupado(agenda):
+    banho = agenda.servicos['Banho Simples']
+    agenda.criar_agendamento(agenda.cliente_id, agenda.pets[0], banho, em(AMANHA, 10))
+    livres = agenda.slots_livres(AMANHA, banho, dias=1)[AMANHA]
+    
+    assert em(AMANHA, 8) in livres
+    assert em(AMANHA, 9) in livres and em(AMANHA, 11) in livres
+    assert not {em(AMANHA, 9, 30), em(AMANHA, 10), em(AMANHA, 10, 30)} & set(livres)
+    # A consulta veterinária usa outro recurso
+    assert em(AMANHA, 10) in agenda.slots_livres(AMANHA, agenda.servicos['Consulta Veterinária'], dias=1)[AMANHA]
+
+def test_serie_com_numero_de_ocorrencias(agenda):
+    serie_id, criados, conflitos = agenda.criar_serie(
+        agenda.cliente_id, agenda.pets[0], agenda.servicos['Banho Simples'], em(AMANHA, 10), 7, ocorrencias=3)
+    assert (criados, conflitos) == (3, [])
+    assert [a.data_agendamento[:10] for a in da_serie(agenda, serie_id)] == [
+        str(AMANHA + timedelta(days=dias)) for dias in (0, 7, 14)]
+    # Encerrada (não gera mais nada), mas ainda listada porque tem ocorrências pela frente
+    assert [s.id for s in agenda.listar_series()] == [serie_id]
+    assert agenda.gerar_ocorrencias(365) == (0, [])
+
+def test_serie_pula_data_sem_vaga(agenda):
+    agenda.criar_agendamento(agenda.cliente_id, agenda.pets[1], agenda.servicos['Banho Simples'],
+                             em(AMANHA + timedelta(days=7), 10))
+    serie_id, criados, conflitos = agenda.criar_serie(
+        agenda.cliente_id, agenda.pets[0], agenda.servicos['Banho Simples'], em(AMANHA, 10), 7, ocorrencias=3)
+    assert criados == 2
+    assert conflitos == [(serie_id, em(AMANHA + timedelta(days=7), 10))]
+
+def test_horizonte_avanca_sem_repetir(agenda):
+    serie_id, criados, _ = agenda.criar_serie(
+        agenda.cliente_id, agenda.pets[0], agenda.servicos['Banho Simples'], em(AMANHA, 10), 30)
+    assert criados == 2
+    assert agenda.gerar_ocorrencias(150)[0] == 3
+    assert agenda.gerar_ocorrencias(150) == (0, [])
+    assert len(da_serie(agenda, serie_id)) == 5
+
+def test_nada_pendente_nao_abre_transacao(agenda, monkeypatch):
+    agenda.criar_serie(agenda.cliente_id, agenda.pets[0], agenda.servicos['Banho Simples'], em(AMANHA, 10), 30)
+    
+    def transacao_proibida():
+        raise AssertionError('gerar_ocorrencias abriu uma transação sem nada a gerar')
+    monkeypatch.setattr(agenda.db, 'transaction', transacao_proibida)
+    assert agenda.gerar_ocorrencias() == (0, [])
+
+def test_remarcar_e_cancelar_serie(agenda):
+    serie_id, _, _ = agenda.criar_serie(
+        agenda.cliente_id, agenda.pets[0], agenda.servicos['Banho Simples'], em(AMANHA, 10), 7, ocorrencias=3)
+    outra_id, _, _ = agenda.criar_serie(
+        agenda.cliente_id, agenda.pets[1], agenda.servicos['Banho Simples'], em(AMANHA, 11), 7, ocorrencias=3)
+    
+    # Todas as novas posições chocam com a outra série: nada muda
+    with pytest.raises(ConflitoAgendamentoError):
+        agenda.atualizar_serie(serie_id, horario=time(11))
+    assert {a.data_agendamento[11:16] for a in da_serie(agenda, serie_id)} == {'10:00'}
+    
+    assert agenda.atualizar_serie(serie_id, horario=time(15)) == 3
+    linhas = agenda.db.execute_query(
+        'SELECT data_agendamento, data_fim FROM agendamentos WHERE serie_id = ?', (serie_id,))
+    assert {(inicio[11:16], fim[11:16]) for inicio, fim in linhas} == {('15:00', '16:00')}
+    
+    assert agenda.cancelar_serie(outra_id) == 3
+    assert {a.status for a in da_serie(agenda, outra_id)} == {'cancelado'}
+    assert [s.id for s in agenda.listar_series()] == [serie_id]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from models import Cliente
+
+@pytest.fixture(params=['fts', 'like'])
+def clientes(request, db_demo):
+    """Cliente com e sem o índice trigram"""
+    cliente = Cliente(db_demo)
+    if request.param == 'like':
+        cliente._busca_textual = False
+    return cliente
+
+def nomes(resultados):
+    return [resultado.cliente.nome for resultado in resultados]
+
+@pytest.mark.parametrize('texto', ['Jo 9876', 'a 12345', 'x 999', 'ab 12', '12', '', '"', 'maria "9999"'])
+def test_entradas_estranhas_nao_quebram(clientes, texto):
+    assert isinstance(clientes.buscar(texto), list)
+
+def test_digitos_com_palavra_curta_usam_telefone(clientes):
+    assert nomes(clientes.buscar('Jo 88888')) == ['João Pedro Oliveira']
+
+def test_palavra_e_digitos_filtram_juntos(clientes):
+    assert nomes(clientes.buscar('maria 99999')) == ['Maria Silva Santos']
+    assert clientes.buscar('maria 88888') == []
+
+def test_somente_digitos(clientes):
+    assert nomes(clientes.buscar('987.654')) == ['João Pedro Oliveira']
+
+def test_sem_acento_e_com_pets(clientes):
+    resultados = clientes.buscar('joao')
+    assert nomes(resultados) == ['João Pedro Oliveira']
+    assert resultados[0].pets
+
+def test_erro_de_digitacao(db_demo):
+    assert 'Fernanda Alves Rocha' in nomes(Cliente(db_demo).buscar('fernada'))
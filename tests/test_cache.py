@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+from cache_consultas import tabelas_lidas
+from database import DatabaseManager
+
+CATEGORIAS = 'SELECT COUNT(*) FROM categorias'
+
+@pytest.fixture
+def db_cache(tmp_path):
+    banco = DatabaseManager(str(tmp_path / 'petshop.db'), intervalo_checkpoint=None, cache=True)
+    yield banco
+    banco.close()
+
+def test_acerto_ate_a_tabela_mudar(db_cache):
+    total = db_cache.execute_query(CATEGORIAS, cached=True)
+    assert db_cache.execute_query(CATEGORIAS, cached=True) == total
+    assert db_cache.estatisticas_cache()['acertos'] == 1
+    
+    db_cache.execute_update("INSERT INTO categorias (nome) VALUES ('Nova')")
+    assert db_cache.execute_query(CATEGORIAS, cached=True) == [(total[0][0] + 1,)]
+
+def test_escrita_em_outra_tabela_nao_invalida(db_cache):
+    db_cache.execute_query(CATEGORIAS, cached=True)
+    db_cache.execute_update("INSERT INTO clientes (nome) VALUES ('Ana')")
+    db_cache.execute_query(CATEGORIAS, cached=True)
+    assert db_cache.estatisticas_cache()['acertos'] == 1
+
+def test_escrita_de_outro_processo_invalida(db_cache):
+    total = db_cache.execute_query(CATEGORIAS, cached=True)[0][0]
+    
+    outro = sqlite3.connect(db_cache.db_name)
+    outro.execute("INSERT INTO categorias (nome) VALUES ('De fora')")
+    outro.commit()
+    outro.close()
+    
+    assert db_cache.execute_query(CATEGORIAS, cached=True) == [(total + 1,)]
+
+def test_transacao_invalida_no_commit_e_ignora_o_cache_dentro(db_cache):
+    total = db_cache.execute_query(CATEGORIAS, cached=True)[0][0]
+    with db_cache.transaction():
+        db_cache.execute_update("INSERT INTO categorias (nome) VALUES ('Na transação')")
+        # Dentro da transação a leitura vai direto ao banco e vê a própria escrita
+        assert db_cache.execute_query(CATEGORIAS, cached=True) == [(total + 1,)]
+    assert db_cache.execute_query(CATEGORIAS, cached=True) == [(total + 1,)]
+
+def test_rollback_nao_deixa_resultado_fantasma(db_cache):
+    total = db_cache.execute_query(CATEGORIAS, cached=True)
+    with pytest.raises(ValueError):
+        with db_cache.transaction():
+            db_cache.execute_update("INSERT INTO categorias (nome) VALUES ('Desfeita')")
+            raise ValueError('desfaz')
+    assert db_cache.execute_query(CATEGORIAS, cached=True) == total
+
+def test_resultado_devolvido_e_uma_copia(db_cache):
+    db_cache.execute_query(CATEGORIAS, cached=True).append('lixo')
+    assert len(db_cache.execute_query(CATEGORIAS, cached=True)) == 1
+
+def test_tabelas_de_join_com_virgula():
+    assert tabelas_lidas('SELECT * FROM produtos p, categorias AS c WHERE p.categoria_id = c.id') == {
+        'produtos', 'categorias'}
+    assert tabelas_lidas('SELECT * FROM produtos ORDER BY nome, id LIMIT 5, 10') == {'produtos'}
+
+def test_join_com_virgula_invalida_pela_segunda_tabela(db_cache):
+    consulta = '''
+        SELECT c.nome, COUNT(p.id) FROM categorias c, produtos p
+        WHERE p.categoria_id = c.id GROUP BY c.nome
+    '''
+    assert db_cache.execute_query(consulta, cached=True) == []
+    db_cache.execute_update("INSERT INTO produtos (nome, categoria_id, preco) VALUES ('Bolinha', 1, 5.0)")
+    assert len(db_cache.execute_query(consulta, cached=True)) == 1
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from catalogo import CatalogoCodigos
+from models import Produto
+
+@pytest.fixture
+def catalogo(db_demo):
+    # Intervalo zero: toda leitura confere se houve alteração
+    return CatalogoCodigos(db_demo, intervalo_verificacao=0)
+
+def test_alteracao_e_venda_sao_incrementais(catalogo, db_demo):
+    produto = catalogo.buscar('7891000001234')
+    assert produto.nome == 'Ração Premium Cães Adultos 15kg'
+    
+    Produto(db_demo).ajustar_estoque(produto.id, -2, 'Venda')
+    db_demo.instrumentacao.limpar()
+    atualizado = catalogo.buscar('7891000001234')
+    
+    assert atualizado.estoque_atual == produto.estoque_atual - 2
+    assert atualizado.versao > produto.versao
+    comandos = [estatistica['sql'] for estatistica in db_demo.estatisticas()]
+    assert not any('COUNT(*)' in sql for sql in comandos)
+    assert not any('codigo_barras IS NOT NULL' in sql for sql in comandos)
+
+def test_codigo_trocado_e_produto_novo(catalogo, db_demo):
+    produtos = Produto(db_demo)
+    produto = catalogo.buscar('7891000001234')
+    db_demo.execute_update("UPDATE produtos SET codigo_barras = 'NOVO' WHERE id = ?", (produto.id,))
+    novo_id = produtos.adicionar('Bolinha', 1, 5.0, 10, codigo_barras='123')
+    
+    assert catalogo.buscar('7891000001234') is None
+    assert catalogo.buscar('NOVO').id == produto.id
+    assert catalogo.buscar('123').id == novo_id
+
+def test_exclusao_recarrega(catalogo, db_demo):
+    produto = catalogo.buscar('7891000001234')
+    total = len(catalogo)
+    Produto(db_demo).excluir(produto.id)
+    
+    assert catalogo.buscar('7891000001234') is None
+    assert len(catalogo) == total - 1
+
+def test_alteracao_com_updated_at_antigo_e_lida(catalogo, db_demo):
+    produto = catalogo.buscar('7891000001234')
+    catalogo.buscar('7891000001235')
+    
+    # Transação que grava cedo e só dá COMMIT depois: updated_at fica para trás
+    # de linhas que o catálogo já viu, mas a alteração ainda tem de aparecer
+    db_demo.execute_update('''
+        UPDATE produtos SET preco = 1.5, versao = versao + 1, updated_at = '2000-01-01 00:00:00'
+        WHERE id = ?
+    ''', (produto.id,))
+    
+    assert catalogo.buscar('7891000001234').preco == 1.5
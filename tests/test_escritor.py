@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import threading
+
+import pytest
+
+from database import DatabaseManager
+
+@pytest.fixture
+def db_escritor(tmp_path):
+    banco = DatabaseManager(str(tmp_path / 'petshop.db'), intervalo_checkpoint=None, escritor_dedicado=True)
+    banco.execute_update('CREATE TABLE itens (id INTEGER PRIMARY KEY, valor INTEGER UNIQUE)')
+    yield banco
+    banco.close()
+
+def contar(db):
+    return db.execute_query('SELECT COUNT(*) FROM itens')[0][0]
+
+def test_future_resolvido_depois_do_commit(db_escritor):
+    futuro = db_escritor.submit_update('INSERT INTO itens (valor) VALUES (?)', (1,))
+    linhas, item_id = futuro.result()
+    assert (linhas, item_id) == (1, 1)
+    assert contar(db_escritor) == 1
+
+def test_erro_de_uma_tarefa_nao_desfaz_as_outras(db_escritor):
+    futuros = [db_escritor.submit_update('INSERT INTO itens (valor) VALUES (?)', (valor,))
+               for valor in (1, 1, 2)]
+    assert futuros[0].result()[0] == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futuros[1].result()
+    assert futuros[2].result()[0] == 1
+    assert contar(db_escritor) == 2
+
+def test_transacao_usa_a_conexao_do_escritor(db_escritor):
+    with db_escritor.transaction() as conn:
+        assert conn is db_escritor._escritor.conn
+        db_escritor.execute_update('INSERT INTO itens (valor) VALUES (1)')
+        with db_escritor.transaction():
+            db_escritor.execute_update('INSERT INTO itens (valor) VALUES (2)')
+    assert contar(db_escritor) == 2
+
+def test_transacao_com_erro_e_desfeita_e_o_escritor_continua(db_escritor):
+    with pytest.raises(ValueError):
+        with db_escritor.transaction():
+            db_escritor.execute_update('INSERT INTO itens (valor) VALUES (1)')
+            raise ValueError('falhou')
+    assert contar(db_escritor) == 0
+    
+    db_escritor.execute_many('INSERT INTO itens (valor) VALUES (?)', [(1,), (2,), (3,)])
+    assert contar(db_escritor) == 3
+
+def test_transacoes_concorrentes_sao_serializadas(db_escritor):
+    erros = []
+    
+    def trabalhar(base):
+        try:
+            for i in range(20):
+                with db_escritor.transaction():
+                    # Leitura seguida de escrita: sem serialização duas threads gravariam o mesmo valor
+                    maior = db_escritor.execute_query('SELECT COALESCE(MAX(valor), 0) FROM itens')[0][0]
+                    db_escritor.execute_update('INSERT INTO itens (valor) VALUES (?)', (maior + 1,))
+                db_escritor.execute_update('UPDATE itens SET id = id WHERE valor = ?', (base,))
+        except Exception as e:
+            erros.append(e)
+    
+    threads = [threading.Thread(target=trabalhar, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert erros == []
+    assert contar(db_escritor) == 80
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+from logging.handlers import RotatingFileHandler
+
+from database import DatabaseManager
+from instrumentacao import Instrumentacao
+
+def test_executemany_lento_registra_o_plano(tmp_path):
+    log = tmp_path / 'lentas.log'
+    db = DatabaseManager(str(tmp_path / 'petshop.db'), intervalo_checkpoint=None,
+                         instrumentacao=Instrumentacao(limite_lento=0, arquivo_log=str(log)))
+    db.execute_many('UPDATE produtos SET estoque_atual = ? WHERE id = ?', [(1, 1), (2, 2)])
+    db.close()
+    
+    conteudo = log.read_text(encoding='utf-8')
+    assert 'UPDATE produtos SET estoque_atual' in conteudo
+    assert 'params: (1, 1)' in conteudo
+    assert 'plano indisponível' not in conteudo
+
+def test_executemany_vazio(db):
+    assert db.execute_many('UPDATE produtos SET estoque_atual = ? WHERE id = ?', []) == 0
+
+def test_log_fica_ao_lado_do_banco(db, tmp_path):
+    arquivos = [handler.baseFilename for handler in db.instrumentacao.logger.handlers
+                if isinstance(handler, RotatingFileHandler)]
+    assert arquivos == [str(tmp_path / 'consultas_lentas.log')]
+
+def test_chamador_e_o_metodo_do_modelo(db_demo):
+    from models import Produto
+    
+    produtos = Produto(db_demo)
+    produtos.listar_pagina(limite=5)
+    produtos.buscar_por_codigo_barras('7891000001234')
+    
+    chamadores = set()
+    for estatistica in db_demo.estatisticas():
+        chamadores.update(estatistica['chamadores'])
+    assert 'models.py:Produto.listar_pagina' in chamadores
+    assert 'models.py:Produto.buscar_por_codigo_barras' in chamadores
+    assert not any('_paginar' in chamador or chamador.startswith('catalogo.py') for chamador in chamadores)
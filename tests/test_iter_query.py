@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+from models import Cliente, Produto
+
+def test_lotes_do_tamanho_pedido(db):
+    db.execute_many('INSERT INTO categorias (nome) VALUES (?)', [(f'Categoria {i}',) for i in range(25)])
+    total = db.execute_query('SELECT COUNT(*) FROM categorias')[0][0]
+    
+    lotes = list(db.iter_query('SELECT id FROM categorias ORDER BY id', batch_size=10))
+    assert [len(lote) for lote in lotes[:-1]] == [10] * (len(lotes) - 1)
+    assert sum(len(lote) for lote in lotes) == total
+
+def test_conexao_volta_ao_pool_ao_abandonar_o_gerador(db):
+    lotes = db.iter_query('SELECT id FROM categorias', batch_size=1)
+    next(lotes)
+    assert db.pool._disponiveis.qsize() == 0
+    lotes.close()
+    assert db.pool._disponiveis.qsize() == 1
+
+def test_iterar_todos_igual_a_listar_todos(db_demo):
+    for modelo in (Produto(db_demo), Cliente(db_demo)):
+        assert list(modelo.iterar_todos(tamanho_lote=2)) == modelo.listar_todos()
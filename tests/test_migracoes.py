@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+from database import (DatabaseManager, MIGRACOES, VERSAO_ESQUEMA, _migracao_esquema_inicial,
+                      _inserir_dados_iniciais)
+from models import Agendamento, Cliente, Produto
+
+def banco_legado(caminho):
+    """Banco como era antes do controle de versão: só as tabelas originais, já com dados"""
+    conn = sqlite3.connect(caminho)
+    _migracao_esquema_inicial(conn)
+    _inserir_dados_iniciais(conn)
+    conn.execute("INSERT INTO produtos (nome, categoria_id, preco, estoque_atual, codigo_barras) "
+                 "VALUES ('Ração Cães', 1, 50.0, 10, '789')")
+    conn.execute("INSERT INTO clientes (nome, cpf, telefone) VALUES ('José Conceição', '111.222.333-44', "
+                 "'(11) 91234-5678')")
+    conn.execute("INSERT INTO pets (nome, cliente_id, especie) VALUES ('Tóbi', 1, 'Cão')")
+    conn.execute("INSERT INTO agendamentos (cliente_id, pet_id, tipo_servico_id, data_agendamento) "
+                 "SELECT 1, 1, id, '2030-01-02 10:00:00' FROM tipos_servicos WHERE nome = 'Banho Simples'")
+    conn.commit()
+    conn.close()
+
+def test_banco_legado_migra_todas_as_versoes(tmp_path):
+    caminho = str(tmp_path / 'legado.db')
+    banco_legado(caminho)
+    
+    db = DatabaseManager(caminho, intervalo_checkpoint=None)
+    try:
+        assert db.schema_version() == VERSAO_ESQUEMA
+        aplicadas = [versao for (versao,) in db.execute_query('SELECT versao FROM schema_version ORDER BY versao')]
+        assert aplicadas == [versao for versao, _, _ in MIGRACOES]
+        
+        # Dados antigos preservados e alcançados pelas colunas e índices novos
+        assert Cliente(db).buscar('jose 91234')[0].cliente.nome == 'José Conceição'
+        assert Cliente(db).buscar_por_cpf('11122233344').nome == 'José Conceição'
+        assert Produto(db).buscar_por_codigo_barras('789').nome == 'Ração Cães'
+        assert db.execute_query('SELECT recurso, data_fim FROM agendamentos') == [
+            ('banho_tosa', '2030-01-02 11:00:00')]
+        assert Agendamento(db).listar_series() == []
+    finally:
+        db.close()
+
+@pytest.mark.parametrize('parar_em', [4, 8, 10])
+def test_migracao_a_partir_de_versao_intermediaria(tmp_path, parar_em):
+    caminho = str(tmp_path / 'parcial.db')
+    conn = sqlite3.connect(caminho)
+    conn.execute('CREATE TABLE schema_version (versao INTEGER PRIMARY KEY, descricao TEXT NOT NULL, '
+                 'aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+    for versao, descricao, migracao in MIGRACOES[:parar_em]:
+        migracao(conn)
+        conn.execute('INSERT INTO schema_version (versao, descricao) VALUES (?, ?)', (versao, descricao))
+    conn.execute(f'PRAGMA user_version = {parar_em}')
+    conn.commit()
+    conn.close()
+    
+    db = DatabaseManager(caminho, intervalo_checkpoint=None)
+    try:
+        assert db.schema_version() == VERSAO_ESQUEMA
+        assert db.execute_query('SELECT COUNT(*) FROM schema_version') == [(len(MIGRACOES),)]
+    finally:
+        db.close()
+
+def test_reabrir_banco_em_dia_nao_migra_de_novo(tmp_path):
+    caminho = str(tmp_path / 'petshop.db')
+    DatabaseManager(caminho, intervalo_checkpoint=None).close()
+    
+    db = DatabaseManager(caminho, intervalo_checkpoint=None)
+    try:
+        registros = db.execute_query('SELECT versao, aplicada_em FROM schema_version')
+        db.migrate()
+        assert db.execute_query('SELECT versao, aplicada_em FROM schema_version') == registros
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from models import Cliente, Produto, Venda
+
+def todas_as_paginas(buscar_pagina):
+    """Lista de páginas seguindo os cursores até o fim"""
+    paginas = []
+    apos = None
+    while True:
+        pagina = buscar_pagina(apos)
+        paginas.append(pagina)
+        if pagina.proximo is None:
+            return paginas
+        apos = pagina.proximo
+
+@pytest.fixture
+def clientes(db):
+    # Nomes repetidos: o id desempata e nenhuma linha pode sumir ou repetir entre páginas
+    Cliente(db).adicionar_varios([(nome,) for nome in ['Ana', 'Bia', 'Ana', 'Caio', 'Ana', 'Bia']])
+    return Cliente(db)
+
+@pytest.mark.parametrize('limite', [1, 2, 3, 6, 7])
+def test_cada_linha_aparece_uma_vez_em_ordem(clientes, limite):
+    paginas = todas_as_paginas(lambda apos: clientes.listar_pagina(apos, limite))
+    itens = [cliente for pagina in paginas for cliente in pagina.itens]
+    assert [(c.nome, c.id) for c in itens] == sorted((c.nome, c.id) for c in clientes.listar_todos())
+    assert all(len(pagina.itens) == limite for pagina in paginas[:-1])
+
+def test_ultima_pagina_cheia_nao_tem_cursor(clientes):
+    paginas = todas_as_paginas(lambda apos: clientes.listar_pagina(apos, 3))
+    assert [len(pagina.itens) for pagina in paginas] == [3, 3]
+    assert paginas[-1].proximo is None
+
+def test_tabela_vazia(db):
+    pagina = Produto(db).listar_pagina()
+    assert pagina.itens == [] and pagina.proximo is None
+
+def test_cursor_depois_do_fim(clientes):
+    assert clientes.listar_pagina(('Zzz', 0)).itens == []
+
+def test_vendas_da_mais_recente_para_a_mais_antiga(db):
+    db.execute_many('INSERT INTO vendas (total, data_venda) VALUES (?, ?)',
+                    [(10, '2024-01-01 10:00:00'), (20, '2024-01-02 10:00:00'),
+                     (30, '2024-01-02 10:00:00'), (40, '2024-02-01 10:00:00')])
+    vendas = Venda(db)
+    
+    paginas = todas_as_paginas(lambda apos: vendas.listar_pagina(apos=apos, limite=1))
+    assert [pagina.itens[0].total for pagina in paginas] == [40, 30, 20, 10]
+    
+    janeiro = todas_as_paginas(lambda apos: vendas.listar_pagina('2024-01-01', '2024-01-31', apos, 2))
+    assert [venda.total for pagina in janeiro for venda in pagina.itens] == [30, 20, 10]
+
+def test_pagina_usa_o_indice_sem_ordenar(db):
+    plano = ' '.join(detalhe for _, _, detalhe in db.explain_query_plan(
+        Cliente._SELECT + 'WHERE (nome, id) > (?, ?) ORDER BY nome ASC, id ASC LIMIT ?', ('Ana', 1, 10)))
+    assert 'idx_clientes_nome' in plano
+    assert 'TEMP B-TREE' not in plano
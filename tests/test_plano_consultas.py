@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+from plano_consultas import mostrar_planos, parametros_ficticios
+
+def test_parametros_nomeados_viram_dicionario():
+    assert parametros_ficticios('SELECT 1 WHERE a = :produto_id AND b < :limite AND c = :produto_id') == {
+        'produto_id': None, 'limite': None}
+    assert parametros_ficticios("SELECT ? WHERE hora = '10:30' AND x = ?") == [None, None]
+
+def test_relatorio_cobre_consultas_montadas_em_tempo_de_execucao(db_demo, capsys):
+    antes = db_demo.execute_query('SELECT (SELECT COUNT(*) FROM vendas), (SELECT COUNT(*) FROM agendamentos)')
+    mostrar_planos(db_demo.db_name)
+    saida = capsys.readouterr().out
+    
+    assert '❌' not in saida
+    for chamador in ('Produto.listar_pagina', 'Produto.estoque_em', 'Produto.inventario_em', 'Cliente.buscar',
+                     'Venda.listar_pagina', 'Agendamento._ocupados', 'Agendamento.gerar_ocorrencias'):
+        assert f'models.py:{chamador} ' in saida
+    # Os exemplos gravam dentro de uma transação que é desfeita
+    assert db_demo.execute_query(
+        'SELECT (SELECT COUNT(*) FROM vendas), (SELECT COUNT(*) FROM agendamentos)') == antes
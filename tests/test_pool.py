@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+from database import ConnectionPool, DatabaseManager
+
+def test_conexao_reaproveitada(db):
+    with db.connection() as primeira:
+        pass
+    with db.connection() as segunda:
+        assert segunda is primeira
+
+def test_pragmas_do_perfil(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'petshop.db'), intervalo_checkpoint=None, perfil='seguro')
+    try:
+        with db.connection() as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 2
+    finally:
+        db.close()
+
+def test_devolver_desfaz_transacao_pendente(db):
+    with db.connection() as conn:
+        conn.execute('BEGIN')
+        conn.execute("INSERT INTO categorias (nome) VALUES ('Esquecida')")
+    assert db.execute_query("SELECT COUNT(*) FROM categorias WHERE nome = 'Esquecida'") == [(0,)]
+
+def test_pool_esgotado(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), tamanho=1, timeout=0.05)
+    conn = pool.obter()
+    with pytest.raises(sqlite3.OperationalError):
+        pool.obter()
+    pool.devolver(conn)
+    assert pool.obter() is conn
+    pool.fechar()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+def nomes(db):
+    return [nome for (nome,) in db.execute_query(
+        "SELECT nome FROM categorias WHERE nome LIKE 'T%' ORDER BY nome")]
+
+def test_commit_unico_no_fim_do_bloco(db):
+    with db.transaction():
+        db.execute_update("INSERT INTO categorias (nome) VALUES ('T1')")
+        db.execute_update("INSERT INTO categorias (nome) VALUES ('T2')")
+    assert nomes(db) == ['T1', 'T2']
+
+def test_erro_desfaz_o_bloco_inteiro(db):
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction():
+            db.execute_update("INSERT INTO categorias (nome) VALUES ('T1')")
+            db.execute_update("INSERT INTO categorias (nome) VALUES ('T1')")
+    assert nomes(db) == []
+
+def test_savepoint_aninhado_desfaz_so_o_bloco_interno(db):
+    with db.transaction():
+        db.execute_update("INSERT INTO categorias (nome) VALUES ('T1')")
+        with pytest.raises(ValueError):
+            with db.transaction():
+                db.execute_update("INSERT INTO categorias (nome) VALUES ('T2')")
+                with db.transaction():
+                    db.execute_update("INSERT INTO categorias (nome) VALUES ('T3')")
+                raise ValueError('interno')
+        db.execute_update("INSERT INTO categorias (nome) VALUES ('T4')")
+    assert nomes(db) == ['T1', 'T4']
+
+def test_erro_externo_desfaz_savepoints_ja_liberados(db):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            with db.transaction():
+                db.execute_update("INSERT INTO categorias (nome) VALUES ('T1')")
+            raise ValueError('externo')
+    assert nomes(db) == []
+
+def test_conexao_e_liberada_depois_do_bloco(db):
+    with db.transaction() as conn:
+        pass
+    assert not conn.in_transaction
+    assert getattr(db._local, 'conn', None) is None
+
+def test_transacao_dentro_de_snapshot_falha(db):
+    with db.snapshot():
+        with pytest.raises(sqlite3.ProgrammingError):
+            with db.transaction():
+                pass
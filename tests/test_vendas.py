@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from models import ConflitoEstoqueError, EstoqueInsuficienteError, Produto, Venda
+
+def contar_vendas(db):
+    return db.execute_query('SELECT COUNT(*) FROM vendas')[0][0]
+
+def test_venda_completa_baixa_estoque_e_registra_saida(db_demo):
+    produto = Produto(db_demo).buscar_por_id(1)
+    venda_id = Venda(db_demo).registrar_venda_completa(
+        None, [{'produto_id': 1, 'quantidade': 2, 'versao': produto.versao}])
+    
+    depois = Produto(db_demo).buscar_por_id(1)
+    assert depois.estoque_atual == produto.estoque_atual - 2
+    assert depois.versao > produto.versao
+    assert Venda(db_demo).buscar_venda(venda_id)['venda'].total == pytest.approx(2 * produto.preco)
+    assert db_demo.execute_query(
+        "SELECT quantidade FROM movimentacoes_estoque WHERE produto_id = 1 AND tipo_movimentacao = 'saida' "
+        "ORDER BY id DESC LIMIT 1") == [(2,)]
+
+def test_alteracao_de_preco_nao_recusa_a_venda(db_demo):
+    produtos = Produto(db_demo)
+    lido = produtos.buscar_por_id(1)
+    # Preço alterado depois que o produto foi posto no carrinho (versao avança)
+    db_demo.execute_update('UPDATE produtos SET preco = preco + 1 WHERE id = 1')
+    assert produtos.buscar_por_id(1).versao > lido.versao
+    
+    Venda(db_demo).registrar_venda_completa(None, [{'produto_id': 1, 'quantidade': 1, 'versao': lido.versao}])
+    assert produtos.buscar_por_id(1).estoque_atual == lido.estoque_atual - 1
+
+def test_outra_venda_com_estoque_sobrando_nao_recusa(db_demo):
+    produtos = Produto(db_demo)
+    lido = produtos.buscar_por_id(1)
+    Venda(db_demo).registrar_venda_completa(None, [{'produto_id': 1, 'quantidade': 1}])
+    
+    Venda(db_demo).registrar_venda_completa(None, [{'produto_id': 1, 'quantidade': 1, 'versao': lido.versao}])
+    assert produtos.buscar_por_id(1).estoque_atual == lido.estoque_atual - 2
+
+def test_falta_de_estoque_recusa_a_venda_inteira(db_demo):
+    produtos = Produto(db_demo)
+    lido = produtos.buscar_por_id(1)
+    outro = produtos.buscar_por_id(2)
+    
+    # Outro caixa leva quase tudo depois que o produto foi posto no carrinho
+    Venda(db_demo).registrar_venda_completa(None, [{'produto_id': 1, 'quantidade': lido.estoque_atual - 1}])
+    vendas_antes = contar_vendas(db_demo)
+    
+    with pytest.raises(EstoqueInsuficienteError) as erro:
+        Venda(db_demo).registrar_venda_completa(None, [
+            {'produto_id': 2, 'quantidade': 1},
+            {'produto_id': 1, 'quantidade': 2},
+        ])
+    
+    assert not isinstance(erro.value, ConflitoEstoqueError)
+    assert erro.value.itens == [(1, lido.nome, 2, 1)]
+    # Nada da venda recusada ficou gravado, nem a baixa do outro item
+    assert contar_vendas(db_demo) == vendas_antes
+    assert produtos.buscar_por_id(2).estoque_atual == outro.estoque_atual
+
+def test_linhas_repetidas_somam_a_quantidade(db_demo):
+    produtos = Produto(db_demo)
+    lido = produtos.buscar_por_id(1)
+    
+    # Versões diferentes nas linhas (uma lida antes de outra venda) não importam
+    Venda(db_demo).registrar_venda_completa(None, [{'produto_id': 1, 'quantidade': 1, 'versao': lido.versao}])
+    atual = produtos.buscar_por_id(1)
+    Venda(db_demo).registrar_venda_completa(None, [
+        {'produto_id': 1, 'quantidade': 1, 'versao': lido.versao},
+        {'produto_id': 1, 'quantidade': 2, 'versao': atual.versao},
+    ])
+    assert produtos.buscar_por_id(1).estoque_atual == atual.estoque_atual - 3
+    
+    # Cada linha cabe no estoque, mas a soma não
+    restante = produtos.buscar_por_id(1).estoque_atual
+    with pytest.raises(EstoqueInsuficienteError) as erro:
+        Venda(db_demo).registrar_venda_completa(None, [
+            {'produto_id': 1, 'quantidade': restante},
+            {'produto_id': 1, 'quantidade': 1},
+        ])
+    assert erro.value.itens == [(1, lido.nome, restante + 1, restante)]
+    assert produtos.buscar_por_id(1).estoque_atual == restante